@@ -0,0 +1,18 @@
+"""
+FILE: benchmarks/__init__.py
+TYPE: Benchmark Suite
+
+Reproducible measurements of the trading loop's hot paths:
+    loop       scan_market -> execute_trade -> check_exits ticks/second (3, 50, 500 symbols)
+    state      StateManager read/write latency vs. state size
+    events     EventLogger sustained insert rate
+    excel      ExcelManager append cost and workbook rebuild vs. row count
+    dashboard  dashboard endpoint requests/second (in-process ASGI, no network)
+
+Every run uses a seeded simulator and a simulated clock, and executes in a
+scratch working directory, so the repo's bot_state.json / audit DB / workbooks
+are never touched. Results are JSON and can be compared across commits:
+
+    python -m benchmarks --output before.json
+    python -m benchmarks --output after.json --compare before.json
+"""
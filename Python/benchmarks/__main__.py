@@ -0,0 +1,75 @@
+"""
+FILE: benchmarks/__main__.py
+TYPE: Benchmark Runner (CLI)
+
+Usage (from the Python/ directory):
+    python -m benchmarks                                  # full suite, JSON to stdout
+    python -m benchmarks --quick --only loop,state
+    python -m benchmarks --output after.json --compare before.json --fail-on-regression
+"""
+import os
+import sys
+import json
+import random
+import logging
+import argparse
+
+from benchmarks import harness
+
+SUITES = ("loop", "state", "events", "excel", "dashboard")
+
+
+def run_suite(name, seed, quick):
+    # Imported only after harness.isolate(): these pull in the `the` singletons
+    if name == "loop":
+        from benchmarks import loop
+        return loop.run(seed, quick)
+    if name == "dashboard":
+        from benchmarks import dashboard
+        return dashboard.run(seed, quick)
+    from benchmarks import storage
+    return {"state": storage.run_state, "events": storage.run_events, "excel": storage.run_excel}[name](seed, quick)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trading loop hot-path benchmarks")
+    parser.add_argument("--only", help=f"Comma-separated suites ({', '.join(SUITES)})")
+    parser.add_argument("--quick", action="store_true", help="Smaller iteration counts (smoke run)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    suites = args.only.split(",") if args.only else list(SUITES)
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+    # Resolve user paths before moving into the scratch directory
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = harness.load(os.path.abspath(args.compare)) if args.compare else None
+
+    workdir = harness.isolate()
+    logging.basicConfig(level=logging.ERROR)
+    logging.disable(logging.WARNING)
+    random.seed(args.seed)
+
+    report = {"meta": dict(harness.metadata(args.seed, args.quick), workdir=workdir), "results": {}}
+    for name in suites:
+        print(f"running {name}...", file=sys.stderr)
+        report["results"].update(run_suite(name, args.seed, args.quick))
+
+    if output:
+        harness.save(output, report)
+    print(json.dumps(report, indent=2))
+
+    if baseline is not None:
+        rows = harness.compare(baseline, report, args.threshold)
+        print(harness.format_comparison(rows), file=sys.stderr)
+        if args.fail_on_regression and any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
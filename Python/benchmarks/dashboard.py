@@ -0,0 +1,44 @@
+"""
+FILE: benchmarks/dashboard.py
+TYPE: Dashboard Endpoint Benchmark
+
+Drives the FastAPI app in-process through Starlette's TestClient (ASGI calls,
+no sockets), so the numbers are server-side cost plus a constant client
+overhead rather than anything network-bound.
+"""
+import time
+
+from benchmarks.storage import _trade
+
+ENDPOINTS = ("/status", "/trades/active", "/logs/recent", "/snapshot")
+
+
+def run(seed, quick=False):
+    from fastapi.testclient import TestClient
+    from the.state_manager import state_engine
+    from the.event_logger import EventLogger
+    from the.dashboard_api import app
+
+    for i in range(50):
+        state_engine.register_trade(f"TRD_{seed}_{i}", _trade(i))
+    logger = EventLogger()
+    for i in range(100):
+        logger.log_system_event("INFO", "Benchmark", f"dashboard row {i}")
+    logger.flush()
+
+    requests = 300 if quick else 3000
+    results = {}
+    with TestClient(app) as client:
+        for path in ENDPOINTS:
+            for _ in range(20):
+                client.get(path)
+            started = time.perf_counter()
+            for _ in range(requests):
+                client.get(path)
+            seconds = time.perf_counter() - started
+            results[f"dashboard.{path.strip('/').replace('/', '_')}"] = {
+                "requests": requests,
+                "requests_per_sec": round(requests / seconds, 1),
+                "mean_ms": round(seconds / requests * 1000, 3)
+            }
+    return results
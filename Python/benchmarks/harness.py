@@ -0,0 +1,121 @@
+"""
+FILE: benchmarks/harness.py
+TYPE: Benchmark Harness (Isolation, Timing, Result Files)
+"""
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+import numpy as np
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Metric name suffix -> whether a bigger number is an improvement
+HIGHER_IS_BETTER = ("_per_sec",)
+LOWER_IS_BETTER = ("_us", "_ms", "_s")
+
+
+def isolate():
+    """
+    Moves the process into a scratch directory. Must run before anything from
+    `the` is imported: its singletons open bot_state.json, the audit DB and the
+    workbooks relative to the working directory.
+    """
+    if PYTHON_DIR not in sys.path:
+        sys.path.insert(0, PYTHON_DIR)
+    workdir = tempfile.mkdtemp(prefix="tradingbot-bench-")
+    os.chdir(workdir)
+    return workdir
+
+
+def time_calls(fn, count, warmup=100):
+    """Per-call latencies (ns) of `count` calls after `warmup` untimed ones."""
+    for _ in range(warmup):
+        fn()
+    clock = time.perf_counter_ns
+    samples = np.empty(count, dtype=np.int64)
+    for i in range(count):
+        start = clock()
+        fn()
+        samples[i] = clock() - start
+    return samples
+
+
+def latency(samples_ns, prefix=""):
+    """p50/p99/mean of ns samples, in microseconds."""
+    us = np.asarray(samples_ns, dtype=np.float64) / 1000
+    return {
+        f"{prefix}p50_us": round(float(np.percentile(us, 50)), 3),
+        f"{prefix}p99_us": round(float(np.percentile(us, 99)), 3),
+        f"{prefix}mean_us": round(float(us.mean()), 3)
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PYTHON_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def metadata(seed, quick):
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "quick": quick
+    }
+
+
+def save(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Rows of (benchmark, metric, before, after, change) for every numeric metric
+    both reports share; `regression` is set when the change is worse than
+    `threshold` in the metric's direction.
+    """
+    rows = []
+    for name, metrics in current["results"].items():
+        before_metrics = baseline.get("results", {}).get(name, {})
+        for metric, after in metrics.items():
+            before = before_metrics.get(metric)
+            if not isinstance(after, (int, float)) or not isinstance(before, (int, float)) or not before:
+                continue
+            change = (after - before) / abs(before)
+            if metric.endswith(HIGHER_IS_BETTER):
+                regression = change < -threshold
+            elif metric.endswith(LOWER_IS_BETTER):
+                regression = change > threshold
+            else:
+                continue
+            rows.append({"benchmark": name, "metric": metric, "before": before, "after": after,
+                         "change": round(change, 4), "regression": regression})
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'benchmark':<34} {'metric':<22} {'before':>12} {'after':>12} {'change':>8}"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(f"{row['benchmark']:<34} {row['metric']:<22} {row['before']:>12.6g} {row['after']:>12.6g} {row['change']*100:>+7.1f}%{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,94 @@
+"""
+FILE: benchmarks/loop.py
+TYPE: Trading Loop Benchmark
+
+One tick = scan_market over the whole universe -> execute_trade for every
+actionable signal -> check_exits, the same sequence the orchestrator runs per
+candle batch. The simulated clock advances one second per tick from a Monday
+09:15, so session gates, trade ids and time exits are identical on every run.
+
+"isolated" replaces the EventLogger with the backtest recorder (pure CPU cost
+of the engines); "live" wires the real EventLogger, Excel sink and candle
+archive, as main.py does.
+"""
+import time
+import itertools
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.harness import latency
+
+START = datetime(2025, 1, 6, 9, 15).timestamp()
+RUNS = itertools.count(1)  # Every live run shares one audit DB and replays the same clock, so each gets its own trade prefix
+
+
+def universe(count):
+    base = ["NIFTY", "BANKNIFTY", "BTCUSDT"]
+    return base[:count] + [f"SYM{i:03d}" for i in range(max(0, count - len(base)))]
+
+
+def build(symbols, seed, live):
+    from the.clock import SimulatedClock
+    from the.state_manager import StateManager
+    from the.candle_store import CandleStore
+    from the.indicators import IndicatorEngine
+    from the.candle_archive import CandleArchive
+    from the.backtest import BacktestRecorder
+    from the.event_logger import EventLogger
+    from the.market_data_and_signal import MarketSignalEngine
+    from the.trade_execution_and_mode import ExecutionEngine
+    from the.trade_management_and_risk import TradeManagementEngine
+
+    clock = SimulatedClock(START)
+    state = StateManager(persist=False)
+    state.set_session("LIVE_MARKET")
+    # Enough capital that every universe size keeps opening trades for the whole run
+    state.update_wallet({"paper_balance": 1e9, "free_balance": 1e9})
+    # ...and a loss limit that never trips, or scans would stop being measured once it does
+    state.set_daily_loss_limit(1e12)
+    recorder = EventLogger() if live else BacktestRecorder()
+    market = MarketSignalEngine(
+        {"symbols": symbols, "seed": seed}, state=state, event_logger=recorder, clock=clock,
+        candles=CandleStore(capacity=512), indicators=IndicatorEngine(), archive=CandleArchive(enabled=live)
+    )
+    execution = ExecutionEngine(state=state, event_logger=recorder, clock=clock)
+    # The default 1000/trade buys less than one unit of a 20k-60k simulated index, so nothing would fill
+    execution.max_risk_per_trade = 1e6
+    execution.trade_prefix = f"TRD_BENCH{next(RUNS)}"
+    # The live position and order-rate limits would cap the workload after the first few trades
+    execution.pretrade.max_open_positions = execution.pretrade.max_orders_per_window = None
+    risk = TradeManagementEngine(recorder, state=state, clock=clock)
+    return clock, market, execution, risk
+
+
+def run_loop(symbol_count, ticks, seed, live=False, warmup=5):
+    clock, market, execution, risk = build(universe(symbol_count), seed, live)
+    opened = 0
+    samples = np.empty(ticks, dtype=np.int64)
+    for i in range(warmup + ticks):
+        clock.set(START + i)
+        started = time.perf_counter_ns()
+        for sig in market.scan_market():
+            if execution.execute_trade(sig) is not None:
+                opened += 1
+        risk.check_exits()
+        if i >= warmup:
+            samples[i - warmup] = time.perf_counter_ns() - started
+    seconds = samples.sum() / 1e9
+    return {
+        "ticks": ticks,
+        "ticks_per_sec": round(ticks / seconds, 2),
+        "candles_per_sec": round(ticks * symbol_count / seconds, 1),
+        **latency(samples, "tick_"),
+        "trades_opened": opened
+    }
+
+
+def run(seed, quick=False):
+    ticks = {3: 60, 50: 30, 500: 8} if quick else {3: 400, 50: 150, 500: 30}
+    results = {}
+    for mode in ("isolated", "live"):
+        for count, n in ticks.items():
+            results[f"loop.{mode}.{count}_symbols"] = run_loop(count, n, seed, live=(mode == "live"))
+    return results
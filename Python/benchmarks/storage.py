@@ -0,0 +1,111 @@
+"""
+FILE: benchmarks/storage.py
+TYPE: State / Audit / Analytics Storage Benchmarks
+"""
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.harness import latency, time_calls
+
+
+def _trade(i):
+    return {
+        "trade_id": f"TRD_{i}", "symbol": f"SYM{i % 500:03d}", "direction": "BUY" if i % 2 else "SELL",
+        "quantity": 10, "entry_price": 100.0 + i % 50, "order_type": "MARKET",
+        "timestamp": "2025-01-06T09:15:00", "mode": "PAPER_TRADING_REAL_DATA", "status": "OPEN", "signal_id": "bench"
+    }
+
+
+def _candles(count, rng):
+    prices = rng.uniform(100, 200, count)
+    return {
+        f"SYM{i:03d}": {"symbol": f"SYM{i:03d}", "open": p, "high": p + 1, "low": p - 1, "close": p + 0.5,
+                        "volume": 1000.0, "timestamp": "2025-01-06 09:15:00"}
+        for i, p in enumerate(prices.tolist())
+    }
+
+
+def run_state(seed, quick=False):
+    """StateManager read/write latency with growing active-trade and market-data maps."""
+    from the.state_manager import StateManager
+
+    rng = np.random.default_rng(seed)
+    calls = 2000 if quick else 20000
+    results = {}
+    for size in (10, 100, 1000):
+        state = StateManager(state_file=f"bench_state_{size}.json")
+        for i in range(size):
+            state.register_trade(f"TRD_{i}", _trade(i))
+        state.register_market_data_batch(_candles(size, rng))
+        batch = _candles(50, rng)
+        thinking = {"current_state": "ANALYZING", "log_msg": "bench"}
+
+        metrics = {}
+        metrics.update(latency(time_calls(state.get_wallet, calls), "get_wallet_"))
+        metrics.update(latency(time_calls(state.get_active_trades, calls // 10), "get_active_trades_"))
+        metrics.update(latency(time_calls(lambda: state.get_market_price("SYM001"), calls), "get_market_price_"))
+        metrics.update(latency(time_calls(lambda: state.update_thinking(thinking), calls), "update_thinking_"))
+        metrics.update(latency(time_calls(lambda: state.register_market_data_batch(batch), calls // 10), "register_batch_"))
+
+        def snapshot():
+            state._mark_dirty()
+            state.flush()
+        metrics.update(latency(time_calls(snapshot, 50, warmup=5), "snapshot_"))
+        results[f"state.{size}_trades"] = metrics
+    return results
+
+
+def run_events(seed, quick=False):
+    """EventLogger: producer-side enqueue cost and sustained committed rows/second."""
+    from the.event_logger import EventLogger
+
+    logger = EventLogger()
+    logger.flush()
+    rows = 10000 if quick else 100000
+    payload = {"seed": seed, "bench": True}
+
+    started = time.perf_counter()
+    for i in range(rows):
+        logger.log_system_event("INFO", "Benchmark", f"row {i}", payload)
+    enqueued = time.perf_counter() - started
+    logger.flush()
+    committed = time.perf_counter() - started
+    stats = logger.get_stats()
+    return {"events.system_logs": {
+        "rows": rows,
+        "enqueue_per_sec": round(rows / enqueued, 1),
+        "committed_per_sec": round(rows / committed, 1),
+        "enqueue_mean_us": round(enqueued / rows * 1e6, 3),
+        "dropped": stats["dropped"]
+    }}
+
+
+def run_excel(seed, quick=False):
+    """ExcelManager: append cost as the journal grows, and workbook rebuild time vs. row count."""
+    from the.excel_manager import excel_manager, ExcelManager
+
+    # A sheet the trading loop never writes, so other suites don't change the row counts
+    file_name, sheet = ExcelManager.POST_MARKET_LEARNING_FILE, "Learning"
+    row = {"Timestamp": datetime(2025, 1, 6, 15, 30).isoformat(), "Strategy_Mistake": "None",
+           "Market_Misread_Reason": "None", "Confidence_Mismatch": 0.1, "Suggested_Improvement": "benchmark row"}
+    results = {}
+    journal = excel_manager._journal_path(file_name, sheet)
+    for target in ((1000, 10000) if quick else (1000, 10000, 50000)):
+        excel_manager.flush()
+        rows = 0
+        if os.path.exists(journal):  # Today's journal starts with the first row
+            with open(journal) as f:
+                rows = sum(1 for _ in f)
+        if rows < target:
+            excel_manager.append_rows(file_name, sheet, [row] * (target - rows))
+            excel_manager.flush()
+            rows = target
+        started = time.perf_counter()
+        excel_manager.materialize_now([file_name])
+        metrics = {"rows": rows, "materialize_ms": round((time.perf_counter() - started) * 1000, 2)}
+        metrics.update(latency(time_calls(lambda: excel_manager.append_to_file(file_name, sheet, row), 2000), "append_"))
+        results[f"excel.{target}_rows"] = metrics
+    return results
@@ -1,9 +1,11 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 app = FastAPI()
 import sys
 import os
 import threading
 import time
+import asyncio
 import logging
 
 # Set base path to the directory containing main.py
@@ -18,21 +20,43 @@ from the.state_manager import state_engine
 from the.market_data_and_signal import MarketSignalEngine
 from the.trade_execution_and_mode import ExecutionEngine
 from the.trade_management_and_risk import TradeManagementEngine
+from the.order_engine import OrderEngine
 from the.session_engine import session_manager
 from the.event_logger import EventLogger
-from the.dashboard_api import start_dashboard_server
+from the.dashboard_api import start_dashboard_server, trading_routes
+from the import orchestrator
+from the.audit_retention import audit_retention
+from the.orchestrator import AsyncTradingEngine
+from the.market_feeds import create_feed
+from the.metrics import registry
+from the import portfolio
+from the.portfolio import PortfolioEngine
 app = FastAPI()
+# Webhook alerts (and the admin routes) must reach the engine, so they are served beside it
+app.include_router(trading_routes)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def run_trading_loop():
-    """Main trading bot orchestration loop"""
+    """Main trading bot orchestration: event-driven stages on a dedicated asyncio loop"""
     event_logger = EventLogger()
     market_engine = MarketSignalEngine()
     execution_engine = ExecutionEngine()
     risk_engine = TradeManagementEngine(event_logger)
+    # Resting LIMIT / STOP / bracket / OCO entries, matched against each new candle
+    order_engine = OrderEngine(execution_engine, event_logger=event_logger)
+    # MARKET_FEED selects the candle source: simulated (default), replay:<files>, archive:<symbols>, socket:<host:port>
+    feed = create_feed(os.environ.get("MARKET_FEED"), market_engine)
+    # Optional side-by-side strategy books (PORTFOLIO_CONFIG, default portfolio.json)
+    portfolio.portfolio_engine = PortfolioEngine.from_config(event_logger=event_logger)
+    engine = AsyncTradingEngine(event_logger, market_engine, execution_engine, risk_engine, feed=feed,
+                                portfolio=portfolio.portfolio_engine, orders=order_engine)
+    orchestrator.trading_engine = engine
+    # A dashboard started as its own process reads state from here (seqlock, no file polling)
+    state_engine.publish_shared()
+    audit_retention.start(event_logger)
     
     # Set initial state
     state_engine.update_thinking({
@@ -42,35 +66,9 @@ def run_trading_loop():
     
     logger.info("TRADING BOT STARTED")
     
-    # First successful scan flag
-    first_scan_complete = False
-    
     while True:
         try:
-            # 1. Update Session and Handle IST transitions
-            session_manager.update_session(event_logger)
-            state = state_engine.get_state()
-            
-            # 2. Run Engines Sequentially in the loop
-            if state.get("session") == "LIVE_MARKET":
-                signals = market_engine.scan_market()
-                for signal in signals:
-                    execution_engine.execute_trade(signal)
-                
-                if not first_scan_complete:
-                    state_engine.update_thinking({"current_state": "ACTIVE"})
-                    first_scan_complete = True
-            else:
-                # Still allow risk engine to check exits (mandatory time exit)
-                # and scan for data updates
-                market_engine.scan_market()
-            
-            risk_engine.check_exits()
-            
-            # Heartbeat log
-            event_logger.log_system_event("INFO", "MainLoop", "Bot heartbeat - system status: " + state_engine.get_state()["bot_thinking"]["current_state"])
-            
-            time.sleep(2)
+            asyncio.run(engine.run())
         except Exception as e:
             logger.error(f"Loop error: {e}")
             event_logger.log_system_event("ERROR", "MainLoop", f"Critical loop error: {e}")
@@ -78,9 +76,15 @@ def run_trading_loop():
 
 @app.on_event("startup")
 def start_bot():
-    trading_thread = threading.Thread(target=run_trading_loop, daemon=True)
+    # Named so the sampling profiler (/admin/profiler/start) can find it
+    trading_thread = threading.Thread(target=run_trading_loop, name="TradingLoop", daemon=True)
     trading_thread.start()
 
 @app.get("/")
 def health():
     return {"status": "Trading bot running 24/7"}
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus metrics of the trading process (stage latencies, hot calls, EventLogger queue)."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
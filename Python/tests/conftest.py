@@ -0,0 +1,15 @@
+"""
+Run from Python/: python -m pytest tests
+
+The modules under `the` open bot_state.json, the audit DB and the workbooks
+relative to the working directory as soon as they are imported, so the
+session moves into a scratch directory first (as benchmarks.harness does).
+"""
+import os
+import sys
+import tempfile
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PYTHON_DIR not in sys.path:
+    sys.path.insert(0, PYTHON_DIR)
+os.chdir(tempfile.mkdtemp(prefix="tradingbot-tests-"))
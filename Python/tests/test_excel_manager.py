@@ -0,0 +1,42 @@
+import os
+
+from openpyxl import Workbook, load_workbook
+
+from the.excel_manager import ExcelManager
+
+FILE, SHEET = ExcelManager.POST_MARKET_LEARNING_FILE, "Learning"
+
+
+def rows(file_name, sheet_name):
+    wb = load_workbook(file_name, read_only=True)
+    values = [list(row) for row in wb[sheet_name].iter_rows(values_only=True)]
+    wb.close()
+    return values
+
+
+def test_rebuild_keeps_imported_and_earlier_days_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    columns = ExcelManager.FILES[FILE][SHEET]
+    # A workbook written before journaling existed
+    wb = Workbook()
+    ws = wb.active
+    ws.title = SHEET
+    ws.append(columns)
+    for i in range(5):
+        ws.append([f"2025-01-0{i + 1}T15:30:00", f"old {i}", "", "", ""])
+    wb.save(FILE)
+
+    manager = ExcelManager()
+    with open(os.path.join(manager.JOURNAL_DIR, f"post_market_learning__{SHEET}__2000-01-01.csv"), "w", newline="") as f:
+        f.write("2000-01-01T15:30:00,earlier day,,,\r\n")
+    manager.append_to_file(FILE, SHEET, {"Timestamp": "today", "Strategy_Mistake": "new"})
+    assert manager.materialize()
+
+    body = rows(FILE, SHEET)
+    assert body[0] == columns
+    assert [row[1] for row in body[1:]] == [f"old {i}" for i in range(5)] + ["earlier day", "new"]
+
+    # Imported rows are read once: a second manager over the same journals changes nothing
+    manager = ExcelManager()
+    manager.materialize_now([FILE])
+    assert rows(FILE, SHEET) == body
@@ -0,0 +1,139 @@
+import math
+
+import numpy as np
+import pytest
+
+from the.fill_model import FillModel, FeeSchedule, FEE_SCHEDULES, SymbolFillModels
+
+
+def test_ideal_fill_is_frictionless():
+    fill = FillModel.preset("ideal").fill(True, 100.0, 10, volume=1000)
+    assert tuple(fill) == (100.0, 10, 0.0)
+
+
+def test_max_participation_truncates_the_entry():
+    model = FillModel(max_participation=0.10)
+    assert model.fill(True, 100.0, 500, volume=1234).quantity == 123
+    assert model.fill(True, 100.0, 50, volume=1234).quantity == 50
+
+
+def test_exits_fill_in_full():
+    model = FillModel(max_participation=0.10)
+    assert model.fill(False, 100.0, 500, volume=1000, partial=False).quantity == 500
+
+
+def test_no_volume_means_no_truncation_and_no_impact():
+    model = FillModel(impact_bps=50.0, max_participation=0.10)
+    assert tuple(model.fill(True, 100.0, 500)) == (100.0, 500, 0.0)
+
+
+def test_taker_pays_half_the_spread_plus_impact():
+    model = FillModel(spread_bps=2.0, impact_bps=10.0)
+    slip = (1.0 + 10.0 * math.sqrt(0.25)) / 10000
+    assert model.fill(True, 100.0, 25, volume=100).price == pytest.approx(100.0 * (1 + slip))
+    assert model.fill(False, 100.0, 25, volume=100).price == pytest.approx(100.0 * (1 - slip))
+
+
+def test_limit_fills_as_maker_at_its_level():
+    model = FillModel(spread_bps=2.0, impact_bps=10.0, fees=FEE_SCHEDULES["crypto"])
+    fill = model.fill(True, 100.0, 10, volume=100, taker=False)
+    assert fill.price == 100.0
+    assert fill.fees == pytest.approx(1000.0 * 0.0008)
+
+
+def test_nse_brokerage_is_capped_per_order():
+    fees = FEE_SCHEDULES["nse_intraday"]
+    small, large = 10_000.0, 10_000_000.0
+    assert fees.fees(True, small) == pytest.approx((small * 0.0003 + small * (0.0000297 + 0.000001)) * 1.18 + small * 0.00003)
+    assert fees.fees(True, large) == pytest.approx((20.0 + large * (0.0000297 + 0.000001)) * 1.18 + large * 0.00003)
+    # STT is charged on the sell leg only
+    assert fees.fees(False, small) - fees.fees(True, small) == pytest.approx(small * (0.00025 - 0.00003))
+
+
+def test_fill_many_matches_fill():
+    model = FillModel.preset("nse_intraday")
+    buy = np.array([True, False, True, False])
+    price = np.array([100.0, 250.0, 99.5, 1000.0])
+    quantity = np.array([500.0, 10.0, 40.0, 3.0])
+    volume = np.array([1234.0, 0.0, 1e6, 50.0])
+    prices, quantities, fees = model.fill_many(buy, price, quantity, volume)
+    for i in range(len(price)):
+        expected = model.fill(bool(buy[i]), price[i], quantity[i], volume[i] or None)
+        assert (prices[i], quantities[i], fees[i]) == pytest.approx(tuple(expected))
+
+
+def test_default_models_charge_crypto_fees_on_usdt_pairs(monkeypatch):
+    monkeypatch.delenv("FILL_MODEL", raising=False)
+    models = FillModel.from_env()
+    assert models.for_symbol("BTCUSDT") == FillModel.preset("crypto")
+    assert models.for_symbol("NIFTY") == FillModel.preset("nse_intraday")
+
+    buy = models.for_symbol("BTCUSDT").fill(True, 50000.0, 1)
+    sell = models.for_symbol("BTCUSDT").fill(False, 50000.0, 1)
+    assert buy.fees == pytest.approx(buy.price * 0.001)    # Taker fee only: no STT, stamp duty or brokerage
+    assert sell.fees == pytest.approx(sell.price * 0.001)
+    assert models.for_symbol("BTCUSDT").fill(True, 50000.0, 1, taker=False).fees == pytest.approx(50000.0 * 0.0008)
+
+
+def test_fill_model_env_applies_one_preset_everywhere(monkeypatch):
+    monkeypatch.setenv("FILL_MODEL", "ideal")
+    monkeypatch.setenv("FILL_LATENCY_MS", "250")
+    model = FillModel.from_env()
+    assert model.for_symbol("BTCUSDT") is model.for_symbol("NIFTY") is model
+    assert model.latency == 0.25
+
+
+def test_explicit_symbol_beats_the_suffix_rule():
+    crypto, futures = FillModel.preset("crypto"), FillModel.preset("nse_futures")
+    models = SymbolFillModels(FillModel.preset("nse_intraday"), symbols={"ETHUSDT": futures}, suffixes={"USDT": crypto})
+    assert models.for_symbol("ETHUSDT") is futures
+    assert models.for_symbol("BTCUSDT") is crypto
+
+
+def test_unknown_preset_is_a_value_error():
+    with pytest.raises(ValueError):
+        FillModel.preset("nyse")
+
+
+def test_execution_takes_the_partial_fill_and_refuses_an_illiquid_bar():
+    from the.clock import SimulatedClock
+    from the.state_manager import StateManager
+    from the.backtest import BacktestRecorder
+    from the.trade_execution_and_mode import ExecutionEngine
+
+    state = StateManager(persist=False)
+    state.set_session("LIVE_MARKET")
+    state.update_wallet({"paper_balance": 1e6, "free_balance": 1e6})
+    execution = ExecutionEngine(state=state, event_logger=BacktestRecorder(), clock=SimulatedClock(1736135100.0))
+    execution.fill_model = FillModel(max_participation=0.10, fees=FeeSchedule())
+    execution.pretrade.max_open_positions = None
+    signal = {"symbol": "NIFTY", "signal_type": "BUY", "price": 100.0, "confidence": 0.9}
+
+    state.register_market_data("NIFTY", {"open": 100.0, "high": 100.0, "low": 100.0, "close": 100.0, "volume": 25})
+    trade = execution.execute_trade(signal)
+    assert trade.quantity == 2  # 100 wanted (1000 risk x 10 leverage / 100), 10% of 25 available
+    assert state.get_wallet()["used_margin"] == pytest.approx(2 * 100.0 / 10)
+
+    state.register_market_data("NIFTY", {"open": 100.0, "high": 100.0, "low": 100.0, "close": 100.0, "volume": 5})
+    assert execution.execute_trade(signal) is None
+    assert execution.last_rejection.code == "NO_LIQUIDITY"
+
+
+def test_live_engine_charges_a_btcusdt_entry_the_crypto_taker_fee(monkeypatch):
+    from the.clock import SimulatedClock
+    from the.state_manager import StateManager
+    from the.backtest import BacktestRecorder
+    from the.trade_execution_and_mode import ExecutionEngine
+
+    monkeypatch.delenv("FILL_MODEL", raising=False)
+    state = StateManager(persist=False)
+    state.set_session("LIVE_MARKET")
+    state.update_wallet({"paper_balance": 1e6, "free_balance": 1e6})
+    execution = ExecutionEngine(state=state, event_logger=BacktestRecorder(), clock=SimulatedClock(1736135100.0))
+    execution.fill_model = FillModel.from_env()
+    execution.max_risk_per_trade = 1e5
+    state.register_market_data("BTCUSDT", {"open": 50000.0, "high": 50000.0, "low": 50000.0, "close": 50000.0, "volume": 1000})
+    trade = execution.execute_trade({"symbol": "BTCUSDT", "signal_type": "BUY", "price": 50000.0, "confidence": 0.9})
+    assert trade.quantity == 20
+    assert trade.entry_price > 50000.0                                  # Crypto spread and impact
+    assert trade.entry_fees == pytest.approx(trade.entry_price * 20 * 0.001)
@@ -0,0 +1,145 @@
+from datetime import datetime
+
+import pytest
+
+from the.backtest import BacktestRecorder
+from the.clock import SimulatedClock
+from the.fill_model import FillModel
+from the.order_engine import OrderEngine
+from the.state_manager import StateManager
+from the.trade_execution_and_mode import ExecutionEngine
+
+START = datetime(2025, 1, 6, 9, 15).timestamp()
+
+
+class Market:
+    """An order engine on in-memory state, fed one candle at a time."""
+
+    def __init__(self, latency=0.0):
+        self.clock = SimulatedClock(START)
+        self.state = StateManager(persist=False)
+        self.state.set_session("LIVE_MARKET")
+        self.state.update_wallet({"paper_balance": 1e6, "free_balance": 1e6})
+        recorder = BacktestRecorder()
+        self.execution = ExecutionEngine(state=self.state, event_logger=recorder, clock=self.clock)
+        self.execution.fill_model = FillModel.preset("ideal", latency=latency)
+        self.execution.max_risk_per_trade = 1000.0
+        self.execution.pretrade.max_open_positions = self.execution.pretrade.max_orders_per_window = None
+        self.orders = OrderEngine(self.execution, state=self.state, clock=self.clock, event_logger=recorder)
+        self.bar(100.0, 100.0, 100.0, 100.0)
+
+    def bar(self, open_, high, low, close, seconds=60):
+        """Prints the next candle; the clock moves on by `seconds` first."""
+        self.clock.set(self.clock.time() + seconds)
+        self.state.register_market_data("NIFTY", {"open": open_, "high": high, "low": low, "close": close, "volume": 1e6})
+        return self.orders.check_orders()
+
+    def submit(self, side, order_type="MARKET", price=None, **extra):
+        signal = {"symbol": "NIFTY", "signal_type": side, "price": 100.0, "confidence": 0.9, **extra}
+        if order_type != "MARKET":
+            signal.update(order_type=order_type, order_price=price)
+        return self.orders.submit(signal)
+
+
+@pytest.fixture
+def market():
+    return Market()
+
+
+def test_buy_limit_fills_at_its_level_once_the_low_reaches_it(market):
+    order = market.submit("BUY", "LIMIT", 99.0)
+    assert market.bar(100.0, 100.5, 99.5, 100.0) == []
+    [trade] = market.bar(100.0, 100.5, 98.5, 100.0)
+    assert (trade.direction, trade.entry_price) == ("BUY", 99.0)
+    assert order.status == "FILLED"
+    assert market.orders.orders == {}
+
+
+def test_order_never_fills_on_the_bar_it_was_placed_on(market):
+    market.bar(100.0, 100.5, 98.0, 100.0)
+    order = market.submit("BUY", "LIMIT", 99.0)
+    assert market.orders.check_orders() == []
+    assert order.status == "PENDING"
+
+
+def test_gap_through_a_limit_fills_at_the_open(market):
+    market.submit("BUY", "LIMIT", 99.0)
+    [trade] = market.bar(97.0, 98.0, 96.0, 97.5)
+    assert trade.entry_price == 97.0
+
+
+def test_gap_through_a_stop_fills_at_the_open(market):
+    market.submit("BUY", "STOP", 101.0)
+    [trade] = market.bar(103.0, 104.0, 102.5, 103.5)
+    assert trade.entry_price == 103.0
+
+
+def test_up_bar_fills_the_low_side_first(market):
+    market.submit("SELL", "LIMIT", 101.0)
+    market.submit("BUY", "LIMIT", 99.0)
+    trades = market.bar(100.0, 102.0, 98.0, 101.5)  # O -> L -> H -> C
+    assert [(t.direction, t.entry_price) for t in trades] == [("BUY", 99.0), ("SELL", 101.0)]
+
+
+def test_down_bar_fills_the_high_side_first(market):
+    market.submit("BUY", "LIMIT", 99.0)
+    market.submit("SELL", "LIMIT", 101.0)
+    trades = market.bar(100.0, 102.0, 98.0, 98.5)  # O -> H -> L -> C
+    assert [(t.direction, t.entry_price) for t in trades] == [("SELL", 101.0), ("BUY", 99.0)]
+
+
+def test_oco_pair_reached_on_one_bar_fills_only_the_first(market):
+    above, below = market.orders.submit_oco([
+        {"symbol": "NIFTY", "signal_type": "BUY", "price": 100.0, "confidence": 0.9, "order_type": "STOP", "order_price": 101.0},
+        {"symbol": "NIFTY", "signal_type": "SELL", "price": 100.0, "confidence": 0.9, "order_type": "STOP", "order_price": 99.0}
+    ])
+    [trade] = market.bar(100.0, 102.0, 98.0, 101.5)  # Up bar: the low (sell stop) comes first
+    assert (trade.direction, trade.entry_price) == ("SELL", 99.0)
+    assert (below.status, above.status) == ("FILLED", "CANCELLED")
+    assert market.orders.stats["cancelled"] == 1
+    assert market.orders.orders == {} and market.orders._groups == {}
+
+
+def test_bracket_opens_with_its_exits(market):
+    market.orders.submit_bracket({"symbol": "NIFTY", "signal_type": "BUY", "price": 100.0, "confidence": 0.9},
+                                 "LIMIT", 99.0, stop_loss=97.0, take_profit=103.0)
+    [trade] = market.bar(100.0, 100.0, 98.5, 99.5)
+    assert (trade.stop_loss, trade.take_profit) == (97.0, 103.0)
+
+
+def test_unfilled_order_expires(market):
+    order = market.submit("BUY", "LIMIT", 90.0, expiry=market.clock.time() + 90)
+    market.bar(100.0, 100.5, 99.5, 100.0)
+    assert order.status == "PENDING"
+    market.bar(100.0, 100.5, 99.5, 100.0)
+    assert order.status == "EXPIRED"
+    assert market.orders.orders == {}
+
+
+def test_refused_fill_is_marked_rejected(market):
+    market.execution.min_confidence = 0.95
+    order = market.submit("BUY", "LIMIT", 99.0)
+    assert market.bar(100.0, 100.0, 98.0, 99.0) == []
+    assert (order.status, order.reason) == ("REJECTED", "LOW_CONFIDENCE")
+
+
+def test_latency_holds_a_market_order_until_the_first_candle_after_it_arrives():
+    market = Market(latency=2.0)
+    order = market.submit("BUY")
+    assert order.order_type == "MARKET" and order.status == "PENDING"
+    assert market.orders.check_orders() == []
+    assert market.bar(100.5, 101.0, 100.0, 100.8, seconds=1) == []   # Printed while the order was in flight
+    assert market.bar(100.8, 101.0, 100.6, 100.9, seconds=0) == []   # Same second, still in flight
+    market.clock.set(market.clock.time() + 5)
+    assert market.orders.check_orders() == []                        # Arrived, but nothing new has printed
+    [trade] = market.bar(101.5, 102.0, 101.0, 101.8, seconds=0)
+    assert trade.entry_price == 101.5
+    assert order.status == "FILLED"
+
+
+def test_pending_orders_survive_a_restart(market):
+    market.submit("BUY", "LIMIT", 99.0, oco="G1")
+    market.submit("SELL", "LIMIT", 101.0, oco="G1")
+    restored = OrderEngine(market.execution, state=market.state, clock=market.clock)
+    assert sorted(o.price for o in restored.orders.values()) == [99.0, 101.0]
+    assert restored._groups == {"G1": set(restored.orders)}
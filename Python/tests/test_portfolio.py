@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from the.backtest import BacktestRecorder
+from the.clock import SimulatedClock
+from the.portfolio import StrategyBook
+
+START = datetime(2025, 1, 6, 9, 15).timestamp()
+
+
+def test_book_entry_is_sized_against_the_scans_candle_volume():
+    book = StrategyBook("momentum", {"capital": 1e6, "fill_model": "nse_intraday"},
+                        event_logger=BacktestRecorder(), clock=SimulatedClock(START), persist=False)
+    candle = {"open": 100.0, "high": 100.0, "low": 100.0, "close": 100.0, "volume": 25}
+    signal = {"symbol": "NIFTY", "signal_type": "BUY", "price": 100.0, "confidence": 0.9}
+    assert book.on_tick([signal], "LIVE_MARKET", {"NIFTY": candle}) == 1
+    [trade] = book.state.snapshot()["active_trades"].values()
+    assert trade["quantity"] == 2  # 10% of the candle's 25 units, not the 100 the risk budget allows
@@ -0,0 +1,90 @@
+import pytest
+
+from the.position_book import PositionBook, STOP, TARGET
+
+
+def trade(direction="BUY", quantity=1, entry_price=100.0, symbol="NIFTY"):
+    return {"symbol": symbol, "direction": direction, "quantity": quantity, "entry_price": entry_price}
+
+
+def test_ladder_bisect_takes_only_levels_the_bar_reached():
+    book = PositionBook()
+    for i, stop in enumerate((95.0, 96.0, 97.0)):
+        book.add(f"L{i}", trade(), stop=stop)
+    for i, target in enumerate((105.0, 106.0)):
+        book.add(f"T{i}", trade(), target=target)
+    hits = book.on_candle("NIFTY", 100.0, 105.0, 96.0, 100.0)
+    assert sorted(hits) == [("L1", STOP, 96.0), ("L2", STOP, 97.0), ("T0", TARGET, 105.0)]
+
+
+def test_bar_inside_every_level_hits_nothing():
+    book = PositionBook()
+    book.add("A", trade(), stop=95.0, target=105.0)
+    assert book.on_candle("NIFTY", 100.0, 104.99, 95.01, 101.0) == []
+
+
+def test_up_bar_reaches_the_low_first():
+    # Closed up: O -> L -> H -> C, so a long's stop fills before its target
+    book = PositionBook()
+    book.add("A", trade(), stop=95.0, target=105.0)
+    assert book.on_candle("NIFTY", 100.0, 106.0, 94.0, 104.0) == [("A", STOP, 95.0)]
+
+
+def test_down_bar_reaches_the_high_first():
+    # Closed down: O -> H -> L -> C, so a long's target fills before its stop
+    book = PositionBook()
+    book.add("A", trade(), stop=95.0, target=105.0)
+    assert book.on_candle("NIFTY", 100.0, 106.0, 94.0, 96.0) == [("A", TARGET, 105.0)]
+
+
+def test_short_uses_the_mirrored_ladders():
+    book = PositionBook()
+    book.add("S", trade("SELL"), stop=105.0, target=95.0)
+    assert book.on_candle("NIFTY", 100.0, 106.0, 94.0, 104.0) == [("S", TARGET, 95.0)]
+    assert book.on_candle("NIFTY", 100.0, 106.0, 94.0, 96.0) == [("S", STOP, 105.0)]
+
+
+def test_gap_through_the_stop_fills_at_the_open():
+    book = PositionBook()
+    book.add("A", trade(), stop=95.0, target=105.0)
+    assert book.on_candle("NIFTY", 90.0, 92.0, 89.0, 91.0) == [("A", STOP, 90.0)]
+
+
+def test_gap_beats_a_level_reached_later_in_the_bar():
+    # Opened through the target, so it fills at the open even though the bar then falls through the stop
+    book = PositionBook()
+    book.add("A", trade(), stop=95.0, target=105.0)
+    assert book.on_candle("NIFTY", 107.0, 108.0, 94.0, 94.5) == [("A", TARGET, 107.0)]
+
+
+def test_remove_takes_the_trade_off_both_ladders():
+    book = PositionBook()
+    book.add("A", trade(), stop=95.0, target=105.0)
+    book.add("B", trade(), stop=95.0, target=105.0)
+    assert book.remove("A")
+    assert not book.remove("A")
+    assert book.on_candle("NIFTY", 100.0, 106.0, 94.0, 104.0) == [("B", STOP, 95.0)]
+
+
+def test_unrealized_pnl_follows_the_net_position():
+    book = PositionBook()
+    book.add("L", trade("BUY", quantity=2), stop=90.0)
+    book.add("S", trade("SELL", quantity=1))
+    book.add("X", trade("BUY", quantity=1, entry_price=50.0, symbol="BTCUSDT"))
+    book.on_price("NIFTY", 110.0)
+    book.on_price("BTCUSDT", 40.0)
+    assert book.pnl("L") == pytest.approx(20.0)
+    assert book.pnl("S") == pytest.approx(-10.0)
+    assert book.unrealized_pnl == pytest.approx(20.0 - 10.0 - 10.0)
+    book.remove("X")
+    assert book.unrealized_pnl == pytest.approx(10.0)
+
+
+def test_ratchet_only_tightens_the_trail():
+    book = PositionBook()
+    book.add("A", trade(), stop=95.0, trail=5.0)
+    assert book.ratchet("NIFTY", 103.0, 99.0) == 1
+    assert book.levels("A") == (98.0, None)
+    assert book.ratchet("NIFTY", 101.0, 97.0) == 0
+    assert book.levels("A") == (98.0, None)
+    assert book.on_candle("NIFTY", 100.0, 101.0, 97.5, 98.5) == [("A", STOP, 98.0)]
@@ -0,0 +1,216 @@
+"""
+FILE: alert_queue.py
+TYPE: TradingView Webhook Alert Queue (Lock-Free Hand-Off)
+
+Alerts posted to /webhook/tradingview are validated, deduplicated and appended
+to a collections.deque; the trading engine's alert stage pops them into the
+execution path. deque.append / popleft are atomic, so neither side takes a
+lock and the webhook answers as soon as the alert is appended. The consumer
+sleeps on an asyncio.Event that producers set (thread-safely) only while it
+is idle.
+
+TradingView cannot add headers to a webhook, so the shared secret travels in
+the alert message itself:
+    {"secret": "...", "id": "{{strategy.order.id}}-{{timenow}}", "ticker": "{{ticker}}",
+     "action": "{{strategy.order.action}}", "price": {{close}}, "time": "{{timenow}}"}
+
+Optional order fields: "order_type" (market / limit / stop) with "order_price"
+(or "limit_price" / "stop_price"), a bracket's "stop_loss" / "take_profit"
+(or "sl" / "tp") and "trailing_atr" (trail N x ATR), and "oco" to group
+orders so the first fill cancels the rest.
+"""
+import os
+import hmac
+import time
+import asyncio
+import logging
+import hashlib
+from collections import deque, OrderedDict
+from datetime import datetime, timedelta
+
+from the.metrics import registry
+
+logger = logging.getLogger("AlertQueue")
+
+ACTIONS = {"buy": "BUY", "long": "BUY", "sell": "SELL", "short": "SELL"}
+ORDER_TYPES = {"market": "MARKET", "limit": "LIMIT", "stop": "STOP"}
+
+
+def _number(payload, *keys):
+    for key in keys:
+        if payload.get(key) is not None:
+            return float(payload[key])
+    return None
+
+
+def parse_alert(payload):
+    """Normalizes an alert payload; raises ValueError when it cannot become a trade signal."""
+    if not isinstance(payload, dict):
+        raise ValueError("Alert must be a JSON object")
+    symbol = str(payload.get("ticker") or payload.get("symbol") or "").strip()
+    if not symbol:
+        raise ValueError("Alert has no ticker")
+    action = ACTIONS.get(str(payload.get("action") or payload.get("signal") or "").lower())
+    if action is None:
+        raise ValueError(f"Unknown action '{payload.get('action')}' (expected buy/sell/long/short)")
+    order_type = ORDER_TYPES.get(str(payload.get("order_type") or "market").lower())
+    if order_type is None:
+        raise ValueError(f"Unknown order_type '{payload.get('order_type')}' (expected market/limit/stop)")
+    try:
+        price = _number(payload, "price")
+        confidence = float(payload.get("confidence", 1.0))
+        order_price = _number(payload, "order_price", "limit_price" if order_type == "LIMIT" else "stop_price")
+        stop_loss = _number(payload, "stop_loss", "sl")
+        take_profit = _number(payload, "take_profit", "tp")
+        trailing_atr = _number(payload, "trailing_atr")
+    except (TypeError, ValueError):
+        raise ValueError("price, confidence and order levels must be numbers")
+    if order_type != "MARKET" and order_price is None:
+        raise ValueError(f"A {order_type.lower()} alert needs an order_price")
+    alert_time = str(payload.get("time") or datetime.now().isoformat())
+    # Without an explicit id, the same ticker/action/bar time is treated as the same alert
+    alert_id = str(payload.get("id") or hashlib.sha1(f"{symbol}|{action}|{alert_time}".encode()).hexdigest()[:16])
+    return {
+        "id": alert_id,
+        "symbol": symbol,
+        "signal_type": action,
+        "price": price,
+        "confidence": confidence,
+        "time": alert_time,
+        "strategy": payload.get("strategy"),
+        "comment": payload.get("comment"),
+        "order_type": order_type,
+        "order_price": order_price,
+        "stop_loss": stop_loss,
+        "take_profit": take_profit,
+        "trailing_atr": trailing_atr,
+        "oco": str(payload["oco"]) if payload.get("oco") else None
+    }
+
+
+def alert_to_signal(alert, state=None):
+    """The alert in MarketSignalEngine's signal layout, ready for ExecutionEngine.execute_trade."""
+    price = alert["price"]
+    if price is None and state is not None:
+        price = state.get_market_price(alert["symbol"])
+    source = f"TradingView alert{' (' + alert['strategy'] + ')' if alert.get('strategy') else ''}"
+    return {
+        "symbol": alert["symbol"],
+        "signal_type": alert["signal_type"],
+        "confidence": round(alert["confidence"], 2),
+        "regime": "EXTERNAL",
+        "reason": f"{source}: {alert['signal_type']} {alert['symbol']}" + (f" - {alert['comment']}" if alert.get("comment") else ""),
+        "price": price,
+        "indicators": {},
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "expiry": (datetime.now() + timedelta(minutes=5)).isoformat(),
+        "alert_id": alert["id"],
+        "order_type": alert.get("order_type", "MARKET"),
+        "order_price": alert.get("order_price"),
+        "stop_loss": alert.get("stop_loss"),
+        "take_profit": alert.get("take_profit"),
+        "trailing_atr": alert.get("trailing_atr"),
+        "oco": alert.get("oco")
+    }
+
+
+class AlertQueue:
+    CAPACITY = 10000        # Alerts waiting for the engine before new ones are refused
+    DEDUPE_SIZE = 20000     # Recent alert ids remembered for deduplication
+
+    def __init__(self, capacity=None, dedupe_size=None):
+        self.capacity = capacity or self.CAPACITY
+        self.dedupe_size = dedupe_size or self.DEDUPE_SIZE
+        self._queue = deque()
+        self._seen = OrderedDict()
+        self._loop = None
+        self._wakeup = None
+        self._waiting = False
+        self.enqueue_latency = registry.histogram("webhook_enqueue_seconds", "Webhook request received -> alert queued")
+        self.queue_latency = registry.histogram("webhook_queue_wait_seconds", "Alert queued -> taken by the trading engine")
+        self.stats = {"received": 0, "queued": 0, "duplicates": 0, "rejected": 0, "unauthorized": 0, "dropped": 0, "consumed": 0}
+        registry.gauge("webhook_queue_depth", "Alerts waiting for the trading engine", fn=self._queue.__len__)
+        for key in self.stats:
+            registry.counter(f"webhook_alerts_{key}_total", f"TradingView alerts {key}", fn=lambda key=key: self.stats[key])
+
+    # ------------------------------------------------------------------ #
+    # Producer side (webhook)
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def secret():
+        return os.environ.get("TRADINGVIEW_WEBHOOK_SECRET", "")
+
+    def authorized(self, payload):
+        secret = self.secret()
+        supplied = payload.get("secret") or payload.get("passphrase") if isinstance(payload, dict) else None
+        ok = bool(secret) and isinstance(supplied, str) and hmac.compare_digest(supplied.encode(), secret.encode())
+        if not ok:
+            self.stats["unauthorized"] += 1
+        return ok
+
+    def submit(self, payload, received_at=None):
+        """
+        Validates and enqueues one alert. Returns (status, alert) with status
+        "queued", "duplicate" or "dropped" (queue full); raises ValueError for bad payloads.
+        """
+        received_at = received_at or time.perf_counter()
+        self.stats["received"] += 1
+        try:
+            alert = parse_alert(payload)
+        except ValueError:
+            self.stats["rejected"] += 1
+            raise
+        if self._seen.setdefault(alert["id"], received_at) != received_at:
+            self.stats["duplicates"] += 1
+            return "duplicate", alert
+        while len(self._seen) > self.dedupe_size:
+            self._seen.popitem(last=False)
+        if len(self._queue) >= self.capacity:
+            self.stats["dropped"] += 1
+            del self._seen[alert["id"]]  # Let TradingView's next attempt through
+            return "dropped", alert
+        now = time.perf_counter()
+        self._queue.append((now, alert))
+        self.enqueue_latency.observe(now - received_at)
+        self.stats["queued"] += 1
+        if self._waiting:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return "queued", alert
+
+    # ------------------------------------------------------------------ #
+    # Consumer side (trading engine)
+    # ------------------------------------------------------------------ #
+    def drain(self, limit=None):
+        """Pops everything queued (or up to `limit`) without waiting."""
+        alerts = []
+        now = time.perf_counter()
+        while self._queue and (limit is None or len(alerts) < limit):
+            enqueued_at, alert = self._queue.popleft()
+            self.queue_latency.observe(now - enqueued_at)
+            alerts.append(alert)
+        self.stats["consumed"] += len(alerts)
+        return alerts
+
+    async def get_many(self, limit=None):
+        """Waits for at least one alert, then returns all that are queued (up to `limit`)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._wakeup = loop, asyncio.Event()
+        while not self._queue:
+            self._wakeup.clear()
+            self._waiting = True
+            # Re-check after announcing we are waiting, so an append in between is not missed
+            if not self._queue:
+                await self._wakeup.wait()
+            self._waiting = False
+        return self.drain(limit)
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            "depth": len(self._queue),
+            "enqueue_latency": self.enqueue_latency.summary(),
+            "queue_latency": self.queue_latency.summary()
+        }
+
+alert_queue = AlertQueue()
@@ -0,0 +1,187 @@
+"""
+FILE: audit_query.py
+TYPE: Audit Query Service (Read-Only, Keyset-Paginated)
+
+Filtered, paginated reads over trading_bot_audit.db for post-mortems.
+Pages are ordered by (time column, rowid) and continue from an opaque cursor
+instead of OFFSET, so page N costs the same as page 1 and every query is a
+walk over one of the indexes declared in event_logger.SCHEMA_QUERIES.
+Connections are opened read-only (mode=ro) and pooled, so queries never
+contend with the EventLogger writer beyond normal WAL reads.
+"""
+import json
+import queue
+import base64
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+
+logger = logging.getLogger("AuditQuery")
+
+# table -> time column used for range filters and ordering, and the columns allowed as equality filters
+AUDIT_TABLES = {
+    "signals": {"time": "timestamp", "filters": ("symbol", "signal_type", "regime")},
+    "trades": {"time": "entry_time", "filters": ("symbol", "status", "direction", "mode")},
+    "system_logs": {"time": "timestamp", "filters": ("level", "module")}
+}
+
+
+def _normalize_time(value):
+    """Accepts any ISO-8601 date/datetime and returns it in the isoformat() layout the tables store."""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid timestamp '{value}' (expected ISO-8601, e.g. 2025-01-31 or 2025-01-31T09:15:00)")
+
+
+def encode_cursor(time_value, rowid):
+    return base64.urlsafe_b64encode(json.dumps([time_value, rowid]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        time_value, rowid = json.loads(base64.urlsafe_b64decode(padded))
+        return time_value, int(rowid)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class AuditQueryService:
+    POOL_SIZE = 4
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+
+    def __init__(self, db_path="trading_bot_audit.db", pool_size=None):
+        self.db_path = db_path
+        self.pool_size = pool_size or self.POOL_SIZE
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ #
+    # Connection pool
+    # ------------------------------------------------------------------ #
+    def _connect(self):
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute("PRAGMA cache_size=-8000")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self.pool_size
+                if grow:
+                    self._created += 1
+            if grow:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._pool.get()
+        broken = False
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            broken = True
+            raise
+        finally:
+            if broken:
+                # Don't hand a possibly broken connection to the next caller
+                conn.close()
+                with self._lock:
+                    self._created -= 1
+            else:
+                self._pool.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+    def _build(self, table, start=None, end=None, cursor=None, limit=None, order="desc", **filters):
+        if table not in AUDIT_TABLES:
+            raise ValueError(f"Unknown audit table '{table}'")
+        spec = AUDIT_TABLES[table]
+        time_col = spec["time"]
+        descending = order.lower() != "asc"
+        limit = max(1, min(int(limit or self.DEFAULT_LIMIT), self.MAX_LIMIT))
+
+        clauses, params = [], []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name not in spec["filters"]:
+                raise ValueError(f"Unknown filter '{name}' for {table} (allowed: {', '.join(spec['filters'])})")
+            clauses.append(f"{name} = ?")
+            params.append(value)
+        if start is not None:
+            clauses.append(f"{time_col} >= ?")
+            params.append(_normalize_time(start))
+        if end is not None:
+            clauses.append(f"{time_col} < ?")
+            params.append(_normalize_time(end))
+        if cursor:
+            # (time, rowid) keyset; the bare bound on the time column keeps the index range tight
+            cursor_time, cursor_rowid = decode_cursor(cursor)
+            op = "<" if descending else ">"
+            clauses.append(f"{time_col} {op}= ? AND ({time_col} {op} ? OR rowid {op} ?)")
+            params.extend([cursor_time, cursor_time, cursor_rowid])
+
+        direction = "DESC" if descending else "ASC"
+        sql = f"SELECT rowid AS _rowid, * FROM {table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {time_col} {direction}, rowid {direction} LIMIT ?"
+        params.append(limit + 1)
+        return sql, params, time_col, limit
+
+    def query(self, table, **kwargs):
+        """
+        Returns {"items": [...], "next_cursor": str | None} for one page of `table`.
+        Keyword arguments: start (inclusive) / end (exclusive) ISO times, cursor,
+        limit, order ("desc" or "asc"), plus equality filters on the table's
+        allowed columns (None values are ignored).
+        """
+        sql, params, time_col, limit = self._build(table, **kwargs)
+        with self.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        items = []
+        for row in rows[:limit]:
+            item = dict(row)
+            item.pop("_rowid")
+            items.append(item)
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last[time_col], last["_rowid"])
+        return {"items": items, "next_cursor": next_cursor}
+
+    def explain(self, table, **kwargs):
+        """SQLite's query plan for the same arguments, to confirm an index is used."""
+        sql, params, _, _ = self._build(table, **kwargs)
+        with self.connection() as conn:
+            return [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+audit_queries = AuditQueryService()
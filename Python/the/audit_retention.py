@@ -0,0 +1,252 @@
+"""
+FILE: audit_retention.py
+TYPE: Audit Retention & Compaction (Background Job)
+
+Keeps trading_bot_audit.db from growing without bound:
+  1. Rollup  - INFO system_logs rows (heartbeats, signal narration) older than
+               ROLLUP_AFTER_DAYS collapse into per-minute counts in system_logs_rollup.
+  2. Archive - rows older than ARCHIVE_AFTER_DAYS move to monthly archive files
+               (audit_archive/trading_bot_audit_YYYY-MM.db, same schema) via ATTACH.
+               Open trades stay put.
+  3. Vacuum  - freed pages are returned with PRAGMA incremental_vacuum.
+
+Every step works in small chunks, each its own short transaction, with a pause
+in between, so the EventLogger writer only ever waits milliseconds for the lock
+(well inside its busy_timeout).
+
+Usage:
+    python -m the.audit_retention --once
+    python -m the.audit_retention --convert-vacuum   # one-time: enable incremental vacuum on an existing DB
+"""
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from the.event_logger import SCHEMA_QUERIES
+
+logger = logging.getLogger("AuditRetention")
+
+# table -> (time column, extra condition for rows that may be archived)
+ARCHIVE_TABLES = {
+    "system_logs": ("timestamp", ""),
+    "system_logs_rollup": ("minute", ""),
+    "signals": ("timestamp", ""),
+    "trades": ("entry_time", "status = 'CLOSED'")
+}
+
+ROLLUP_QUERY = """
+    INSERT INTO system_logs_rollup (minute, level, module, count, first_timestamp, last_timestamp, sample_message)
+    SELECT substr(timestamp, 1, 16), level, module, COUNT(*), MIN(timestamp), MAX(timestamp), MAX(message)
+    FROM system_logs WHERE id IN (SELECT value FROM json_each(?))
+    GROUP BY substr(timestamp, 1, 16), level, module
+    ON CONFLICT (minute, level, module) DO UPDATE SET
+        count = count + excluded.count,
+        first_timestamp = MIN(first_timestamp, excluded.first_timestamp),
+        last_timestamp = MAX(last_timestamp, excluded.last_timestamp)
+"""
+
+
+class AuditRetentionJob:
+    ROLLUP_AFTER_DAYS = int(os.environ.get("AUDIT_ROLLUP_DAYS", 7))
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("AUDIT_ARCHIVE_DAYS", 30))
+    ROLLUP_LEVELS = ("INFO",)
+    ARCHIVE_DIR = "audit_archive"
+    RUN_INTERVAL = 3600.0     # Seconds between runs
+    FIRST_RUN_DELAY = 60.0    # Let startup traffic settle first
+    CHUNK_ROWS = 2000         # Rows per transaction
+    CHUNK_PAUSE = 0.05        # Gap between transactions for the EventLogger writer
+    VACUUM_PAGES = 1000       # Pages freed per incremental_vacuum step
+
+    def __init__(self, db_path="trading_bot_audit.db", archive_dir=None, event_logger=None):
+        self.db_path = db_path
+        self.archive_dir = archive_dir or self.ARCHIVE_DIR
+        self.event_logger = event_logger
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._attached = None
+
+    # ------------------------------------------------------------------ #
+    # Scheduling
+    # ------------------------------------------------------------------ #
+    def start(self, event_logger=None):
+        if event_logger is not None:
+            self.event_logger = event_logger
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._worker, name="AuditRetention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _worker(self):
+        delay = self.FIRST_RUN_DELAY
+        while not self._stop.wait(delay):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Retention run failed: {e}")
+            delay = self.RUN_INTERVAL
+
+    # ------------------------------------------------------------------ #
+    # Steps
+    # ------------------------------------------------------------------ #
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA busy_timeout=5000")
+        for query in SCHEMA_QUERIES:
+            conn.execute(query)
+        conn.commit()
+        return conn
+
+    def _pause(self):
+        if self.CHUNK_PAUSE:
+            time.sleep(self.CHUNK_PAUSE)
+
+    def rollup(self, conn, cutoff):
+        """Collapses old INFO rows into per-minute aggregates. Returns rows rolled up."""
+        levels = ",".join("?" * len(self.ROLLUP_LEVELS))
+        select = f"SELECT id FROM system_logs WHERE level IN ({levels}) AND timestamp < ? ORDER BY timestamp LIMIT ?"
+        total = 0
+        while not self._stop.is_set():
+            ids = [row[0] for row in conn.execute(select, (*self.ROLLUP_LEVELS, cutoff, self.CHUNK_ROWS))]
+            if not ids:
+                break
+            id_list = json.dumps(ids)
+            with conn:
+                conn.execute(ROLLUP_QUERY, (id_list,))
+                conn.execute("DELETE FROM system_logs WHERE id IN (SELECT value FROM json_each(?))", (id_list,))
+            total += len(ids)
+            self._pause()
+        return total
+
+    def _attach(self, conn, month):
+        if self._attached == month:
+            return
+        self._detach(conn)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"trading_bot_audit_{month}.db")
+        conn.execute("ATTACH DATABASE ? AS archive", (path,))
+        # Same tables and indexes as the live DB, created inside the archive schema
+        for query in SCHEMA_QUERIES:
+            conn.execute(re.sub(r"IF NOT EXISTS (\w+)", r"IF NOT EXISTS archive.\1", query, count=1))
+        conn.commit()
+        self._attached = month
+
+    def _detach(self, conn):
+        if self._attached is not None:
+            conn.execute("DETACH DATABASE archive")
+            self._attached = None
+
+    def archive(self, conn, cutoff):
+        """Moves rows older than the cutoff into monthly archive files. Returns rows moved per table."""
+        moved = {}
+        try:
+            for table, (time_col, condition) in ARCHIVE_TABLES.items():
+                where = f"{time_col} < ?" + (f" AND {condition}" if condition else "")
+                select = f"SELECT rowid, {time_col} FROM {table} WHERE {where} ORDER BY {time_col} LIMIT ?"
+                moved[table] = 0
+                while not self._stop.is_set():
+                    rows = conn.execute(select, (cutoff, self.CHUNK_ROWS)).fetchall()
+                    if not rows:
+                        break
+                    by_month = {}
+                    for rowid, stamp in rows:
+                        by_month.setdefault(stamp[:7], []).append(rowid)
+                    for month, rowids in by_month.items():
+                        self._attach(conn, month)
+                        id_list = json.dumps(rowids)
+                        # Copy and delete commit separately (WAL makes cross-file commits non-atomic);
+                        # a crash in between leaves a duplicate that INSERT OR IGNORE absorbs next run
+                        with conn:
+                            conn.execute(f"INSERT OR IGNORE INTO archive.{table} SELECT * FROM main.{table} WHERE rowid IN (SELECT value FROM json_each(?))", (id_list,))
+                        with conn:
+                            conn.execute(f"DELETE FROM main.{table} WHERE rowid IN (SELECT value FROM json_each(?))", (id_list,))
+                        moved[table] += len(rowids)
+                        self._pause()
+        finally:
+            self._detach(conn)
+        return moved
+
+    def vacuum(self, conn):
+        """Returns free pages to the filesystem a slice at a time. Returns pages freed."""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            logger.info("auto_vacuum is not INCREMENTAL on this database; run with --convert-vacuum once to enable it")
+            return 0
+        initial = free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while free and not self._stop.is_set():
+            # executescript steps the pragma to completion; execute() would free a single page
+            conn.executescript(f"PRAGMA incremental_vacuum({self.VACUUM_PAGES});")
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            self._pause()
+        conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        return initial - free
+
+    def run_once(self, now=None):
+        now = now or datetime.now()
+        started = time.perf_counter()
+        conn = self._connect()
+        try:
+            rolled = self.rollup(conn, (now - timedelta(days=self.ROLLUP_AFTER_DAYS)).isoformat())
+            moved = self.archive(conn, (now - timedelta(days=self.ARCHIVE_AFTER_DAYS)).isoformat())
+            freed = self.vacuum(conn)
+        finally:
+            conn.close()
+        summary = {
+            "rolled_up": rolled,
+            "archived": moved,
+            "pages_freed": freed,
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "finished": datetime.now().isoformat()
+        }
+        self.last_run = summary
+        message = f"Retention: rolled up {rolled} log rows, archived {sum(moved.values())} rows, freed {freed} pages"
+        logger.info(message)
+        if self.event_logger is not None:
+            self.event_logger.log_system_event("INFO", "AuditRetention", message, summary)
+        return summary
+
+    def convert_to_incremental_vacuum(self):
+        """One-time, blocking full VACUUM that switches an existing DB to auto_vacuum=INCREMENTAL."""
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        finally:
+            conn.close()
+
+audit_retention = AuditRetentionJob()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roll up, archive and vacuum the audit database")
+    parser.add_argument("--db", default="trading_bot_audit.db")
+    parser.add_argument("--archive-dir", default=AuditRetentionJob.ARCHIVE_DIR)
+    parser.add_argument("--rollup-days", type=int, default=AuditRetentionJob.ROLLUP_AFTER_DAYS)
+    parser.add_argument("--archive-days", type=int, default=AuditRetentionJob.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--once", action="store_true", help="Run one pass now (default)")
+    parser.add_argument("--convert-vacuum", action="store_true", help="Enable incremental vacuum on an existing DB (blocking VACUUM)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    job = AuditRetentionJob(args.db, args.archive_dir)
+    job.ROLLUP_AFTER_DAYS = args.rollup_days
+    job.ARCHIVE_AFTER_DAYS = args.archive_days
+    job.CHUNK_PAUSE = 0
+    if args.convert_vacuum:
+        print("auto_vacuum=INCREMENTAL" if job.convert_to_incremental_vacuum() else "Conversion failed")
+    print(json.dumps(job.run_once(), indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+FILE: backtest.py
+TYPE: Historical Replay (Backtesting)
+
+Replays OHLCV bars from CSV/Parquet through the live MarketSignalEngine,
+ExecutionEngine, OrderEngine and TradeManagementEngine code paths at full CPU speed:
+simulated bar time instead of the wall clock, no sleeps, and an isolated
+in-memory StateManager instead of bot_state.json.
+
+Usage:
+    python -m the.backtest data/NIFTY.csv data/BANKNIFTY.parquet --balance 500000 --output report.json
+    python -m the.backtest --archive NIFTY,BANKNIFTY --start 2025-01-01 --end 2025-02-01
+    python -m the.backtest data/NIFTY.csv --fill-model ideal   # frictionless fills, no fees
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from the.clock import SimulatedClock
+from the.state_manager import StateManager
+from the.candle_store import CandleStore
+from the.candle_archive import CandleArchive, candle_archive
+from the.indicators import IndicatorEngine
+from the.session_engine import MarketSessionEngine
+from the.market_data_and_signal import MarketSignalEngine
+from the.trade_execution_and_mode import ExecutionEngine
+from the.trade_management_and_risk import TradeManagementEngine
+from the.order_engine import OrderEngine
+from the.fill_model import FillModel, fill_model as default_fill_model
+
+logger = logging.getLogger("Backtest")
+
+BAR_FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+
+
+def load_bars(path, symbol=None):
+    """
+    Loads one CSV or Parquet file into {symbol: {field: np.ndarray}}.
+    A 'symbol' column splits the file per symbol; otherwise the symbol defaults
+    to the file name stem. Timestamps become epoch seconds.
+    """
+    import pandas as pd
+
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path)
+    df.columns = [c.lower() for c in df.columns]
+    if "volume" not in df.columns:
+        df["volume"] = 0.0
+
+    ts = df["timestamp"]
+    if pd.api.types.is_numeric_dtype(ts):
+        epochs = ts.to_numpy(dtype=np.float64)
+    else:
+        # Naive timestamps are treated as local time, like the live feed's datetime.now()
+        parsed = pd.to_datetime(ts)
+        epochs = np.array([t.timestamp() for t in parsed.dt.to_pydatetime()], dtype=np.float64)
+    df["timestamp"] = epochs
+
+    if "symbol" in df.columns and symbol is None:
+        groups = df.groupby("symbol", sort=False)
+    else:
+        name = symbol or os.path.splitext(os.path.basename(path))[0]
+        groups = [(name, df)]
+
+    bars = {}
+    for name, frame in groups:
+        frame = frame.sort_values("timestamp", kind="stable")
+        bars[str(name)] = {field: frame[field].to_numpy(dtype=np.float64) for field in BAR_FIELDS}
+    return bars
+
+
+def build_timeline(bars):
+    """
+    Merges every symbol into one time-sorted, all-numeric column set
+    (symbols become integer codes into the returned symbol list).
+    """
+    symbols = list(bars)
+    columns = {field: np.concatenate([bars[s][field] for s in symbols]) for field in BAR_FIELDS}
+    columns["symbol_code"] = np.concatenate([np.full(len(bars[s]["close"]), i, dtype=np.float64) for i, s in enumerate(symbols)])
+    order = np.argsort(columns["timestamp"], kind="stable")
+    return symbols, {name: col[order] for name, col in columns.items()}
+
+
+def load_many(paths):
+    bars = {}
+    for path in paths:
+        bars.update(load_bars(path))
+    return bars
+
+
+def load_archive(symbols, start=None, end=None, root=None):
+    """Bars for each symbol from the candle archive (memory-mapped, only the days in range are read)."""
+    archive = CandleArchive(root, enabled=False) if root else candle_archive
+    bars = {}
+    for symbol in symbols:
+        columns = archive.load_bars(symbol, start, end)
+        if len(columns["close"]):
+            bars[symbol] = columns
+    return bars
+
+
+class BacktestRecorder:
+    """Stands in for EventLogger: keeps the trade ledger in memory and drops everything else."""
+
+    def __init__(self):
+        self.entries = {}
+        self.trades = []
+        self.system_events = 0
+
+    def log_signal(self, sig):
+        pass
+
+    def log_signals(self, signals):
+        pass
+
+    def log_market_state(self, signals, session):
+        pass
+
+    def log_risk_snapshot(self, wallet):
+        pass
+
+    def log_system_event(self, level, module, message, payload=None):
+        self.system_events += 1
+
+    def log_trade_entry(self, trade):
+        self.entries[trade['trade_id']] = trade
+
+    def log_trade_exit(self, trade_id, exit_price, pnl, exit_time):
+        entry = self.entries.pop(trade_id, {})
+        self.trades.append({
+            "trade_id": trade_id,
+            "symbol": entry.get("symbol"),
+            "direction": entry.get("direction"),
+            "quantity": entry.get("quantity"),
+            "entry_price": entry.get("entry_price"),
+            "entry_time": entry.get("timestamp"),
+            "exit_price": exit_price,
+            "exit_time": exit_time,
+            "pnl": pnl
+        })
+
+
+class BacktestEngine:
+    def __init__(self, initial_balance=10000.0, daily_loss_limit=None, respect_sessions=False,
+                 signal_config=None, execution_params=None, risk_params=None, fill_model=None, pretrade_params=None):
+        self.initial_balance = initial_balance
+        self.daily_loss_limit = daily_loss_limit
+        self.respect_sessions = respect_sessions
+        self.signal_config = signal_config or {}
+        self.execution_params = execution_params or {}
+        self.risk_params = risk_params or {}
+        self.pretrade_params = pretrade_params or {}  # PreTradeRisk limits, e.g. {"max_open_positions": 5}
+        self.fill_model = fill_model or default_fill_model
+
+    def _build(self, symbols):
+        self.clock = SimulatedClock()
+        self.state = StateManager(persist=False, track_thinking=False)
+        self.state.update_wallet({"paper_balance": self.initial_balance, "free_balance": self.initial_balance})
+        if self.daily_loss_limit is not None:
+            self.state.set_daily_loss_limit(self.daily_loss_limit)
+        self.recorder = BacktestRecorder()
+        self.market = MarketSignalEngine(
+            dict(self.signal_config, symbols=symbols), state=self.state, event_logger=self.recorder,
+            clock=self.clock, candles=CandleStore(capacity=512), indicators=IndicatorEngine(),
+            archive=CandleArchive(enabled=False)  # Replayed bars must not land in the live archive
+        )
+        self.execution = ExecutionEngine(state=self.state, event_logger=self.recorder, clock=self.clock)
+        self.risk = TradeManagementEngine(self.recorder, state=self.state, clock=self.clock)
+        self.execution.fill_model = self.risk.fill_model = self.fill_model
+        self.orders = OrderEngine(self.execution, state=self.state, clock=self.clock, event_logger=self.recorder)
+        for name, value in self.execution_params.items():
+            setattr(self.execution, name, value)
+        for name, value in self.risk_params.items():
+            setattr(self.risk, name, value)
+        for name, value in self.pretrade_params.items():
+            setattr(self.execution.pretrade, name, value)
+        self.sessions = MarketSessionEngine()
+
+    def run(self, bars):
+        symbols, columns = build_timeline(bars)
+        return self.run_timeline(symbols, columns)
+
+    def run_timeline(self, symbols, columns):
+        """Replays a prepared timeline (see build_timeline); columns may be memory-mapped arrays."""
+        started = time.perf_counter()
+        self._build(symbols)
+        names = np.array(symbols, dtype=object)
+        ts = columns["timestamp"]
+        starts = np.flatnonzero(np.r_[True, ts[1:] != ts[:-1]]) if len(ts) else np.zeros(0, dtype=np.int64)
+        ends = np.r_[starts[1:], len(ts)].astype(np.int64)
+
+        equity_curve = np.empty(len(starts))
+        state = self.state
+        trading_day = None
+        for step, (lo, hi) in enumerate(zip(starts.tolist(), ends.tolist())):
+            bar_time = columns["timestamp"][lo]
+            self.clock.set(bar_time)
+            now = self.clock.now()
+            if now.date() != trading_day:
+                trading_day = now.date()
+                state.reset_daily_counters()
+            if self.respect_sessions:
+                state.set_session(self.sessions.get_current_session(self.sessions.tz.localize(now)))
+            else:
+                state.set_session("LIVE_MARKET")
+
+            batch = {field: columns[field][lo:hi] for field in ("open", "high", "low", "close", "volume")}
+            batch["symbol"] = names[columns["symbol_code"][lo:hi].astype(np.int64)]
+            batch["timestamp"] = now.strftime("%Y-%m-%d %H:%M:%S")
+
+            if self.market.scan_allowed():
+                for sig in self.market.process_batch(batch):
+                    if sig["signal_type"] != "HOLD":
+                        self.orders.submit(sig)
+            else:
+                # Still mark prices so exits are evaluated against the latest bar
+                state.register_market_data_batch({
+                    s: {"symbol": s, "close": c} for s, c in zip(batch["symbol"].tolist(), batch["close"].tolist())
+                })
+            self.orders.check_orders()
+            self.risk.check_exits()
+            wallet = state.get_wallet()
+            equity_curve[step] = wallet["paper_balance"] + wallet.get("unrealized_pnl", 0.0)
+
+        # Anything still open is marked out at the final bar
+        self.risk.close_all_trades("BACKTEST_END")
+        elapsed = time.perf_counter() - started
+        return self.report(equity_curve, columns["timestamp"][starts], len(columns["timestamp"]), elapsed)
+
+    def report(self, equity_curve, times, bar_count, elapsed):
+        trades = self.recorder.trades
+        pnls = np.array([t["pnl"] for t in trades]) if trades else np.zeros(0)
+        final_equity = self.state.get_wallet()["paper_balance"]
+        if len(equity_curve):
+            peaks = np.maximum.accumulate(np.r_[self.initial_balance, equity_curve])
+            drawdowns = peaks - np.r_[self.initial_balance, equity_curve]
+            worst = int(np.argmax(drawdowns))
+            max_drawdown = float(drawdowns[worst])
+            max_drawdown_pct = float(drawdowns[worst] / peaks[worst] * 100) if peaks[worst] else 0.0
+        else:
+            max_drawdown = max_drawdown_pct = 0.0
+        wins = int((pnls > 0).sum())
+        return {
+            "symbols": self.market.symbols,
+            "bars": bar_count,
+            "steps": len(times),
+            "start": datetime.fromtimestamp(times[0]).isoformat() if len(times) else None,
+            "end": datetime.fromtimestamp(times[-1]).isoformat() if len(times) else None,
+            "elapsed_seconds": round(elapsed, 3),
+            "bars_per_second": round(bar_count / elapsed) if elapsed else None,
+            "initial_balance": self.initial_balance,
+            "final_balance": final_equity,
+            "net_pnl": float(pnls.sum()),
+            "max_drawdown": max_drawdown,
+            "max_drawdown_pct": max_drawdown_pct,
+            "trade_count": len(trades),
+            "wins": wins,
+            "losses": int((pnls < 0).sum()),
+            "hit_rate": wins / len(trades) if trades else 0.0,
+            "avg_pnl": float(pnls.mean()) if trades else 0.0,
+            "trades": trades
+        }
+
+
+def format_report(report):
+    return "\n".join([
+        f"Backtest {report['start']} -> {report['end']} ({', '.join(report['symbols'])})",
+        f"Bars: {report['bars']} in {report['elapsed_seconds']}s ({report['bars_per_second']} bars/s)",
+        f"Net PnL: ₹{report['net_pnl']:.2f}  Final balance: ₹{report['final_balance']:.2f}",
+        f"Max drawdown: ₹{report['max_drawdown']:.2f} ({report['max_drawdown_pct']:.2f}%)",
+        f"Trades: {report['trade_count']}  Wins: {report['wins']}  Losses: {report['losses']}  Hit rate: {report['hit_rate']*100:.1f}%"
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay historical OHLCV through the trading engines")
+    parser.add_argument("files", nargs="*", help="CSV or Parquet files (timestamp, open, high, low, close, volume[, symbol])")
+    parser.add_argument("--archive", help="Comma-separated symbols to replay from the candle archive")
+    parser.add_argument("--start", help="Archive range start (ISO date/datetime, inclusive)")
+    parser.add_argument("--end", help="Archive range end (ISO date/datetime, exclusive)")
+    parser.add_argument("--balance", type=float, default=10000.0)
+    parser.add_argument("--daily-loss-limit", type=float, default=None)
+    parser.add_argument("--sessions", action="store_true", help="Only trade inside NSE session hours")
+    parser.add_argument("--fill-model", choices=sorted(FillModel.PRESETS),
+                        help="Spread / slippage / fee preset (default: FILL_MODEL or nse_intraday; 'ideal' = frictionless)")
+    parser.add_argument("--output", help="Write the full report (including trades) as JSON")
+    args = parser.parse_args(argv)
+    if not args.files and not args.archive:
+        parser.error("give CSV/Parquet files or --archive SYMBOLS")
+
+    logging.getLogger("SignalEngine").setLevel(logging.ERROR)
+    logging.getLogger("ExecutionEngine").setLevel(logging.ERROR)
+    logging.getLogger("TradeManager").setLevel(logging.ERROR)
+
+    engine = BacktestEngine(initial_balance=args.balance, daily_loss_limit=args.daily_loss_limit, respect_sessions=args.sessions,
+                            fill_model=FillModel.preset(args.fill_model) if args.fill_model else None)
+    bars = load_many(args.files)
+    if args.archive:
+        bars.update(load_archive(args.archive.split(","), args.start, args.end))
+    report = engine.run(bars)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+FILE: candle_archive.py
+TYPE: On-Disk Candle Archive (Fixed-Width Binary, Memory-Mapped Reads)
+
+Every candle the signal layer sees is appended to
+candle_archive/{symbol}/{YYYY-MM-DD}.bin as a 48-byte little-endian record
+(CANDLE_DTYPE: epoch seconds + OHLCV as float64). Records are fixed width,
+so a file is an array: np.memmap maps it without parsing, any field is a
+column view of the mapping. A crash or a failed write (a full disk) can
+leave a partial last record: readers ignore it, and the next append trims
+the file back to a whole number of records first, so it never shifts the
+records written after it.
+
+Appends are buffered in memory and written by a background thread once per
+FLUSH_INTERVAL, so the trading thread never touches the disk.
+"""
+import os
+import atexit
+import logging
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from the.candle_store import to_epoch
+
+logger = logging.getLogger("CandleArchive")
+
+CANDLE_DTYPE = np.dtype([
+    ("ts", "<f8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8")
+])
+
+
+def _as_date(value):
+    if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value).date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def _as_epoch(value):
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime.combine(value, datetime.min.time()).timestamp()
+    return to_epoch(value)
+
+
+class CandleArchive:
+    ROOT = "candle_archive"
+    FLUSH_INTERVAL = 1.0  # Seconds a candle may sit in memory before it is written
+
+    def __init__(self, root=None, enabled=True):
+        self.root = root or self.ROOT
+        self.enabled = enabled
+        self._pending = {}  # (symbol, day) -> list of record tuples
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._day = None
+        self._day_range = (0.0, 0.0)
+        self._thread = None
+        self._stop = threading.Event()
+        self.stats = {"appended": 0, "written": 0, "flushes": 0, "errors": 0}
+
+    # ------------------------------------------------------------------ #
+    # Writing
+    # ------------------------------------------------------------------ #
+    def _day_of(self, ts):
+        """Local trading day of an epoch timestamp; the day boundaries are cached."""
+        lo, hi = self._day_range
+        if not lo <= ts < hi:
+            day = datetime.fromtimestamp(ts).date()
+            start = datetime.combine(day, datetime.min.time()).timestamp()
+            self._day = day.isoformat()
+            self._day_range = (start, datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp())
+        return self._day
+
+    def _ensure_writer(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name="CandleArchiveWriter", daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def append(self, symbol, ts, open_, high, low, close, volume):
+        if not self.enabled:
+            return
+        ts = to_epoch(ts)
+        with self._lock:
+            self._pending.setdefault((symbol, self._day_of(ts)), []).append((ts, open_, high, low, close, volume))
+            self.stats["appended"] += 1
+            self._ensure_writer()
+
+    def append_batch(self, symbols, ts, opens, highs, lows, closes, volumes):
+        """One scan's candles (all sharing a timestamp); columns may be lists or arrays."""
+        if not self.enabled or not len(symbols):
+            return
+        ts = to_epoch(ts)
+        with self._lock:
+            day = self._day_of(ts)
+            pending = self._pending
+            for i, symbol in enumerate(symbols):
+                pending.setdefault((symbol, day), []).append((ts, opens[i], highs[i], lows[i], closes[i], volumes[i]))
+            self.stats["appended"] += len(symbols)
+            self._ensure_writer()
+
+    def _writer(self):
+        while not self._stop.wait(self.FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        """Writes every buffered candle to its symbol/day file."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        with self._io_lock:
+            for (symbol, day), rows in pending.items():
+                path = self.path(symbol, day)
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, "ab") as f:
+                        size = f.seek(0, os.SEEK_END)
+                        if size % CANDLE_DTYPE.itemsize:
+                            f.truncate(size - size % CANDLE_DTYPE.itemsize)
+                            logger.warning(f"Dropped a partial record at the end of {path}")
+                        np.array(rows, dtype=CANDLE_DTYPE).tofile(f)
+                    self.stats["written"] += len(rows)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.error(f"Candle archive write failed for {path}: {e}")
+            self.stats["flushes"] += 1
+
+    def shutdown(self):
+        self._stop.set()
+        self.flush()
+
+    # ------------------------------------------------------------------ #
+    # Reading
+    # ------------------------------------------------------------------ #
+    def path(self, symbol, day):
+        return os.path.join(self.root, symbol, f"{_as_date(day).isoformat()}.bin")
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def days(self, symbol):
+        folder = os.path.join(self.root, symbol)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(date.fromisoformat(name[:-4]) for name in os.listdir(folder) if name.endswith(".bin"))
+
+    def read_day(self, symbol, day):
+        """Memory-maps one day (read-only, no copy). Empty array if the day has no file."""
+        path = self.path(symbol, day)
+        try:
+            count = os.path.getsize(path) // CANDLE_DTYPE.itemsize
+        except OSError:
+            count = 0
+        if not count:
+            return np.zeros(0, dtype=CANDLE_DTYPE)
+        return np.memmap(path, dtype=CANDLE_DTYPE, mode="r", shape=(count,))
+
+    def read_range(self, symbol, start=None, end=None):
+        """
+        Candles with start <= ts < end (dates, datetimes, ISO strings or epochs).
+        Only the files of the days in range are mapped; a single day comes back as
+        the mapping itself, several days are concatenated.
+        """
+        first, last = _as_date(start), _as_date(end)
+        days = [d for d in self.days(symbol) if (first is None or d >= first) and (last is None or d <= last)]
+        parts = [self.read_day(symbol, d) for d in days]
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return np.zeros(0, dtype=CANDLE_DTYPE)
+        records = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        lo = np.searchsorted(records["ts"], _as_epoch(start), "left") if start is not None else 0
+        hi = np.searchsorted(records["ts"], _as_epoch(end), "left") if end is not None else len(records)
+        return records[lo:hi]
+
+    def tail(self, symbol, count, day=None):
+        """The last `count` candles of a day (today by default)."""
+        records = self.read_day(symbol, day or date.today())
+        return records[-count:] if count else records[:0]
+
+    def load_bars(self, symbol, start=None, end=None):
+        """Columns in the backtest loader's layout ({field: float64 array}, 'timestamp' as epoch)."""
+        records = self.read_range(symbol, start, end)
+        bars = {field: np.ascontiguousarray(records[field]) for field in ("open", "high", "low", "close", "volume")}
+        bars["timestamp"] = np.ascontiguousarray(records["ts"])
+        return bars
+
+    def export_parquet(self, symbol, dest, start=None, end=None):
+        """Writes a range as Parquet (needs pandas with pyarrow or fastparquet)."""
+        import pandas as pd
+
+        records = self.read_range(symbol, start, end)
+        frame = pd.DataFrame({name: records[name] for name in CANDLE_DTYPE.names})
+        frame.insert(0, "symbol", symbol)
+        # Epoch seconds, which the.backtest.load_bars reads back as-is
+        frame.insert(1, "timestamp", frame.pop("ts"))
+        frame.to_parquet(dest, index=False)
+        return len(frame)
+
+candle_archive = CandleArchive()
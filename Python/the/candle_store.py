@@ -0,0 +1,159 @@
+"""
+FILE: candle_store.py
+TYPE: Market Data History (Rolling OHLCV Buffers)
+
+Fixed-capacity NumPy ring buffers per symbol and timeframe. Each buffer is
+written twice (at i and i + capacity) so the latest N bars are always one
+contiguous slice and can be handed out as zero-copy views.
+"""
+import logging
+from datetime import datetime
+
+import numpy as np
+
+logger = logging.getLogger("CandleStore")
+
+FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+FIELD_INDEX = {name: i for i, name in enumerate(FIELDS)}
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(len(FIELDS))
+
+TIMEFRAMES = {"1m": 60, "5m": 300, "15m": 900}
+
+
+def to_epoch(timestamp):
+    """Accepts epoch seconds, datetime objects or ISO strings ("YYYY-MM-DD HH:MM:SS")."""
+    if isinstance(timestamp, (int, float, np.floating, np.integer)):
+        return float(timestamp)
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+class CandleRingBuffer:
+    def __init__(self, capacity=2048):
+        self.capacity = capacity
+        # Row per field keeps every field contiguous; columns are mirrored at +capacity
+        self._data = np.zeros((len(FIELDS), 2 * capacity), dtype=np.float64)
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, ts, o, h, l, c, v):
+        i = self._head
+        column = (ts, o, h, l, c, v)
+        self._data[:, i] = column
+        self._data[:, i + self.capacity] = column
+        self._head = (i + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def update_last(self, ts, o, h, l, c, v):
+        """Overwrites the most recent bar in place (used for bars that are still forming)."""
+        if not self._count:
+            self.append(ts, o, h, l, c, v)
+            return
+        i = (self._head - 1) % self.capacity
+        column = (ts, o, h, l, c, v)
+        self._data[:, i] = column
+        self._data[:, i + self.capacity] = column
+
+    def last(self, field=None):
+        if not self._count:
+            return None
+        i = (self._head - 1) % self.capacity
+        if field is not None:
+            return float(self._data[FIELD_INDEX[field], i])
+        return {name: float(self._data[j, i]) for j, name in enumerate(FIELDS)}
+
+    def window(self, n=None):
+        """
+        Returns a (fields, n) view over the latest n bars, oldest first.
+        The view is zero-copy: it is only valid until the buffer wraps past it.
+        """
+        n = self._count if n is None else min(n, self._count)
+        end = self._head + self.capacity
+        return self._data[:, end - n:end]
+
+    def field(self, name, n=None):
+        return self.window(n)[FIELD_INDEX[name]]
+
+
+def resample_ohlcv(window, seconds):
+    """
+    Aggregates a (fields, n) OHLCV window into bars of `seconds`, aligned to the epoch.
+    Vectorized with reduceat, so it is suitable for bulk history (backtests, charting).
+    """
+    if window.shape[1] == 0:
+        return np.zeros((len(FIELDS), 0))
+    buckets = window[TS] - np.mod(window[TS], seconds)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], window.shape[1]] - 1
+    out = np.empty((len(FIELDS), len(starts)))
+    out[TS] = buckets[starts]
+    out[OPEN] = window[OPEN, starts]
+    out[HIGH] = np.maximum.reduceat(window[HIGH], starts)
+    out[LOW] = np.minimum.reduceat(window[LOW], starts)
+    out[CLOSE] = window[CLOSE, ends]
+    out[VOLUME] = np.add.reduceat(window[VOLUME], starts)
+    return out
+
+
+class CandleStore:
+    BASE_TIMEFRAME = "1m"
+
+    def __init__(self, capacity=2048, timeframes=None):
+        self.capacity = capacity
+        self.timeframes = dict(timeframes or TIMEFRAMES)
+        self._buffers = {}
+        self._forming = {}  # (symbol, timeframe) -> [bucket, open, high, low, close, volume]
+
+    def buffer(self, symbol, timeframe=None):
+        key = (symbol, timeframe or self.BASE_TIMEFRAME)
+        buf = self._buffers.get(key)
+        if buf is None:
+            buf = self._buffers[key] = CandleRingBuffer(self.capacity)
+        return buf
+
+    def symbols(self):
+        return sorted({symbol for symbol, _ in self._buffers})
+
+    def append(self, symbol, ts, o, h, l, c, v):
+        """O(1): appends to the base buffer and rolls the bar into every higher timeframe."""
+        self.buffer(symbol).append(ts, o, h, l, c, v)
+        for timeframe, seconds in self.timeframes.items():
+            if timeframe == self.BASE_TIMEFRAME:
+                continue
+            bucket = ts - ts % seconds
+            bar = self._forming.get((symbol, timeframe))
+            if bar is not None and bar[0] == bucket:
+                if h > bar[2]: bar[2] = h
+                if l < bar[3]: bar[3] = l
+                bar[4] = c
+                bar[5] += v
+                self.buffer(symbol, timeframe).update_last(*bar)
+            else:
+                bar = self._forming[(symbol, timeframe)] = [bucket, o, h, l, c, v]
+                self.buffer(symbol, timeframe).append(*bar)
+
+    def ingest(self, candle):
+        """Feeds a candle dict as produced by fetch_simulated_ohlc (or any other feed)."""
+        try:
+            self.append(
+                candle["symbol"], to_epoch(candle["timestamp"]),
+                candle["open"], candle["high"], candle["low"], candle["close"], candle.get("volume", 0)
+            )
+        except Exception as e:
+            logger.error(f"Rejected candle for {candle.get('symbol')}: {e}")
+
+    def window(self, symbol, timeframe=None, n=None):
+        return self.buffer(symbol, timeframe).window(n)
+
+    def closes(self, symbol, timeframe=None, n=None):
+        return self.buffer(symbol, timeframe).field("close", n)
+
+    def last(self, symbol, timeframe=None):
+        return self.buffer(symbol, timeframe).last()
+
+candle_store = CandleStore()
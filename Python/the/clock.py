@@ -0,0 +1,36 @@
+"""
+FILE: clock.py
+TYPE: Time Source
+
+Engines ask a clock for the time instead of calling datetime.now() directly,
+so backtests can drive them with simulated bar time.
+"""
+import time
+from datetime import datetime
+
+
+class SystemClock:
+    def now(self):
+        return datetime.now()
+
+    def time(self):
+        return time.time()
+
+
+class SimulatedClock:
+    def __init__(self, start=0.0):
+        self._epoch = float(start)
+        self._now = datetime.fromtimestamp(self._epoch)
+
+    def set(self, epoch_seconds):
+        if epoch_seconds != self._epoch:
+            self._epoch = float(epoch_seconds)
+            self._now = datetime.fromtimestamp(self._epoch)
+
+    def now(self):
+        return self._now
+
+    def time(self):
+        return self._epoch
+
+system_clock = SystemClock()
@@ -1,9 +1,23 @@
 import os
-from fastapi import FastAPI
+import hmac
+import json
+import time
+import asyncio
+from typing import Optional
+from fastapi import FastAPI, APIRouter, Request, HTTPException, Header
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, Response, PlainTextResponse
 from the.state_manager import state_engine
 from the.event_logger import EventLogger
+from the.dashboard_stream import dashboard_publisher
+from the.read_model import read_model
+from the.audit_query import audit_queries
+from the.candle_archive import candle_archive
+from the.alert_queue import alert_queue
+from the.metrics import registry
+from the.sampling_profiler import sampling_profiler
+from the import portfolio
+from the import orchestrator
 from the.telegram_reporter import telegram_reporter
 import uvicorn
 import logging
@@ -11,6 +25,9 @@ import logging
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
+# Routes that drive the trading engine. main.py serves them from the trading process,
+# where the engine runs; a standalone dashboard serves them too but has no engine behind them.
+trading_routes = APIRouter()
 event_logger = EventLogger()
 
 # Absolute path to index.html for reliable serving
@@ -29,30 +46,198 @@ async def trigger_report():
     success = await telegram_reporter.send_report()
     return {"status": "SUCCESS" if success else "FAILED"}
 
+def cached_response(request: Request, name: str):
+    """Serves a read-model resource, or a 304 when the client already holds this version."""
+    etag, body = read_model.get(name)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        read_model.stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/status")
-async def get_status():
-    state = state_engine.get_state()
-    wallet = state.get("wallet", {})
-    return {
-        "status": "ONLINE" if not state["kill_switch"]["full_system_freeze"] else "FREEZE",
-        "mode": state["system_mode"],
-        "active_trades": len(state["active_trades"]),
-        "daily_pnl": state["daily_loss"]["current"],
-        "wallet": wallet,
-        "thinking": state["bot_thinking"]
-    }
+async def get_status(request: Request):
+    return cached_response(request, "status")
 
 @app.get("/logs/recent")
-async def get_recent_logs():
-    return event_logger.get_recent_logs(20)
+async def get_recent_logs(request: Request):
+    return cached_response(request, "logs")
 
 @app.get("/trades/active")
-async def get_active_trades():
-    return list(state_engine.get_state()["active_trades"].values())
+async def get_active_trades(request: Request):
+    return cached_response(request, "trades")
+
+@app.get("/snapshot")
+async def get_snapshot(request: Request):
+    """Status, active trades and recent logs in one payload."""
+    return cached_response(request, "snapshot")
+
+@app.get("/read_model/stats")
+async def read_model_stats():
+    return read_model.get_stats()
+
+@app.get("/stream")
+async def stream():
+    """Server-Sent Events: a snapshot on connect, then state diffs and new log rows."""
+    client = await dashboard_publisher.subscribe()
+
+    async def events():
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(client.get(), timeout=dashboard_publisher.KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            dashboard_publisher.unsubscribe(client)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.get("/stream/stats")
+async def stream_stats():
+    return dashboard_publisher.get_stats()
+
+def audit_page(table, **kwargs):
+    try:
+        return audit_queries.query(table, **kwargs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Audit queries are plain (sync) handlers so SQLite reads run in the threadpool, off the event loop
+@app.get("/audit/signals")
+def audit_signals(start: Optional[str] = None, end: Optional[str] = None, symbol: Optional[str] = None,
+                  signal_type: Optional[str] = None, regime: Optional[str] = None,
+                  cursor: Optional[str] = None, limit: int = 100, order: str = "desc"):
+    return audit_page("signals", start=start, end=end, cursor=cursor, limit=limit, order=order,
+                      symbol=symbol, signal_type=signal_type, regime=regime)
+
+@app.get("/audit/trades")
+def audit_trades(start: Optional[str] = None, end: Optional[str] = None, symbol: Optional[str] = None,
+                 status: Optional[str] = None, direction: Optional[str] = None, mode: Optional[str] = None,
+                 cursor: Optional[str] = None, limit: int = 100, order: str = "desc"):
+    return audit_page("trades", start=start, end=end, cursor=cursor, limit=limit, order=order,
+                      symbol=symbol, status=status, direction=direction, mode=mode)
+
+@app.get("/audit/logs")
+def audit_logs(start: Optional[str] = None, end: Optional[str] = None, level: Optional[str] = None,
+               module: Optional[str] = None, cursor: Optional[str] = None, limit: int = 100, order: str = "desc"):
+    return audit_page("system_logs", start=start, end=end, cursor=cursor, limit=limit, order=order,
+                      level=level, module=module)
+
+@app.get("/candles/{symbol}")
+def get_candles(symbol: str, limit: int = 500, start: Optional[str] = None, end: Optional[str] = None):
+    """Archived candles as columns (chart-ready): the last `limit` of today, or a start/end range."""
+    if symbol not in candle_archive.symbols():
+        raise HTTPException(status_code=404, detail=f"No archived candles for {symbol}")
+    limit = max(1, min(limit, 10000))
+    try:
+        if start or end:
+            records = candle_archive.read_range(symbol, start, end)[-limit:]
+        else:
+            records = candle_archive.tail(symbol, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"symbol": symbol, "count": len(records), **{name: records[name].tolist() for name in records.dtype.names}}
+
+@trading_routes.post("/webhook/tradingview")
+async def tradingview_webhook(request: Request):
+    """Validates, dedupes and queues a TradingView alert; answers without waiting for execution."""
+    received_at = time.perf_counter()
+    if orchestrator.trading_engine is None:
+        # The queue is in-process: an alert accepted here would never reach an alert stage
+        raise HTTPException(status_code=503, detail="No trading engine in this process to consume alerts")
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Alert body must be JSON")
+    if not alert_queue.secret():
+        raise HTTPException(status_code=503, detail="Webhook disabled: TRADINGVIEW_WEBHOOK_SECRET is not set")
+    if not alert_queue.authorized(payload):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    try:
+        status, alert = alert_queue.submit(payload, received_at)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if status == "dropped":
+        raise HTTPException(status_code=503, detail="Alert queue full")
+    return {"status": status, "id": alert["id"]}
+
+@trading_routes.get("/webhook/stats")
+async def webhook_stats():
+    return alert_queue.get_stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of this process's counters, gauges and latency histograms."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/summary")
+def metrics_summary():
+    return registry.snapshot()
+
+@app.get("/portfolio")
+def get_portfolio():
+    """One row per strategy book: live when the engine runs in this process, else from the persisted book files."""
+    engine = portfolio.portfolio_engine
+    books = engine.summary() if engine is not None else portfolio.read_books()
+    return {"count": len(books), "books": books}
+
+def require_admin(token):
+    """Admin endpoints stay closed until ADMIN_TOKEN is set, and then need it in X-Admin-Token."""
+    expected = os.environ.get("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=503, detail="Admin endpoints disabled: ADMIN_TOKEN is not set")
+    if not token or not hmac.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@trading_routes.post("/admin/profiler/start")
+def profiler_start(seconds: float = 10.0, interval_ms: float = 5.0, thread: str = "TradingLoop",
+                   x_admin_token: Optional[str] = Header(None)):
+    """Samples the trading thread for `seconds` (capped), then writes collapsed + speedscope files."""
+    require_admin(x_admin_token)
+    try:
+        return sampling_profiler.start(seconds, interval_ms / 1000, thread)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@trading_routes.post("/admin/profiler/stop")
+def profiler_stop(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    return {"report": sampling_profiler.stop()}
+
+@trading_routes.get("/admin/profiler")
+def profiler_status(x_admin_token: Optional[str] = Header(None)):
+    require_admin(x_admin_token)
+    return sampling_profiler.status()
+
+@trading_routes.post("/portfolio/{book_id}/kill_switch")
+def portfolio_kill_switch(book_id: str, stop: bool = True, x_admin_token: Optional[str] = Header(None)):
+    """Stops (or, with stop=false, resumes) new entries in one book; needs ADMIN_TOKEN like /admin."""
+    require_admin(x_admin_token)
+    engine = portfolio.portfolio_engine
+    if engine is None:
+        raise HTTPException(status_code=409, detail="No portfolio running in this process")
+    if book_id not in engine.books:
+        raise HTTPException(status_code=404, detail=f"Unknown book {book_id}")
+    engine.set_kill_switch(book_id, stop)
+    return engine.books[book_id].summary()
+
+app.include_router(trading_routes)
 
 def start_dashboard_server():
     """Explicitly start the dashboard server (Replit safe)"""
     port = int(os.environ.get("PORT", 5000))
+    # Standalone process: follow the trading process's shared-memory snapshots (bot_state.json until it is up)
+    state_engine.attach_shared()
     print(f"DASHBOARD READY → http://0.0.0.0:{port}")
     uvicorn.run(app, host="0.0.0.0", port=port, log_level="error")
 
@@ -0,0 +1,125 @@
+"""
+FILE: dashboard_stream.py
+TYPE: Live Dashboard Publisher (Server-Sent Events)
+
+One publisher task per process polls the dashboard read model (state version
+and system_logs tail). Each change is diffed and encoded once, then fanned out
+to every connected client's queue, so serving cost follows the rate of changes
+instead of clients x polls. It also works when the dashboard runs in its own
+process: state changes arrive through StateManager's snapshot reload and log
+rows through the shared audit DB.
+"""
+import json
+import asyncio
+import logging
+import threading
+
+from the.read_model import read_model
+
+logger = logging.getLogger("DashboardStream")
+
+
+def diff_view(old, new):
+    """Keys whose value changed; dict sections (wallet, thinking) are diffed one level deeper."""
+    changes = {}
+    for key, value in new.items():
+        before = old.get(key)
+        if value == before:
+            continue
+        if isinstance(value, dict) and isinstance(before, dict):
+            changes[key] = {k: v for k, v in value.items() if before.get(k) != v}
+        else:
+            changes[key] = value
+    return changes
+
+
+def encode_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n".encode()
+
+
+class DashboardPublisher:
+    POLL_INTERVAL = 0.25       # How often state version and log tail are checked
+    KEEPALIVE_INTERVAL = 15.0  # Comment line sent to idle clients so proxies keep the stream open
+    CLIENT_QUEUE_SIZE = 256    # Events a client may fall behind before it is dropped
+
+    def __init__(self, model=None):
+        self.model = model or read_model
+        self.clients = set()
+        self.view = None
+        self.log_id = None
+        self._task = None
+        self._poll_lock = threading.Lock()
+        self.stats = {"polls": 0, "state_events": 0, "log_events": 0, "log_rows": 0, "dropped_clients": 0}
+
+    def _poll(self):
+        """Returns the (event, data) pairs that changed since the previous poll (runs off the event loop)."""
+        with self._poll_lock:
+            self.stats["polls"] += 1
+            events = []
+            self.model.refresh_state()
+            view = self.model.view
+            if view is not self.view:
+                changes = diff_view(self.view, view) if self.view is not None else {}
+                self.view = view
+                if changes:
+                    events.append(("state", changes))
+            # Requests refresh the tail too, so compare against what this publisher last sent
+            self.model.refresh_logs(force=True)
+            if self.log_id is None:
+                logs = self.model.recent_logs()
+                self.log_id = logs[-1]["id"] if logs else 0
+            rows = self.model.logs_since(self.log_id)
+            if rows:
+                self.log_id = rows[-1]["id"]
+                events.append(("logs", rows))
+            return events
+
+    # ------------------------------------------------------------------ #
+    # Fan-out
+    # ------------------------------------------------------------------ #
+    def _broadcast(self, event, data):
+        message = encode_event(event, data)
+        for client in list(self.clients):
+            try:
+                client.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind: end its stream; EventSource reconnects and resyncs from a snapshot
+                self.clients.discard(client)
+                self.stats["dropped_clients"] += 1
+                client.get_nowait()
+                client.put_nowait(None)
+
+    async def _run(self):
+        while self.clients:
+            try:
+                for event, data in await asyncio.to_thread(self._poll):
+                    self._broadcast(event, data)
+                    self.stats["state_events" if event == "state" else "log_events"] += 1
+                    if event == "logs":
+                        self.stats["log_rows"] += len(data)
+            except Exception as e:
+                logger.error(f"Publisher error: {e}")
+            await asyncio.sleep(self.POLL_INTERVAL)
+        # Nobody is watching: stop polling until the next subscriber
+        self._task = None
+
+    async def subscribe(self):
+        if self._task is not None and (self._task.done() or self._task.get_loop() is not asyncio.get_running_loop()):
+            self._task = None
+        if self._task is None:
+            await asyncio.to_thread(self._poll)
+        client = asyncio.Queue(maxsize=self.CLIENT_QUEUE_SIZE)
+        # New clients start from the cached view instead of triggering their own state read
+        client.put_nowait(b"retry: 2000\n" + encode_event("snapshot", {"view": self.view, "logs": self.model.recent_logs()}))
+        self.clients.add(client)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return client
+
+    def unsubscribe(self, client):
+        self.clients.discard(client)
+
+    def get_stats(self):
+        return {**self.stats, "clients": len(self.clients), "state_version": self.model.state_version, "log_id": self.log_id}
+
+dashboard_publisher = DashboardPublisher()
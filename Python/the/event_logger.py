@@ -6,6 +6,7 @@ import os
 import sys
 import json
 import time
+import atexit
 import sqlite3
 import logging
 import threading
@@ -14,6 +15,8 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any, Union
 
 from the.excel_manager import excel_manager
+from the.indicators import describe_indicators
+from the.metrics import registry
 
 # Fallback basic logger
 logging.basicConfig(
@@ -26,12 +29,40 @@ logger = logging.getLogger("EventLogger")
 SCHEMA_QUERIES = [
     """CREATE TABLE IF NOT EXISTS signals (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, symbol TEXT, signal_type TEXT, confidence REAL, regime TEXT, reason TEXT, raw_payload TEXT);""",
     """CREATE TABLE IF NOT EXISTS trades (trade_id TEXT PRIMARY KEY, symbol TEXT, direction TEXT, quantity INTEGER, entry_price REAL, exit_price REAL, pnl REAL DEFAULT 0.0, status TEXT, entry_time TEXT, exit_time TEXT, mode TEXT, strategy_ref TEXT);""",
-    """CREATE TABLE IF NOT EXISTS system_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, level TEXT, module TEXT, message TEXT, payload TEXT);"""
+    """CREATE TABLE IF NOT EXISTS system_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, level TEXT, module TEXT, message TEXT, payload TEXT);""",
+    # Secondary indexes for the audit query API. Each ends in the time column, and SQLite
+    # appends the rowid, so filter + time range + (time, rowid) keyset order is one index walk.
+    """CREATE INDEX IF NOT EXISTS idx_signals_timestamp ON signals (timestamp);""",
+    """CREATE INDEX IF NOT EXISTS idx_signals_symbol_timestamp ON signals (symbol, timestamp);""",
+    """CREATE INDEX IF NOT EXISTS idx_trades_entry_time ON trades (entry_time);""",
+    """CREATE INDEX IF NOT EXISTS idx_trades_symbol_entry_time ON trades (symbol, entry_time);""",
+    """CREATE INDEX IF NOT EXISTS idx_trades_status_entry_time ON trades (status, entry_time);""",
+    """CREATE INDEX IF NOT EXISTS idx_system_logs_timestamp ON system_logs (timestamp);""",
+    """CREATE INDEX IF NOT EXISTS idx_system_logs_module_timestamp ON system_logs (module, timestamp);""",
+    """CREATE INDEX IF NOT EXISTS idx_system_logs_level_timestamp ON system_logs (level, timestamp);""",
+    # Per-minute aggregates of INFO rows rolled up by audit_retention
+    """CREATE TABLE IF NOT EXISTS system_logs_rollup (minute TEXT, level TEXT, module TEXT, count INTEGER, first_timestamp TEXT, last_timestamp TEXT, sample_message TEXT, PRIMARY KEY (minute, level, module));"""
 ]
 
 class EventLogger:
     _instance = None 
 
+    QUEUE_MAXSIZE = 50000
+    BATCH_SIZE = 500          # Max rows per transaction
+    BATCH_WINDOW_MS = 250     # Max time a row waits before its batch is committed
+    # What to do when the queue is full: "block" the producer, "drop_newest" or "drop_oldest"
+    OVERFLOW_POLICY = os.environ.get("EVENT_LOGGER_OVERFLOW", "drop_oldest")
+
+    PRAGMAS = [
+        # Only takes effect on a new database (before the first table); lets retention reclaim pages incrementally
+        "PRAGMA auto_vacuum=INCREMENTAL",
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA cache_size=-16000",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000"
+    ]
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(EventLogger, cls).__new__(cls)
@@ -40,39 +71,124 @@ class EventLogger:
 
     def _initialize(self):
         self.db_path = "trading_bot_audit.db"
-        self.log_queue = queue.Queue()
+        self.log_queue = queue.Queue(maxsize=self.QUEUE_MAXSIZE)
+        self.stats = {"enqueued": 0, "flushed": 0, "dropped": 0, "batches": 0, "errors": 0}
+        self.flush_latency = registry.histogram("event_logger_flush_seconds", "Time to write and commit one batch")
+        registry.gauge("event_logger_queue_depth", "Rows waiting for the writer", fn=self.log_queue.qsize)
+        for key in self.stats:
+            registry.counter(f"event_logger_{key}_total", f"EventLogger rows/batches {key}", fn=lambda key=key: self.stats[key])
         self.running = True
+        self._init_db()
         self.worker_thread = threading.Thread(target=self._db_worker, daemon=True)
         self.worker_thread.start()
-        self._init_db()
+        atexit.register(self.shutdown)
 
     def _init_db(self):
         try:
             with sqlite3.connect(self.db_path) as conn:
+                for pragma in self.PRAGMAS:
+                    conn.execute(pragma)
                 for query in SCHEMA_QUERIES:
                     conn.execute(query)
         except Exception as e:
             logger.critical(f"DB Initialization Failed: {e}")
 
-    def _db_worker(self):
-        conn = None
+    def _enqueue(self, query, params):
+        task = (query, params)
+        if self.OVERFLOW_POLICY == "block":
+            self.log_queue.put(task)
+            self.stats["enqueued"] += 1
+            return
         try:
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            cursor = conn.cursor()
-            while self.running:
+            self.log_queue.put_nowait(task)
+        except queue.Full:
+            if self.OVERFLOW_POLICY == "drop_oldest":
                 try:
-                    task = self.log_queue.get(timeout=1)
+                    self.log_queue.get_nowait()
+                    self.log_queue.task_done()
                 except queue.Empty:
-                    continue
-                if task is None: break
-                query, params = task
+                    pass
+                try:
+                    self.log_queue.put_nowait(task)
+                    self.stats["enqueued"] += 1
+                except queue.Full:
+                    pass
+            self.stats["dropped"] += 1
+            return
+        self.stats["enqueued"] += 1
+
+    def _drain_batch(self):
+        """Blocks for the first task, then collects more until the batch is full or the window closes."""
+        try:
+            first = self.log_queue.get(timeout=1)
+        except queue.Empty:
+            return [], False
+        if first is None:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.BATCH_WINDOW_MS / 1000.0
+        stop = False
+        while len(batch) < self.BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            try:
+                task = self.log_queue.get_nowait() if remaining <= 0 else self.log_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if task is None:
+                stop = True
+                break
+            batch.append(task)
+        return batch, stop
+
+    def _write_batch(self, conn, batch):
+        """Groups consecutive rows sharing a statement into executemany calls; one commit per batch."""
+        started = time.perf_counter_ns()
+        try:
+            start = 0
+            while start < len(batch):
+                query = batch[start][0]
+                end = start
+                while end < len(batch) and batch[end][0] == query:
+                    end += 1
+                conn.executemany(query, [params for _, params in batch[start:end]])
+                start = end
+            conn.commit()
+            self.stats["flushed"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            conn.rollback()
+            self.stats["errors"] += 1
+            logger.error(f"DB Write Error ({len(batch)} rows): {e}")
+            # Fall back to row-by-row so one bad row doesn't discard the batch
+            for query, params in batch:
                 try:
-                    cursor.execute(query, params)
+                    conn.execute(query, params)
                     conn.commit()
-                except Exception as e:
-                    logger.error(f"DB Write Error: {e}")
-                finally:
+                    self.stats["flushed"] += 1
+                except Exception as row_error:
+                    self.stats["dropped"] += 1
+                    logger.error(f"DB Write Error: {row_error}")
+        finally:
+            self.flush_latency.record_ns(time.perf_counter_ns() - started)
+            for _ in batch:
+                self.log_queue.task_done()
+
+    def _db_worker(self):
+        conn = None
+        try:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            for pragma in self.PRAGMAS:
+                conn.execute(pragma)
+            while True:
+                batch, stop = self._drain_batch()
+                if batch:
+                    self._write_batch(conn, batch)
+                if stop:
                     self.log_queue.task_done()
+                    break
+                if not self.running and self.log_queue.empty():
+                    break
         finally:
             if conn: conn.close()
 
@@ -81,24 +197,56 @@ class EventLogger:
         self.log_system_event("INFO", "SignalEngine", readable_msg)
         query = "INSERT INTO signals (timestamp, symbol, signal_type, confidence, regime, reason, raw_payload) VALUES (?, ?, ?, ?, ?, ?, ?)"
         params = (datetime.now().isoformat(), sig['symbol'], sig['signal_type'], sig['confidence'], sig['regime'], sig['reason'], json.dumps(sig))
-        self.log_queue.put((query, params))
+        self._enqueue(query, params)
 
         # Log to signal_analysis.xlsx
         excel_manager.append_to_file("signal_analysis.xlsx", "Signal_Analysis", {
             "Timestamp": datetime.now().isoformat(),
             "Symbol": sig['symbol'],
-            "Indicator_Values": f"Conf: {sig['confidence']}",
+            "Indicator_Values": f"Conf: {sig['confidence']} | " + describe_indicators(sig.get('indicators'), sig['price']),
             "Signal_Strength": str(sig['confidence']),
             "Final_Decision": sig['signal_type'],
             "No_Trade_Reason": sig['reason'] if sig['signal_type'] == "HOLD" else "N/A"
         })
 
+    def log_signals(self, signals: List[dict]):
+        """Batch form of log_signal: one queue entry per row, one analytics append for the whole scan."""
+        now = datetime.now().isoformat()
+        tag = int(time.time())
+        signal_query = "INSERT INTO signals (timestamp, symbol, signal_type, confidence, regime, reason, raw_payload) VALUES (?, ?, ?, ?, ?, ?, ?)"
+        log_query = "INSERT INTO system_logs (timestamp, level, module, message, payload) VALUES (?, ?, ?, ?, ?)"
+        rows = []
+        for sig in signals:
+            readable_msg = f"The intelligence engine identified a potential {sig['signal_type']} opportunity for {sig['symbol']} at {sig['price']:.2f}. Reasoning: {sig['reason']}."
+            self._enqueue(log_query, (now, "INFO", "SignalEngine", readable_msg, "{}"))
+            payload = dict(sig, trade_id=f"SIG_{tag}_{sig['symbol']}")
+            self._enqueue(signal_query, (now, sig['symbol'], sig['signal_type'], sig['confidence'], sig['regime'], sig['reason'], json.dumps(payload)))
+            rows.append({
+                "Timestamp": now,
+                "Symbol": sig['symbol'],
+                "Indicator_Values": f"Conf: {sig['confidence']} | " + describe_indicators(sig.get('indicators'), sig['price']),
+                "Signal_Strength": str(sig['confidence']),
+                "Final_Decision": sig['signal_type'],
+                "No_Trade_Reason": sig['reason'] if sig['signal_type'] == "HOLD" else "N/A"
+            })
+        excel_manager.append_rows("signal_analysis.xlsx", "Signal_Analysis", rows)
+
+    def log_market_state(self, signals: List[dict], session: str):
+        now = datetime.now().isoformat()
+        excel_manager.append_rows("market_state.xlsx", "Market_State", [{
+            "Timestamp": now,
+            "Market_Status": session,
+            "Symbol": sig['symbol'],
+            "Candle_Freshness": "LIVE",
+            "Regime": sig.get('regime', 'UNKNOWN')
+        } for sig in signals])
+
     def log_trade_entry(self, trade: dict):
         readable_msg = f"Successfully committed a {trade['direction']} paper position for {trade['symbol']} at {trade['entry_price']:.2f}. Total quantity allocated: {trade['quantity']} units."
         self.log_system_event("INFO", "ExecutionEngine", readable_msg)
         query = "INSERT INTO trades (trade_id, symbol, direction, quantity, entry_price, status, entry_time, mode, strategy_ref) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
         params = (trade['trade_id'], trade['symbol'], trade['direction'], trade['quantity'], trade['entry_price'], "OPEN", trade['timestamp'], trade['mode'], trade['signal_id'])
-        self.log_queue.put((query, params))
+        self._enqueue(query, params)
 
         # Log to paper_trades.xlsx
         excel_manager.append_to_file("paper_trades.xlsx", "Paper_Trades", {
@@ -106,15 +254,15 @@ class EventLogger:
             "Entry_Price": trade['entry_price'],
             "Fake_Capital": trade['entry_price'] * trade['quantity'],
             "Leverage": 10, # Hardcoded default for now
-            "SL": "1%",
-            "TP": "N/A",
+            "SL": trade.get('stop_loss') or (f"Trail {trade['trail_distance']:.2f}" if trade.get('trail_distance') else "1%"),
+            "TP": trade.get('take_profit') or "N/A",
             "PnL": 0
         })
 
     def log_trade_exit(self, trade_id: str, exit_price: float, pnl: float, exit_time: str):
         query = "UPDATE trades SET exit_price = ?, pnl = ?, status = 'CLOSED', exit_time = ? WHERE trade_id = ?"
         params = (exit_price, pnl, exit_time, trade_id)
-        self.log_queue.put((query, params))
+        self._enqueue(query, params)
 
         # Update paper_trades.xlsx (using append for simplicity as per requirement of transparent logging)
         excel_manager.append_to_file("paper_trades.xlsx", "Paper_Trades", {
@@ -124,10 +272,20 @@ class EventLogger:
             "Exit_Reason": "System Trigger"
         })
 
+    def log_risk_snapshot(self, wallet: dict):
+        excel_manager.append_to_file("risk_and_drawdown.xlsx", "Risk_Drawdown", {
+            "Timestamp": datetime.now().isoformat(),
+            "Current_Equity": wallet.get("paper_balance", 0),
+            "Peak_Equity": wallet.get("paper_balance", 0), # Simplified
+            "Drawdown_Pct": "0%",
+            "Risk_Per_Trade": "₹1000",
+            "Rule_Violations": "None"
+        })
+
     def log_system_event(self, level: str, module: str, message: str, payload: dict = None):
         query = "INSERT INTO system_logs (timestamp, level, module, message, payload) VALUES (?, ?, ?, ?, ?)"
         params = (datetime.now().isoformat(), level, module, message, json.dumps(payload) if payload else "{}")
-        self.log_queue.put((query, params))
+        self._enqueue(query, params)
 
     def get_recent_logs(self, limit=10) -> List[dict]:
         query = "SELECT * FROM system_logs ORDER BY id DESC LIMIT ?"
@@ -140,7 +298,19 @@ class EventLogger:
         except Exception:
             return []
 
-    def shutdown(self):
+    def get_stats(self) -> dict:
+        return {**self.stats, "queue_depth": self.log_queue.qsize()}
+
+    def flush(self):
+        """Blocks until every queued row has been committed."""
+        self.log_queue.join()
+
+    def shutdown(self, timeout: float = 10.0):
+        if not self.running:
+            return
         self.running = False
+        # The sentinel is queued behind pending rows, so the worker commits them before exiting
         self.log_queue.put(None)
-        self.worker_thread.join(timeout=2)
+        self.worker_thread.join(timeout=timeout)
+        if self.worker_thread.is_alive():
+            logger.error(f"EventLogger shutdown timed out with {self.log_queue.qsize()} rows pending")
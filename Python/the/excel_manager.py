@@ -1,19 +1,38 @@
 import openpyxl
 from openpyxl import Workbook, load_workbook
+import io
 import os
+import csv
+import time
+import queue
+import atexit
+import threading
 from datetime import datetime
 import logging
+from the.metrics import timed
 
 logger = logging.getLogger("ExcelManager")
 
 class ExcelManager:
+    """
+    Append-only analytics sink. Rows are journaled to per-sheet, per-day CSV
+    files by a background thread; a second thread regenerates each .xlsx
+    workbook in openpyxl write-only mode on a schedule or on demand, so a
+    rebuild never holds up journaling. A workbook holds every row: first the
+    undated journal of rows imported from the workbook that existed before
+    journaling began, then each day's journal in date order.
+    """
     FILE_NAME = "Trading_Analytics.xlsx"
     MARKET_STATE_FILE = "market_state.xlsx"
     SIGNAL_ANALYSIS_FILE = "signal_analysis.xlsx"
     PAPER_TRADES_FILE = "paper_trades.xlsx"
     RISK_DRAWDOWN_FILE = "risk_and_drawdown.xlsx"
     POST_MARKET_LEARNING_FILE = "post_market_learning.xlsx"
-    
+
+    JOURNAL_DIR = "analytics_journal"
+    JOURNAL_FLUSH_INTERVAL = 1.0  # Seconds between CSV journal appends
+    MATERIALIZE_INTERVAL = 60.0   # Seconds between scheduled workbook rebuilds
+
     FILES = {
         MARKET_STATE_FILE: {
             "Market_State": ["Timestamp", "Market_Status", "Symbol", "Candle_Freshness", "Regime"]
@@ -33,10 +52,56 @@ class ExcelManager:
     }
 
     def __init__(self):
+        os.makedirs(self.JOURNAL_DIR, exist_ok=True)
+        self._queue = queue.SimpleQueue()
+        self._requests = queue.SimpleQueue()  # Flush events waiting for a rebuild
+        self._dirty_files = set()
+        self._journal_lock = threading.Lock() # Held while appending, so a rebuild sees whole rows
+        self._io_lock = threading.Lock()
+
         for file_name, sheets in self.FILES.items():
+            for sheet_name in sheets:
+                if not os.path.exists(self._journal_path(file_name, sheet_name, day="")):
+                    self._seed_journal(file_name, sheet_name)
             if not os.path.exists(file_name):
                 self._create_specific_workbook(file_name, sheets)
 
+        self.worker_thread = threading.Thread(target=self._sink_worker, name="ExcelSink", daemon=True)
+        self.worker_thread.start()
+        self.materialize_thread = threading.Thread(target=self._materialize_worker, name="ExcelMaterialize", daemon=True)
+        self.materialize_thread.start()
+        atexit.register(self.shutdown)
+
+    @staticmethod
+    def _today():
+        return datetime.now().strftime("%Y-%m-%d")
+
+    def _journal_path(self, file_name, sheet_name, day=None):
+        """The sheet's journal for day (default today); day="" is the undated journal of imported rows."""
+        base = os.path.splitext(os.path.basename(file_name))[0]
+        day = self._today() if day is None else day
+        return os.path.join(self.JOURNAL_DIR, f"{base}__{sheet_name}__{day}.csv" if day else f"{base}__{sheet_name}.csv")
+
+    def _journals(self, file_name, sheet_name):
+        """Every journal of a sheet in row order: the undated import, then the days oldest first."""
+        prefix = os.path.basename(self._journal_path(file_name, sheet_name, day=""))[:-len(".csv")] + "__"
+        days = sorted(name for name in os.listdir(self.JOURNAL_DIR) if name.startswith(prefix) and name.endswith(".csv"))
+        return [self._journal_path(file_name, sheet_name, day="")] + [os.path.join(self.JOURNAL_DIR, name) for name in days]
+
+    def _seed_journal(self, file_name, sheet_name):
+        """One-time import of rows already stored in an existing workbook."""
+        rows = []
+        if os.path.exists(file_name):
+            try:
+                wb = load_workbook(file_name, read_only=True)
+                if sheet_name in wb.sheetnames:
+                    rows = [list(r) for r in wb[sheet_name].iter_rows(min_row=2, values_only=True)]
+                wb.close()
+            except Exception as e:
+                logger.error(f"Could not import existing rows from {file_name}: {e}")
+        with open(self._journal_path(file_name, sheet_name, day=""), 'w', newline='') as f:
+            csv.writer(f).writerows([["" if v is None else v for v in row] for row in rows])
+
     def _create_specific_workbook(self, file_name, sheets):
         wb = Workbook()
         default_sheet = wb.active
@@ -47,20 +112,138 @@ class ExcelManager:
         wb.save(file_name)
         logger.info(f"Created new Excel workbook: {file_name}")
 
+    @timed("ExcelManager.append_to_file")
     def append_to_file(self, file_name, sheet_name, data_dict):
+        """Queues a row for the analytics sink. Never touches the workbook on the caller's thread."""
+        self.append_rows(file_name, sheet_name, [data_dict])
+
+    @timed("ExcelManager.append_rows")
+    def append_rows(self, file_name, sheet_name, rows):
         try:
-            if not os.path.exists(file_name):
-                self._create_specific_workbook(file_name, self.FILES[file_name])
-            
-            wb = load_workbook(file_name)
-            ws = wb[sheet_name]
             columns = self.FILES[file_name][sheet_name]
-            row = [data_dict.get(col, "") for col in columns]
-            ws.append(row)
-            wb.save(file_name)
+            self._queue.put((file_name, sheet_name, [[data.get(col, "") for col in columns] for data in rows]))
         except Exception as e:
             logger.error(f"Error appending to {file_name}: {e}")
 
+    # ------------------------------------------------------------------ #
+    # Background sink
+    # ------------------------------------------------------------------ #
+    def _sink_worker(self):
+        while True:
+            pending = {}
+            waiters = []
+            deadline = time.monotonic() + self.JOURNAL_FLUSH_INTERVAL
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=max(remaining, 0.001))
+                except queue.Empty:
+                    break
+                file_name, sheet_name, rows = item
+                if file_name is None:
+                    # Flush request: (None, materialize, event) - write what we have right now
+                    waiters.append((sheet_name, rows))
+                    break
+                pending.setdefault((file_name, sheet_name), []).extend(rows)
+
+            if pending:
+                self._write_journal(pending)
+
+            for materialize, event in waiters:
+                if materialize:
+                    self._requests.put(event)  # Set by the materializer once the rows are in the workbook
+                else:
+                    event.set()
+
+    def _materialize_worker(self):
+        while True:
+            waiters = []
+            try:
+                waiters.append(self._requests.get(timeout=self.MATERIALIZE_INTERVAL))
+                while True:
+                    waiters.append(self._requests.get_nowait())
+            except queue.Empty:
+                pass
+            if self._dirty_files:
+                self.materialize_now()
+            for event in waiters:
+                event.set()
+
+    def _write_journal(self, pending):
+        day = self._today()
+        for (file_name, sheet_name), rows in pending.items():
+            try:
+                with self._journal_lock:
+                    with open(self._journal_path(file_name, sheet_name, day), 'a', newline='') as f:
+                        csv.writer(f).writerows(rows)
+                    self._dirty_files.add(file_name)
+            except Exception as e:
+                logger.error(f"Error journaling rows for {file_name}: {e}")
+
+    @staticmethod
+    def _coerce(value):
+        if value == "":
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            pass
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+    def _journal_rows(self, path, size):
+        """The first size bytes of a journal: the rows complete when the rebuild started."""
+        try:
+            with open(path, 'rb') as f:
+                data = f.read(size)
+        except FileNotFoundError:
+            return []
+        return csv.reader(io.StringIO(data.decode('utf-8'), newline=''))
+
+    def materialize_now(self, file_names=None):
+        """Rebuilds workbooks from their journals using write-only mode (runs on the materializer thread)."""
+        with self._io_lock:
+            with self._journal_lock:
+                targets = {}
+                for file_name in list(file_names or self._dirty_files):
+                    self._dirty_files.discard(file_name)
+                    targets[file_name] = {
+                        sheet_name: [(path, os.path.getsize(path)) for path in self._journals(file_name, sheet_name)
+                                     if os.path.exists(path)]
+                        for sheet_name in self.FILES[file_name]
+                    }
+            for file_name, journals in targets.items():
+                tmp_name = f"{file_name}.tmp.xlsx"
+                try:
+                    wb = Workbook(write_only=True)
+                    for sheet_name, columns in self.FILES[file_name].items():
+                        ws = wb.create_sheet(sheet_name)
+                        ws.append(columns)
+                        for path, size in journals[sheet_name]:
+                            for row in self._journal_rows(path, size):
+                                ws.append([self._coerce(v) for v in row])
+                    wb.save(tmp_name)
+                    os.replace(tmp_name, file_name)
+                except Exception as e:
+                    logger.error(f"Error materializing {file_name}: {e}")
+                    with self._journal_lock:
+                        self._dirty_files.add(file_name)
+
+    def flush(self, materialize=False, timeout=30.0):
+        """Blocks until queued rows are journaled (and optionally written to the .xlsx files)."""
+        done = threading.Event()
+        self._queue.put((None, materialize, done))
+        return done.wait(timeout)
+
+    def materialize(self, timeout=30.0):
+        return self.flush(materialize=True, timeout=timeout)
+
+    def shutdown(self):
+        if self.worker_thread.is_alive() and self.materialize_thread.is_alive():
+            self.flush(materialize=True, timeout=10.0)
+
     def update_trade_exit(self, trade_id, exit_data):
         try:
             wb = load_workbook(self.FILE_NAME)
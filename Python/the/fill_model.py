@@ -0,0 +1,184 @@
+"""
+FILE: fill_model.py
+TYPE: Paper Fill Simulation (Spread, Slippage, Partial Fills, Fees)
+
+Turns the price a paper order was sent at into the fill a real market would
+have given it:
+
+    spread      market (taker) orders pay half the quoted spread
+    impact      slippage grows with the square root of the order's share of the
+                candle's volume: impact_bps * sqrt(qty / volume)
+    partial     an entry takes at most max_participation of the candle's
+                volume; the rest is cancelled (IOC). Exits always fill in full.
+    fees        a FeeSchedule per market (NSE brokerage / STT / exchange / SEBI /
+                stamp duty / GST, or crypto maker / taker)
+    latency     seconds between the signal and its arrival at the market; the
+                OrderEngine holds market orders that long and fills them at the
+                first candle after
+
+Limit fills (resting entries, take-profits) trade at their own level, as maker,
+with no spread or impact.
+
+fill() is the scalar path ExecutionEngine / TradeManagementEngine call once per
+order; fill_many() evaluates the same formulas over numpy arrays for re-costing
+a whole trade ledger at once. The model only runs when an order fills, so a
+backtest pays nothing per bar.
+
+Presets: ideal (frictionless, the old behaviour), nse_intraday, nse_futures,
+crypto. The live engine picks one per symbol: crypto for symbols quoted in a
+stablecoin (BTCUSDT, ETHUSDC, ...), nse_intraday for the rest. FILL_MODEL
+names one preset to use for every symbol instead; FILL_LATENCY_MS (default 0)
+applies to all of them. Callers ask for_symbol(symbol) and get a FillModel;
+a single FillModel answers for_symbol with itself.
+"""
+import os
+import math
+import logging
+from collections import namedtuple
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+logger = logging.getLogger("FillModel")
+
+Fill = namedtuple("Fill", ["price", "quantity", "fees"])
+
+
+@dataclass(frozen=True)
+class FeeSchedule:
+    """Charges per executed order, as fractions of its turnover (price * quantity)."""
+    brokerage_pct: float = 0.0
+    brokerage_cap: float = None   # Flat cap per order (₹20 at Indian discount brokers)
+    stt_buy_pct: float = 0.0
+    stt_sell_pct: float = 0.0
+    exchange_pct: float = 0.0
+    sebi_pct: float = 0.0
+    stamp_buy_pct: float = 0.0
+    gst_pct: float = 0.0          # On brokerage + exchange + SEBI charges
+    maker_pct: float = 0.0
+    taker_pct: float = 0.0
+
+    def fees(self, buy, turnover, taker=True):
+        brokerage = turnover * self.brokerage_pct
+        if self.brokerage_cap is not None:
+            brokerage = min(brokerage, self.brokerage_cap)
+        charges = brokerage + turnover * (self.exchange_pct + self.sebi_pct)
+        tax = turnover * ((self.stt_buy_pct + self.stamp_buy_pct) if buy else self.stt_sell_pct)
+        venue = turnover * (self.taker_pct if taker else self.maker_pct)
+        return charges * (1 + self.gst_pct) + tax + venue
+
+    def fees_many(self, buy, turnover, taker=True):
+        turnover = np.asarray(turnover, dtype=np.float64)
+        brokerage = turnover * self.brokerage_pct
+        if self.brokerage_cap is not None:
+            brokerage = np.minimum(brokerage, self.brokerage_cap)
+        charges = brokerage + turnover * (self.exchange_pct + self.sebi_pct)
+        tax = turnover * np.where(buy, self.stt_buy_pct + self.stamp_buy_pct, self.stt_sell_pct)
+        venue = turnover * np.where(taker, self.taker_pct, self.maker_pct)
+        return charges * (1 + self.gst_pct) + tax + venue
+
+
+FEE_SCHEDULES = {
+    "none": FeeSchedule(),
+    # Equity intraday (MIS): ₹20 or 0.03% brokerage, 0.025% STT on the sell leg
+    "nse_intraday": FeeSchedule(brokerage_pct=0.0003, brokerage_cap=20.0, stt_sell_pct=0.00025,
+                                exchange_pct=0.0000297, sebi_pct=0.000001, stamp_buy_pct=0.00003, gst_pct=0.18),
+    # Index / stock futures: 0.02% STT on the sell leg
+    "nse_futures": FeeSchedule(brokerage_pct=0.0003, brokerage_cap=20.0, stt_sell_pct=0.0002,
+                               exchange_pct=0.0000173, sebi_pct=0.000001, stamp_buy_pct=0.00002, gst_pct=0.18),
+    "crypto": FeeSchedule(maker_pct=0.0008, taker_pct=0.001)
+}
+
+
+@dataclass(frozen=True)
+class FillModel:
+    spread_bps: float = 0.0              # Full quoted spread; a taker pays half
+    impact_bps: float = 0.0              # Slippage at 100% of the candle's volume
+    max_participation: float = None      # Largest share of a candle's volume one entry may take
+    latency: float = 0.0                 # Seconds from signal to market (applied by OrderEngine)
+    fees: FeeSchedule = field(default_factory=FeeSchedule)
+
+    PRESETS = {}  # Filled in below the class
+
+    @classmethod
+    def preset(cls, name, **overrides):
+        try:
+            model = cls.PRESETS[name]
+        except KeyError:
+            raise ValueError(f"Unknown fill model '{name}' (expected one of {', '.join(cls.PRESETS)})")
+        return replace(model, **overrides) if overrides else model
+
+    @classmethod
+    def from_env(cls):
+        latency = float(os.environ.get("FILL_LATENCY_MS", 0)) / 1000
+        name = os.environ.get("FILL_MODEL")
+        if name:
+            return cls.preset(name, latency=latency)
+        return SymbolFillModels(cls.preset("nse_intraday", latency=latency),
+                                suffixes={suffix: cls.preset(preset, latency=latency)
+                                          for suffix, preset in SUFFIX_PRESETS.items()})
+
+    def for_symbol(self, symbol):
+        return self
+
+    def fill(self, buy, price, quantity, volume=None, taker=True, partial=True):
+        """Fill(price, quantity, fees) for one order sent at price."""
+        filled = quantity
+        participation = 0.0
+        if volume:
+            if partial and self.max_participation is not None:
+                filled = min(quantity, math.floor(volume * self.max_participation))
+            participation = filled / volume
+        if taker:
+            slip = (self.spread_bps / 2 + self.impact_bps * math.sqrt(participation)) / 10000
+            price = price * (1 + slip) if buy else price * (1 - slip)
+        return Fill(price, filled, self.fees.fees(buy, price * filled, taker))
+
+    def fill_many(self, buy, price, quantity, volume=None, taker=True, partial=True):
+        """fill() over arrays: returns (prices, quantities, fees) arrays."""
+        buy = np.asarray(buy, dtype=bool)
+        price = np.asarray(price, dtype=np.float64)
+        filled = np.asarray(quantity, dtype=np.float64)
+        participation = np.zeros_like(price)
+        if volume is not None:
+            volume = np.asarray(volume, dtype=np.float64)
+            traded = volume > 0
+            if partial and self.max_participation is not None:
+                filled = np.where(traded, np.minimum(filled, np.floor(volume * self.max_participation)), filled)
+            participation = np.divide(filled, volume, out=np.zeros_like(price), where=traded)
+        slip = np.where(taker, (self.spread_bps / 2 + self.impact_bps * np.sqrt(participation)) / 10000, 0.0)
+        price = price * np.where(buy, 1 + slip, 1 - slip)
+        return price, filled, self.fees.fees_many(buy, price * filled, taker)
+
+
+FillModel.PRESETS.update({
+    "ideal": FillModel(),
+    "nse_intraday": FillModel(spread_bps=2.0, impact_bps=10.0, max_participation=0.10, fees=FEE_SCHEDULES["nse_intraday"]),
+    "nse_futures": FillModel(spread_bps=1.0, impact_bps=5.0, max_participation=0.10, fees=FEE_SCHEDULES["nse_futures"]),
+    "crypto": FillModel(spread_bps=4.0, impact_bps=20.0, max_participation=0.05, fees=FEE_SCHEDULES["crypto"])
+})
+
+# Quote-currency suffix -> preset, for symbols without an explicit entry
+SUFFIX_PRESETS = {"USDT": "crypto", "USDC": "crypto", "BUSD": "crypto"}
+
+
+class SymbolFillModels:
+    """FillModel per symbol: an exact entry in `symbols`, else the first matching suffix, else `default`."""
+
+    def __init__(self, default, symbols=None, suffixes=None):
+        self.default = default
+        self.symbols = dict(symbols or {})
+        self.suffixes = dict(suffixes or {})
+        self._resolved = {}
+
+    def for_symbol(self, symbol):
+        model = self._resolved.get(symbol)
+        if model is None:
+            model = self.symbols.get(symbol)
+            if model is None:
+                model = next((m for suffix, m in self.suffixes.items() if symbol.endswith(suffix)), self.default)
+            self._resolved[symbol] = model
+        return model
+
+
+fill_model = FillModel.from_env()
@@ -0,0 +1,361 @@
+"""
+FILE: indicators.py
+TYPE: Intelligence Layer (Streaming Indicators)
+
+Every indicator updates in O(1) per candle and exposes get_state()/load_state()
+so the whole set can be checkpointed and restored without replaying history.
+"""
+import math
+import logging
+from collections import deque
+from datetime import datetime
+
+logger = logging.getLogger("Indicators")
+
+
+class StreamingIndicator:
+    """Base class: state is whatever lives in the instance dict (deques and nested indicators included)."""
+
+    def get_state(self):
+        state = {}
+        for key, value in vars(self).items():
+            if isinstance(value, StreamingIndicator):
+                state[key] = value.get_state()
+            elif isinstance(value, deque):
+                state[key] = [list(v) if isinstance(v, tuple) else v for v in value]
+            else:
+                state[key] = value
+        return state
+
+    def load_state(self, state):
+        for key, value in state.items():
+            current = getattr(self, key, None)
+            if isinstance(current, StreamingIndicator):
+                current.load_state(value)
+            elif isinstance(current, deque):
+                setattr(self, key, deque(value, maxlen=current.maxlen))
+            else:
+                setattr(self, key, value)
+        return self
+
+
+class EMA(StreamingIndicator):
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.value = None
+        self.count = 0
+
+    def update(self, price):
+        self.count += 1
+        if self.value is None:
+            self.value = price
+        else:
+            self.value += self.alpha * (price - self.value)
+        return self.value
+
+    @property
+    def ready(self):
+        return self.count >= self.period
+
+
+class SMA(StreamingIndicator):
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.value = None
+
+    def update(self, price):
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(price)
+        self.total += price
+        self.value = self.total / len(self.window)
+        return self.value
+
+    @property
+    def ready(self):
+        return len(self.window) == self.period
+
+
+class RSI(StreamingIndicator):
+    """Wilder's RSI: seeded with a simple average over the first `period` changes."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.count = 0
+        self.value = None
+
+    def update(self, close):
+        if self.prev_close is None:
+            self.prev_close = close
+            return None
+        change = close - self.prev_close
+        self.prev_close = close
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        self.count += 1
+        if self.count <= self.period:
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return None
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        if self.avg_loss == 0:
+            self.value = 100.0 if self.avg_gain > 0 else 50.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+        return self.value
+
+    @property
+    def ready(self):
+        return self.value is not None
+
+
+class ATR(StreamingIndicator):
+    """Wilder's Average True Range."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.count = 0
+        self.value = None
+
+    def update(self, high, low, close):
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+        if self.count <= self.period:
+            self.value = true_range if self.value is None else self.value + (true_range - self.value) / self.count
+        else:
+            self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return self.value
+
+    @property
+    def ready(self):
+        return self.count >= self.period
+
+
+class MACD(StreamingIndicator):
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.value = None
+        self.signal_value = None
+        self.histogram = None
+
+    def update(self, close):
+        self.value = self.fast.update(close) - self.slow.update(close)
+        self.signal_value = self.signal.update(self.value)
+        self.histogram = self.value - self.signal_value
+        return self.value
+
+    @property
+    def ready(self):
+        return self.slow.ready and self.signal.ready
+
+
+class VWAP(StreamingIndicator):
+    """Session-anchored VWAP; resets whenever the session key (trading date) changes."""
+
+    def __init__(self):
+        self.session = None
+        self.cum_pv = 0.0
+        self.cum_volume = 0.0
+        self.value = None
+
+    def update(self, high, low, close, volume, session=None):
+        if session != self.session:
+            self.session = session
+            self.cum_pv = 0.0
+            self.cum_volume = 0.0
+        typical = (high + low + close) / 3.0
+        self.cum_pv += typical * volume
+        self.cum_volume += volume
+        self.value = self.cum_pv / self.cum_volume if self.cum_volume else typical
+        return self.value
+
+    @property
+    def ready(self):
+        return self.value is not None
+
+
+class Bollinger(StreamingIndicator):
+    """Bollinger Bands over a sliding window using Welford's add/remove variance update."""
+
+    def __init__(self, period=20, k=2.0):
+        self.period = period
+        self.k = k
+        self.window = deque(maxlen=period)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.upper = None
+        self.lower = None
+
+    def update(self, price):
+        if len(self.window) == self.period:
+            old = self.window[0]
+            n = self.period
+            old_mean = self.mean
+            self.mean += (price - old) / n
+            self.m2 += (price - old) * (price - self.mean + old - old_mean)
+        else:
+            n = len(self.window) + 1
+            delta = price - self.mean
+            self.mean += delta / n
+            self.m2 += delta * (price - self.mean)
+        self.window.append(price)
+        std = math.sqrt(max(self.m2, 0.0) / len(self.window))
+        self.upper = self.mean + self.k * std
+        self.lower = self.mean - self.k * std
+        return self.mean
+
+    @property
+    def value(self):
+        return self.mean if self.window else None
+
+    @property
+    def ready(self):
+        return len(self.window) == self.period
+
+
+class Donchian(StreamingIndicator):
+    """Donchian channel via monotonic deques: amortized O(1) rolling max/min."""
+
+    def __init__(self, period=20):
+        self.period = period
+        self.index = 0
+        self.highs = deque()  # (index, high), decreasing highs
+        self.lows = deque()   # (index, low), increasing lows
+        self.upper = None
+        self.lower = None
+
+    def update(self, high, low):
+        i = self.index
+        self.index += 1
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((i, high))
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((i, low))
+        expired = i - self.period
+        while self.highs[0][0] <= expired:
+            self.highs.popleft()
+        while self.lows[0][0] <= expired:
+            self.lows.popleft()
+        self.upper = self.highs[0][1]
+        self.lower = self.lows[0][1]
+        return self.upper, self.lower
+
+    @property
+    def ready(self):
+        return self.index >= self.period
+
+
+class IndicatorSet(StreamingIndicator):
+    """The per-symbol bundle the signal layer reads from."""
+
+    NAMES = ["EMA(9/21)", "SMA(20)", "RSI(14)", "ATR(14)", "MACD(12,26,9)", "VWAP", "Bollinger(20,2)", "Donchian(20)"]
+
+    def __init__(self):
+        self.ema_fast = EMA(9)
+        self.ema_slow = EMA(21)
+        self.sma = SMA(20)
+        self.rsi = RSI(14)
+        self.atr = ATR(14)
+        self.macd = MACD(12, 26, 9)
+        self.vwap = VWAP()
+        self.bollinger = Bollinger(20, 2.0)
+        self.donchian = Donchian(20)
+
+    def update(self, candle, session=None):
+        high, low, close = candle["high"], candle["low"], candle["close"]
+        self.ema_fast.update(close)
+        self.ema_slow.update(close)
+        self.sma.update(close)
+        self.rsi.update(close)
+        self.atr.update(high, low, close)
+        self.macd.update(close)
+        self.vwap.update(high, low, close, candle.get("volume", 0), session)
+        self.bollinger.update(close)
+        self.donchian.update(high, low)
+        return self.snapshot()
+
+    def snapshot(self):
+        def r(value):
+            return None if value is None else round(value, 4)
+        return {
+            "ema_fast": r(self.ema_fast.value),
+            "ema_slow": r(self.ema_slow.value),
+            "sma": r(self.sma.value),
+            "rsi": r(self.rsi.value),
+            "atr": r(self.atr.value),
+            "macd": r(self.macd.value),
+            "macd_signal": r(self.macd.signal_value),
+            "macd_hist": r(self.macd.histogram),
+            "vwap": r(self.vwap.value),
+            "bb_upper": r(self.bollinger.upper),
+            "bb_lower": r(self.bollinger.lower),
+            "donchian_upper": r(self.donchian.upper),
+            "donchian_lower": r(self.donchian.lower),
+            "warm": self.macd.ready and self.bollinger.ready and self.rsi.ready
+        }
+
+
+def describe_indicators(ind, price):
+    """One-line human readable summary used in bot_thinking.indicator_logic."""
+    if not ind or ind.get("rsi") is None:
+        return "Indicators warming up."
+    parts = [f"RSI {ind['rsi']:.1f}"]
+    if ind.get("macd_hist") is not None:
+        parts.append(f"MACD hist {ind['macd_hist']:+.2f}")
+    if ind.get("atr") is not None:
+        parts.append(f"ATR {ind['atr']:.2f}")
+    if ind.get("vwap") is not None:
+        parts.append("above VWAP" if price >= ind["vwap"] else "below VWAP")
+    if ind.get("ema_fast") is not None and ind.get("ema_slow") is not None:
+        parts.append("EMA9 > EMA21" if ind["ema_fast"] > ind["ema_slow"] else "EMA9 < EMA21")
+    return "Indicators: " + ", ".join(parts) + "."
+
+
+class IndicatorEngine:
+    def __init__(self):
+        self.sets = {}
+
+    def update(self, symbol, candle):
+        indicator_set = self.sets.get(symbol)
+        if indicator_set is None:
+            indicator_set = self.sets[symbol] = IndicatorSet()
+        timestamp = candle.get("timestamp")
+        if isinstance(timestamp, (int, float)):
+            session = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+        else:
+            session = str(timestamp or datetime.now().isoformat())[:10]
+        return indicator_set.update(candle, session)
+
+    def snapshot(self, symbol):
+        indicator_set = self.sets.get(symbol)
+        return indicator_set.snapshot() if indicator_set else {}
+
+    def checkpoint(self):
+        return {symbol: indicator_set.get_state() for symbol, indicator_set in self.sets.items()}
+
+    def restore(self, checkpoint):
+        for symbol, state in (checkpoint or {}).items():
+            try:
+                self.sets[symbol] = IndicatorSet().load_state(state)
+            except Exception as e:
+                logger.error(f"Could not restore indicators for {symbol}: {e}")
+
+indicator_engine = IndicatorEngine()
@@ -3,68 +3,175 @@ FILE: market_data_and_signal.py
 RESPONSIBILITY: Intelligence Layer (Simulated TradingView Data + Thinking)
 """
 import logging
-import random
-import time
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import timedelta
 from the.state_manager import state_engine
+from the.clock import system_clock
+from the.candle_store import candle_store
+from the.candle_archive import candle_archive
+from the.metrics import timed
+from the.indicators import indicator_engine, describe_indicators, IndicatorSet
 
 logger = logging.getLogger("SignalEngine")
 
+DEFAULT_SYMBOLS = ["NIFTY", "BANKNIFTY", "BTCUSDT"]
+
+SIGNAL_CODES = np.array(["HOLD", "BUY", "SELL"])
+REGIME_CODES = np.array(["CHOPPY", "TRENDING", "SIDEWAYS"])
+
 class MarketSignalEngine:
-    def __init__(self, config=None):
-        self.config = config
-        self.symbols = ["NIFTY", "BANKNIFTY", "BTCUSDT"]
-        self.last_prices = {s: random.uniform(20000, 25000) if "NIFTY" in s else random.uniform(40000, 60000) for s in self.symbols}
+    # Decision thresholds shared by the scalar and the vectorized path
+    MIN_MOVE_POINTS = 0.5
+    MIN_SIGNAL_CONFIDENCE = 0.6
+    TRENDING_CONFIDENCE = 0.7
+    SIDEWAYS_MOMENTUM = 0.2
+    GAP_PROBABILITY = 0.02
+
+    def __init__(self, config=None, state=None, event_logger=None, clock=None, candles=None, indicators=None, archive=None):
+        self.config = config or {}
+        self.state = state or state_engine
+        self.event_logger = event_logger
+        self.clock = clock or system_clock
+        self.candles = candles or candle_store
+        self.indicators = indicators or indicator_engine
+        self.archive = archive or candle_archive
+        # Thresholds can be overridden per engine (parameter sweeps, per-strategy books)
+        self.MIN_MOVE_POINTS = self.config.get("min_move_points", self.MIN_MOVE_POINTS)
+        self.MIN_SIGNAL_CONFIDENCE = self.config.get("min_signal_confidence", self.MIN_SIGNAL_CONFIDENCE)
+        self.TRENDING_CONFIDENCE = self.config.get("trending_confidence", self.TRENDING_CONFIDENCE)
+        self.SIDEWAYS_MOMENTUM = self.config.get("sideways_momentum", self.SIDEWAYS_MOMENTUM)
+        self.symbols = list(self.config.get("symbols", DEFAULT_SYMBOLS))
+        self.rng = np.random.default_rng(self.config.get("seed"))
+        self._symbol_array = np.array(self.symbols)
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        self.prices = np.array([
+            self.rng.uniform(20000, 25000) if "NIFTY" in s else self.rng.uniform(40000, 60000) for s in self.symbols
+        ])
+
+    @property
+    def last_prices(self):
+        return dict(zip(self.symbols, self.prices.tolist()))
 
+    @timed("MarketSignalEngine.fetch_simulated_ohlc")
     def fetch_simulated_ohlc(self, symbol):
         """Simulates TradingView-style candle data with gap/delay handling."""
         # Simulated delay or skip
-        if random.random() < 0.02: # 2% chance of "data delay/gap"
+        if self.rng.random() < self.GAP_PROBABILITY: # 2% chance of "data delay/gap"
             logger.warning(f"Market gap/delay detected for {symbol}. Skipping candle.")
             return None
 
-        base_price = self.last_prices[symbol]
-        change = random.uniform(-0.002, 0.002) * base_price
+        i = self._index[symbol]
+        base_price = float(self.prices[i])
+        change = self.rng.uniform(-0.002, 0.002) * base_price
         new_price = base_price + change
-        self.last_prices[symbol] = new_price
-        
+        self.prices[i] = new_price
+
         return {
             "symbol": symbol,
             "open": base_price,
-            "high": max(base_price, new_price) + random.uniform(0, 5),
-            "low": min(base_price, new_price) - random.uniform(0, 5),
+            "high": max(base_price, new_price) + self.rng.uniform(0, 5),
+            "low": min(base_price, new_price) - self.rng.uniform(0, 5),
             "close": new_price,
-            "volume": random.randint(1000, 5000),
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "volume": int(self.rng.integers(1000, 5001)),
+            "timestamp": self.clock.now().strftime("%Y-%m-%d %H:%M:%S")
         }
 
-    def generate_signal(self, data):
-        """Generates BUY/SELL/HOLD signals with explanations."""
-        diff = data['close'] - data['open']
-        momentum = abs(diff) / (data['open'] * 0.001)
-        confidence = min(momentum, 1.0)
-        
-        signal_type = "HOLD"
+    @timed("MarketSignalEngine.fetch_simulated_batch")
+    def fetch_simulated_batch(self):
+        """
+        Vectorized equivalent of fetch_simulated_ohlc for the whole universe.
+        Returns a dict of aligned arrays (symbols that gapped this tick are left out).
+        """
+        n = len(self.symbols)
+        live = self.rng.random(n) >= self.GAP_PROBABILITY
+        if not live.all():
+            logger.warning(f"Market gap/delay detected for {', '.join(self._symbol_array[~live])}. Skipping candle.")
+
+        base = self.prices
+        close = base * (1 + self.rng.uniform(-0.002, 0.002, n))
+        self.prices = np.where(live, close, base)
+
+        return {
+            "symbol": self._symbol_array[live],
+            "open": base[live],
+            "high": np.maximum(base, close)[live] + self.rng.uniform(0, 5, n)[live],
+            "low": np.minimum(base, close)[live] - self.rng.uniform(0, 5, n)[live],
+            "close": close[live],
+            "volume": self.rng.integers(1000, 5001, n)[live].astype(np.float64),
+            "timestamp": self.clock.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    @timed("MarketSignalEngine.evaluate_batch")
+    def evaluate_batch(self, batch):
+        """Signal, confidence and regime for every symbol in the batch in one vectorized pass."""
+        diff = batch["close"] - batch["open"]
+        momentum = np.abs(diff) / (batch["open"] * 0.001)
+        confidence = np.minimum(momentum, 1.0)
+        strong = confidence > self.MIN_SIGNAL_CONFIDENCE
+
+        signal_code = np.zeros(len(diff), dtype=np.int8)
+        signal_code[(diff > self.MIN_MOVE_POINTS) & strong] = 1
+        signal_code[(diff < -self.MIN_MOVE_POINTS) & strong] = 2
+
+        regime_code = np.where(confidence > self.TRENDING_CONFIDENCE, 1, 0)
+        regime_code[momentum < self.SIDEWAYS_MOMENTUM] = 2
+
+        return {
+            "diff": diff,
+            "confidence": confidence,
+            "signal_type": SIGNAL_CODES[signal_code],
+            "regime": REGIME_CODES[regime_code]
+        }
+
+    def _describe(self, signal_type, confidence, open_price, close_price, diff):
         reason = "Market is currently moving sideways with no clear direction."
-        explanation = f"Price moved from {data['open']:.2f} to {data['close']:.2f} ({diff:.2f} pts). "
-        
-        if diff > 0.5 and confidence > 0.6:
-            signal_type = "BUY"
+        explanation = f"Price moved from {open_price:.2f} to {close_price:.2f} ({diff:.2f} pts). "
+        if signal_type == "BUY":
             reason = f"Bullish momentum detected. Price is climbing with a confidence of {confidence*100:.0f}%."
             explanation += "The recent candle closed significantly higher than its open, suggesting strong buying interest."
-        elif diff < -0.5 and confidence > 0.6:
-            signal_type = "SELL"
+        elif signal_type == "SELL":
             reason = f"Bearish momentum detected. Price is falling with a confidence of {confidence*100:.0f}%."
             explanation += "The recent candle closed significantly lower than its open, indicating aggressive selling pressure."
         else:
             explanation += "The price movement is too small to constitute a reliable signal."
+        return reason, explanation
+
+    def _build_signal(self, symbol, signal_type, confidence, regime, reason, price, indicators, timestamp, expiry):
+        return {
+            "symbol": symbol,
+            "signal_type": signal_type,
+            "confidence": round(confidence, 2),
+            "regime": regime,
+            "reason": reason,
+            "price": price,
+            "indicators": indicators,
+            "timestamp": timestamp,
+            "expiry": expiry
+        }
 
-        market_mode = "TRENDING" if confidence > 0.7 else "CHOPPY"
-        if momentum < 0.2:
+    @timed("MarketSignalEngine.generate_signal")
+    def generate_signal(self, data, indicators=None):
+        """Generates BUY/SELL/HOLD signals with explanations."""
+        if indicators is None:
+            indicators = self.indicators.snapshot(data['symbol'])
+        diff = data['close'] - data['open']
+        momentum = abs(diff) / (data['open'] * 0.001)
+        confidence = min(momentum, 1.0)
+
+        signal_type = "HOLD"
+        if diff > self.MIN_MOVE_POINTS and confidence > self.MIN_SIGNAL_CONFIDENCE:
+            signal_type = "BUY"
+        elif diff < -self.MIN_MOVE_POINTS and confidence > self.MIN_SIGNAL_CONFIDENCE:
+            signal_type = "SELL"
+        reason, explanation = self._describe(signal_type, confidence, data['open'], data['close'], diff)
+        explanation += " " + describe_indicators(indicators, data['close'])
+
+        market_mode = "TRENDING" if confidence > self.TRENDING_CONFIDENCE else "CHOPPY"
+        if momentum < self.SIDEWAYS_MOMENTUM:
             market_mode = "SIDEWAYS"
 
-        state_engine.update_thinking({
+        self.state.update_thinking({
             "current_state": "ANALYZING",
             "current_market": data['symbol'],
             "indicator_logic": explanation,
@@ -72,73 +179,111 @@ class MarketSignalEngine:
             "signal_confidence": int(confidence * 100),
             "trade_decision": reason,
             "market_mode": market_mode,
-            "indicators_used": ["Price Momentum", "Candle Analysis"],
+            "indicators_used": ["Price Momentum", "Candle Analysis"] + IndicatorSet.NAMES,
             "log_msg": f"Analyzed {data['symbol']}: {signal_type} at {data['close']:.2f} ({market_mode})"
         })
 
-        return {
-            "symbol": data['symbol'],
-            "signal_type": signal_type,
-            "confidence": round(confidence, 2),
-            "regime": market_mode,
-            "reason": reason,
-            "price": data['close'],
-            "timestamp": data['timestamp'],
-            "expiry": (datetime.now() + timedelta(minutes=5)).isoformat()
-        }
+        return self._build_signal(
+            data['symbol'], signal_type, confidence, market_mode, reason, data['close'], indicators,
+            data['timestamp'], (self.clock.now() + timedelta(minutes=5)).isoformat()
+        )
 
-    def scan_market(self):
-        """Main logic loop: returns a list of actionable signals."""
-        state_engine.update_thinking({"current_state": "SCANNING"})
-        
-        session = state_engine.get_state().get("session", "MARKET_CLOSED")
+    @timed("MarketSignalEngine.process_batch")
+    def process_batch(self, batch):
+        """
+        Turns one vectorized candle batch into signals and emits every side effect
+        (state, candle history, indicators, audit, analytics) as a single batch.
+        """
+        count = len(batch["symbol"])
+        if not count:
+            return []
+        evaluation = self.evaluate_batch(batch)
+        timestamp = batch["timestamp"]
+        expiry = (self.clock.now() + timedelta(minutes=5)).isoformat()
+
+        # Columns -> Python scalars once, instead of per-element numpy boxing
+        symbols = batch["symbol"].tolist()
+        opens, highs, lows = batch["open"].tolist(), batch["high"].tolist(), batch["low"].tolist()
+        closes, volumes = batch["close"].tolist(), batch["volume"].tolist()
+        diffs, confidences = evaluation["diff"].tolist(), evaluation["confidence"].tolist()
+        signal_types, regimes = evaluation["signal_type"].tolist(), evaluation["regime"].tolist()
+
+        candles = {}
+        signals = []
+        for i, symbol in enumerate(symbols):
+            candle = {
+                "symbol": symbol, "open": opens[i], "high": highs[i], "low": lows[i],
+                "close": closes[i], "volume": volumes[i], "timestamp": timestamp
+            }
+            candles[symbol] = candle
+            self.candles.ingest(candle)
+            indicators = self.indicators.update(symbol, candle)
+            reason, _ = self._describe(signal_types[i], confidences[i], opens[i], closes[i], diffs[i])
+            signals.append(self._build_signal(
+                symbol, signal_types[i], confidences[i], regimes[i], reason, closes[i], indicators, timestamp, expiry
+            ))
+
+        self.state.register_market_data_batch(candles)
+        self.archive.append_batch(symbols, timestamp, opens, highs, lows, closes, volumes)
+
+        # Surface the strongest reading of this scan on the thinking panel
+        best = int(np.argmax(evaluation["confidence"]))
+        top = signals[best]
+        _, explanation = self._describe(top["signal_type"], confidences[best], opens[best], closes[best], diffs[best])
+        actionable_count = sum(1 for s in signals if s["signal_type"] != "HOLD")
+        self.state.update_thinking({
+            "current_state": "ANALYZING",
+            "current_market": top["symbol"],
+            "indicator_logic": explanation + " " + describe_indicators(top["indicators"], top["price"]),
+            "signal_type": top["signal_type"],
+            "signal_confidence": int(confidences[best] * 100),
+            "trade_decision": top["reason"],
+            "market_mode": top["regime"],
+            "indicators_used": ["Price Momentum", "Candle Analysis"] + IndicatorSet.NAMES,
+            "log_msg": f"Analyzed {count} symbols: {actionable_count} actionable, strongest {top['symbol']} {top['signal_type']} at {top['price']:.2f} ({top['regime']})"
+        })
+
+        if self.event_logger is None:
+            from the.event_logger import EventLogger
+            self.event_logger = EventLogger()
+        self.event_logger.log_market_state(signals, self.state.get_session())
+        self.event_logger.log_signals(signals)
+        return signals
+
+    def scan_allowed(self):
+        """Session and kill-switch gate applied before any candle is evaluated."""
+        self.state.update_thinking({"current_state": "SCANNING"})
+
+        session = self.state.get_session()
         if session != "LIVE_MARKET":
-            state_engine.update_thinking({
+            self.state.update_thinking({
                 "rejection_reason": f"Trading blocked: Current session is {session}",
                 "log_msg": f"Scan skipped: {session}"
             })
-            return []
+            return False
 
-        if not state_engine.can_trade_new():
-            state_engine.update_thinking({
+        if not self.state.can_trade_new():
+            self.state.update_thinking({
                 "rejection_reason": "Trading restricted by state manager (Daily limit or Kill switch)",
                 "log_msg": "Scan skipped: Risk limit reached"
             })
-            return []
+            return False
+        return True
 
-        actionable_signals = []
-        for symbol in self.symbols:
-            data = self.fetch_simulated_ohlc(symbol)
-            if not data:
-                continue
-            state_engine.register_market_data(symbol, data)
-            
-            sig = self.generate_signal(data)
-            
-            # Log to market_state.xlsx
-            from the.excel_manager import excel_manager
-            excel_manager.append_to_file("market_state.xlsx", "Market_State", {
-                "Timestamp": datetime.now().isoformat(),
-                "Market_Status": state_engine.get_state().get("session", "UNKNOWN"),
-                "Symbol": symbol,
-                "Candle_Freshness": "LIVE",
-                "Regime": sig.get('regime', 'UNKNOWN')
-            })
+    @timed("MarketSignalEngine.scan_market")
+    def scan_market(self, batch=None):
+        """Main logic loop: returns a list of actionable signals."""
+        if not self.scan_allowed():
+            return []
 
-            # Log signal to EventLogger
-            from the.event_logger import EventLogger
-            sig_copy = sig.copy()
-            sig_copy['trade_id'] = f"SIG_{int(time.time())}_{symbol}"
-            EventLogger().log_signal(sig_copy)
+        signals = self.process_batch(batch if batch is not None else self.fetch_simulated_batch())
+        actionable_signals = [sig for sig in signals if sig['signal_type'] != "HOLD"]
 
-            if sig['signal_type'] != "HOLD":
-                actionable_signals.append(sig)
-                
         if not actionable_signals:
-            state_engine.update_thinking({
-                "current_state": "WAITING", 
+            self.state.update_thinking({
+                "current_state": "WAITING",
                 "trade_decision": "No actionable signals found in current scan.",
                 "log_msg": "Scan complete: No signals"
             })
-        
+
         return actionable_signals
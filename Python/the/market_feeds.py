@@ -0,0 +1,527 @@
+"""
+FILE: market_feeds.py
+TYPE: Market Data Feed Adapters
+
+A feed turns a source of candles into the batch layout MarketSignalEngine.process_batch
+consumes ({"symbol": array, "open".."volume": float64 arrays, "timestamp": str}) and can
+be consumed three ways:
+    pull  - feed.poll() returns the next batch, or None when nothing is ready
+    push  - feed.subscribe(callback), then await feed.run()
+    async - async for batch in feed.stream()
+
+Adapters:
+    SimulatedFeed - the engine's random walk (the previous hardwired source)
+    ReplayFeed    - CSV/Parquet files or the candle archive, as fast as possible or at a fixed rate
+    SocketFeed    - NDJSON candles over TCP, e.g. from ReplayServer
+
+ReplayServer is a local stand-in for an exchange stream / TradingView alert firehose:
+it serves any feed as one JSON line per candle at a configurable message rate. Every
+batch carries sent_at (wall-clock time its source produced it), so latency from the
+feed to the signal stage can be measured under load without an outside service.
+
+Usage:
+    python -m the.market_feeds --serve --port 9100 --rate 2000 --symbols 50
+    python -m the.market_feeds --bench --rate 5000 --symbols 50 --seconds 10
+"""
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from the.candle_store import to_epoch
+from the.market_data_and_signal import MarketSignalEngine, DEFAULT_SYMBOLS
+
+logger = logging.getLogger("MarketFeeds")
+
+BATCH_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def make_batch(symbols, opens, highs, lows, closes, volumes, timestamp, sent_at=None):
+    """Builds a process_batch batch; `timestamp` may be epoch seconds, a datetime or a string."""
+    if not isinstance(timestamp, str):
+        timestamp = datetime.fromtimestamp(to_epoch(timestamp)).strftime("%Y-%m-%d %H:%M:%S")
+    batch = {
+        "symbol": np.asarray(symbols),
+        "open": np.asarray(opens, dtype=np.float64),
+        "high": np.asarray(highs, dtype=np.float64),
+        "low": np.asarray(lows, dtype=np.float64),
+        "close": np.asarray(closes, dtype=np.float64),
+        "volume": np.asarray(volumes, dtype=np.float64),
+        "timestamp": timestamp
+    }
+    if sent_at is not None:
+        batch["sent_at"] = sent_at
+    return batch
+
+
+class FeedStats:
+    """Throughput and source-to-receipt latency of one feed."""
+    LATENCY_SAMPLES = 4096  # Most recent latencies kept for percentiles
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.messages = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=self.LATENCY_SAMPLES)
+
+    def record(self, messages):
+        self.messages += messages
+        self.batches += 1
+
+    def record_latency(self, seconds):
+        self.latencies.append(seconds)
+
+    def to_dict(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        stats = {
+            "messages": self.messages,
+            "batches": self.batches,
+            "errors": self.errors,
+            "messages_per_second": round(self.messages / elapsed, 1),
+            "batches_per_second": round(self.batches / elapsed, 1)
+        }
+        if self.latencies:
+            samples = np.array(self.latencies) * 1000
+            stats["latency_ms"] = {
+                "p50": round(float(np.percentile(samples, 50)), 3),
+                "p99": round(float(np.percentile(samples, 99)), 3),
+                "max": round(float(samples.max()), 3)
+            }
+        return stats
+
+
+class MarketFeed:
+    """Base class: subclasses implement _next() (non-blocking) and may override stream()."""
+    name = "feed"
+    reconnects = False  # True if stream() may be called again after it ends (e.g. a dropped socket)
+
+    def __init__(self, interval=0.0):
+        self.interval = interval  # Pause between polls when stream() drives poll()
+        self.exhausted = False
+        self.stats = FeedStats()
+        self._subscribers = []
+
+    def _next(self):
+        raise NotImplementedError
+
+    def _deliver(self, batch):
+        batch.setdefault("sent_at", time.time())
+        self.stats.record(len(batch["symbol"]))
+        for callback in list(self._subscribers):
+            try:
+                callback(batch)
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"{self.name} subscriber failed: {e}")
+        return batch
+
+    def poll(self):
+        batch = self._next()
+        if batch is None:
+            return None
+        return self._deliver(batch)
+
+    async def stream(self):
+        while True:
+            batch = self.poll()
+            if batch is not None:
+                yield batch
+            elif self.exhausted:
+                return
+            await asyncio.sleep(self.interval)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    async def run(self):
+        """Drives the feed until it ends, handing every batch to the subscribers."""
+        async for _ in self.stream():
+            pass
+
+    def close(self):
+        pass
+
+
+class SimulatedFeed(MarketFeed):
+    name = "simulated"
+
+    def __init__(self, engine=None, interval=2.0):
+        super().__init__(interval)
+        self.engine = engine or MarketSignalEngine()
+
+    def _next(self):
+        return self.engine.fetch_simulated_batch()
+
+
+class ReplayFeed(MarketFeed):
+    """
+    Replays historical bars one timestamp at a time, at `rate` batches per second
+    (0 = as fast as the consumer takes them). `loop` restarts from the first bar.
+    """
+    name = "replay"
+
+    def __init__(self, bars, rate=0.0, loop=False):
+        from the.backtest import build_timeline
+
+        super().__init__(1.0 / rate if rate else 0.0)
+        self.loop = loop
+        symbols, self.columns = build_timeline(bars)
+        self.names = np.array(symbols)
+        ts = self.columns["timestamp"]
+        self.starts = np.flatnonzero(np.r_[True, ts[1:] != ts[:-1]]) if len(ts) else np.zeros(0, dtype=np.int64)
+        self.ends = np.r_[self.starts[1:], len(ts)]
+        self.position = 0
+
+    @classmethod
+    def from_files(cls, paths, **kwargs):
+        from the.backtest import load_many
+        return cls(load_many(paths), **kwargs)
+
+    @classmethod
+    def from_archive(cls, symbols, start=None, end=None, **kwargs):
+        from the.backtest import load_archive
+        return cls(load_archive(symbols, start, end), **kwargs)
+
+    def _next(self):
+        if self.position >= len(self.starts):
+            if not self.loop or not len(self.starts):
+                self.exhausted = True
+                return None
+            self.position = 0
+        lo, hi = self.starts[self.position], self.ends[self.position]
+        self.position += 1
+        cols = self.columns
+        return make_batch(
+            self.names[cols["symbol_code"][lo:hi].astype(np.int64)],
+            cols["open"][lo:hi], cols["high"][lo:hi], cols["low"][lo:hi], cols["close"][lo:hi], cols["volume"][lo:hi],
+            float(cols["timestamp"][lo])
+        )
+
+
+class SocketFeed(MarketFeed):
+    """
+    Reads NDJSON candles ({"ticker", "time", "open", "high", "low", "close", "volume", "sent"})
+    from a TCP stream. Consecutive candles sharing a time become one batch.
+    """
+    name = "socket"
+    reconnects = True
+    RECV_BYTES = 1 << 16
+
+    def __init__(self, host="127.0.0.1", port=9100, connect_timeout=5.0):
+        super().__init__(0.01)
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self._sock = None
+        self._buffer = b""
+        self._ready = deque()
+
+    def _assemble(self, group):
+        return make_batch(
+            [m["ticker"] for m in group], [m["open"] for m in group], [m["high"] for m in group],
+            [m["low"] for m in group], [m["close"] for m in group], [m.get("volume", 0.0) for m in group],
+            group[0]["time"], min(m.get("sent", 0.0) for m in group) or None
+        )
+
+    def _decode(self, data, received):
+        *lines, self._buffer = (self._buffer + data).split(b"\n")
+        group, seen = [], set()
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+            except ValueError:
+                self.stats.errors += 1
+                continue
+            if "sent" in message:
+                self.stats.record_latency(received - message["sent"])
+            # A new time, or a symbol repeating inside the same second, starts the next batch
+            if group and (message["time"] != group[0]["time"] or message["ticker"] in seen):
+                self._ready.append(self._assemble(group))
+                group, seen = [], set()
+            group.append(message)
+            seen.add(message["ticker"])
+        if group:
+            self._ready.append(self._assemble(group))
+
+    def _next(self):
+        if not self._ready and not self.exhausted:
+            if self._sock is None:
+                self._sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+                self._sock.setblocking(False)
+            chunks = []
+            while True:
+                try:
+                    chunk = self._sock.recv(self.RECV_BYTES)
+                except BlockingIOError:
+                    break
+                if not chunk:
+                    self.exhausted = True
+                    self.close()
+                    break
+                chunks.append(chunk)
+            if chunks:
+                self._decode(b"".join(chunks), time.time())
+        return self._ready.popleft() if self._ready else None
+
+    async def stream(self):
+        self.exhausted = False
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.connect_timeout)
+        try:
+            while True:
+                while self._ready:
+                    yield self._deliver(self._ready.popleft())
+                data = await reader.read(self.RECV_BYTES)
+                if not data:
+                    self.exhausted = True
+                    return
+                self._decode(data, time.time())
+        finally:
+            writer.close()
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
+class ReplayServer:
+    """
+    Serves a feed's candles as NDJSON over TCP at `rate` messages per second
+    (0 = as fast as the socket drains). Connected clients share the source.
+    """
+    TICK = 0.005        # Pacing granularity (seconds)
+    MAX_BURST = 4096    # Messages per write when catching up or unpaced
+
+    def __init__(self, source, host="127.0.0.1", port=9100, rate=1000.0):
+        self.source = source
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.stats = FeedStats()
+        self.clients = 0
+        self._pending = deque()
+        self._handlers = set()  # Client tasks, cancelled on stop
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def _take(self, count):
+        """Up to `count` candles from the source, as dicts without the send stamp."""
+        out = []
+        while len(out) < count:
+            if not self._pending:
+                batch = self.source.poll()
+                if batch is None:
+                    break
+                when = to_epoch(batch["timestamp"])
+                columns = [batch[field].tolist() for field in BATCH_FIELDS]
+                for symbol, o, h, l, c, v in zip(batch["symbol"].tolist(), *columns):
+                    self._pending.append({"ticker": symbol, "time": when, "open": o, "high": h, "low": l, "close": c, "volume": v})
+            out.append(self._pending.popleft())
+        return out
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        self.clients += 1
+        started, sent = time.perf_counter(), 0
+        try:
+            while not self._stop.is_set():
+                budget = self.MAX_BURST
+                if self.rate:
+                    budget = min(int((time.perf_counter() - started) * self.rate) - sent, self.MAX_BURST)
+                    if budget <= 0:
+                        await asyncio.sleep(self.TICK)
+                        continue
+                candles = self._take(budget)
+                if not candles:
+                    if self.source.exhausted:
+                        break
+                    await asyncio.sleep(self.TICK)
+                    continue
+                now = time.time()
+                writer.write(b"".join(json.dumps({**c, "sent": now}).encode() + b"\n" for c in candles))
+                await writer.drain()
+                sent += len(candles)
+                self.stats.record(len(candles))
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.clients -= 1
+            self._handlers.discard(task)
+            if self._stop.is_set():
+                writer.transport.abort()  # Shutting down: drop whatever the client has not read
+            else:
+                writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, ready=None):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Replay server on {self.host}:{self.port} at {self.rate or 'unlimited'} msgs/s")
+        if ready is not None:
+            ready.set()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    def start(self):
+        """Runs the server on its own thread and event loop. Returns the bound port."""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.serve(ready))
+            finally:
+                self._loop.close()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="ReplayServer", daemon=True)
+        self._thread.start()
+        ready.wait(5.0)
+        return self.port
+
+    async def _shutdown(self):
+        """Cancels every client and waits for its socket to close, then ends serve()."""
+        handlers = list(self._handlers)
+        for task in handlers:
+            task.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        self._server.close()
+
+    def stop(self):
+        self._stop.set()
+        if self._loop is not None and self._server is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=2.0)
+            except Exception as e:  # Loop already gone, or a client would not close in time
+                logger.warning(f"Replay server did not shut down cleanly: {e!r}")
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+
+def create_feed(spec=None, engine=None):
+    """
+    Feed from a spec string (MARKET_FEED):
+        simulated (default) | replay:a.csv,b.parquet[@rate] | archive:NIFTY,BANKNIFTY[@rate] | socket:host:port
+    """
+    if not spec or spec == "simulated":
+        return SimulatedFeed(engine)
+    kind, _, target = spec.partition(":")
+    target, _, rate = target.partition("@")
+    rate = float(rate) if rate else 0.0
+    if kind == "replay":
+        return ReplayFeed.from_files(target.split(","), rate=rate)
+    if kind == "archive":
+        return ReplayFeed.from_archive(target.split(","), rate=rate)
+    if kind == "socket":
+        host, _, port = target.rpartition(":")
+        return SocketFeed(host or "127.0.0.1", int(port))
+    raise ValueError(f"Unknown market feed '{spec}'")
+
+
+def _symbols(count):
+    if count <= len(DEFAULT_SYMBOLS):
+        return DEFAULT_SYMBOLS[:count]
+    return DEFAULT_SYMBOLS + [f"SYM{i:03d}" for i in range(count - len(DEFAULT_SYMBOLS))]
+
+
+def _isolated_engine(symbols, seed=None):
+    """A signal engine with in-memory state and no audit/archive side effects."""
+    from the.state_manager import StateManager
+    from the.candle_store import CandleStore
+    from the.indicators import IndicatorEngine
+    from the.candle_archive import CandleArchive
+    from the.backtest import BacktestRecorder
+
+    return MarketSignalEngine(
+        {"symbols": symbols, "seed": seed}, state=StateManager(persist=False, track_thinking=False),
+        event_logger=BacktestRecorder(), candles=CandleStore(capacity=512), indicators=IndicatorEngine(),
+        archive=CandleArchive(enabled=False)
+    )
+
+
+async def _bench(port, seconds):
+    """Consumes the socket feed into a signal engine and reports feed and feed->signal numbers."""
+    feed = SocketFeed(port=port)
+    engine = None
+    latencies = deque(maxlen=FeedStats.LATENCY_SAMPLES)
+    deadline = time.monotonic() + seconds
+    signals = 0
+    async for batch in feed.stream():
+        if engine is None:
+            engine = _isolated_engine(list(dict.fromkeys(batch["symbol"].tolist())))
+        signals += len(engine.process_batch(batch))
+        latencies.append(time.time() - batch["sent_at"])
+        if time.monotonic() >= deadline:
+            break
+    report = feed.stats.to_dict()
+    if latencies:
+        samples = np.array(latencies) * 1000
+        report["feed_to_signal_ms"] = {
+            "p50": round(float(np.percentile(samples, 50)), 3),
+            "p99": round(float(np.percentile(samples, 99)), 3),
+            "max": round(float(samples.max()), 3)
+        }
+    report["signals"] = signals
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local market-data replay server and feed load test")
+    parser.add_argument("--serve", action="store_true", help="Run the replay server until interrupted")
+    parser.add_argument("--bench", action="store_true", help="Serve and consume in-process, then report throughput and latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--rate", type=float, default=1000.0, help="Messages (candles) per second, 0 = unlimited")
+    parser.add_argument("--symbols", type=int, default=3, help="Simulated universe size")
+    parser.add_argument("--files", nargs="*", help="Replay these CSV/Parquet files instead of the simulator")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    logging.getLogger("SignalEngine").setLevel(logging.ERROR)
+
+    if args.files:
+        source = ReplayFeed.from_files(args.files, loop=True)
+    else:
+        source = SimulatedFeed(MarketSignalEngine({"symbols": _symbols(args.symbols), "seed": args.seed}))
+        source.engine.GAP_PROBABILITY = 0.0
+    server = ReplayServer(source, args.host, 0 if args.bench else args.port, args.rate)
+
+    if args.bench:
+        port = server.start()
+        report = asyncio.run(_bench(port, args.seconds))
+        server.stop()
+        print(json.dumps({"rate": args.rate, "symbols": args.symbols, **report}, indent=2))
+        return 0
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""
+FILE: optimizer.py
+TYPE: Parameter Sweeps (Grid / Random / Walk-Forward)
+
+Fans BacktestEngine runs out over a ProcessPoolExecutor. The merged bar
+timeline is written once to .npy files and every worker maps them read-only
+(np.load(mmap_mode="r")), so the history is shared through the page cache
+instead of being pickled into each process.
+
+Parameters are addressed as "<engine>.<name>":
+    signal.min_signal_confidence, signal.min_move_points, ...  -> MarketSignalEngine config
+    execution.min_confidence, execution.max_risk_per_trade     -> ExecutionEngine attributes
+    risk.hard_sl_pct, risk.mandatory_exit_time                 -> TradeManagementEngine attributes
+
+Usage:
+    python -m the.optimizer data/*.csv --grid execution.min_confidence=0.6,0.7,0.8 \\
+        --grid risk.hard_sl_pct=0.005,0.01 --objective calmar --workers 32
+    python -m the.optimizer data/*.csv --random 200 --range signal.min_signal_confidence=0.5:0.9 \\
+        --walk-forward --train-days 20 --test-days 5
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from the.backtest import BacktestEngine, build_timeline, load_many
+
+logger = logging.getLogger("Optimizer")
+
+PARAM_GROUPS = {"signal": "signal_config", "execution": "execution_params", "risk": "risk_params", "pretrade": "pretrade_params"}
+
+# Every objective is "higher is better"
+OBJECTIVES = {
+    "net_pnl": lambda r: r["net_pnl"],
+    "hit_rate": lambda r: r["hit_rate"],
+    "avg_pnl": lambda r: r["avg_pnl"],
+    "min_drawdown": lambda r: -r["max_drawdown"],
+    "calmar": lambda r: r["net_pnl"] / r["max_drawdown"] if r["max_drawdown"] else r["net_pnl"],
+    "trade_count": lambda r: r["trade_count"]
+}
+
+DAY_SECONDS = 86400
+
+
+def score(report, objective):
+    """
+    objective is an OBJECTIVES key or a {key: weight} dict for a weighted blend,
+    e.g. {"calmar": 1.0, "hit_rate": 50.0}.
+    """
+    if isinstance(objective, str):
+        return float(OBJECTIVES[objective](report))
+    return float(sum(weight * OBJECTIVES[name](report) for name, weight in objective.items()))
+
+
+def split_params(params):
+    """Flat {"group.name": value} -> BacktestEngine keyword arguments."""
+    kwargs = {kw: {} for kw in PARAM_GROUPS.values()}
+    for key, value in params.items():
+        group, _, name = key.partition(".")
+        if group not in PARAM_GROUPS or not name:
+            raise ValueError(f"Unknown parameter '{key}' (expected signal.*, execution.*, risk.* or pretrade.*)")
+        kwargs[PARAM_GROUPS[group]][name] = value
+    return kwargs
+
+
+# ---------------------------------------------------------------------- #
+# Search spaces
+# ---------------------------------------------------------------------- #
+def grid_space(grid):
+    """{"execution.min_confidence": [0.6, 0.7], ...} -> every combination."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def random_space(space, samples, seed=None):
+    """
+    Values are either a list (sampled uniformly) or a (low, high) tuple
+    (uniform float, or integer when both bounds are ints).
+    """
+    rng = np.random.default_rng(seed)
+    trials = []
+    for _ in range(samples):
+        params = {}
+        for name, spec in space.items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = int(rng.integers(low, high + 1))
+                else:
+                    params[name] = round(float(rng.uniform(low, high)), 6)
+            else:
+                params[name] = spec[int(rng.integers(len(spec)))]
+        trials.append(params)
+    return trials
+
+
+def walk_forward_windows(start, end, train_days, test_days):
+    """Rolling (train_start, train_end, test_end) epoch windows that step forward by test_days."""
+    train, test = train_days * DAY_SECONDS, test_days * DAY_SECONDS
+    windows = []
+    cursor = start
+    while cursor + train + test <= end + DAY_SECONDS:
+        windows.append((cursor, cursor + train, cursor + train + test))
+        cursor += test
+    return windows
+
+
+# ---------------------------------------------------------------------- #
+# Worker side
+# ---------------------------------------------------------------------- #
+_worker_symbols = None
+_worker_columns = None
+_worker_kwargs = None
+
+
+def _init_worker(data_dir, symbols, backtest_kwargs):
+    global _worker_symbols, _worker_columns, _worker_kwargs
+    for name in ("SignalEngine", "ExecutionEngine", "TradeManager"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    _worker_symbols = symbols
+    _worker_columns = {
+        name[:-4]: np.load(os.path.join(data_dir, name), mmap_mode="r")
+        for name in os.listdir(data_dir) if name.endswith(".npy")
+    }
+    _worker_kwargs = backtest_kwargs
+
+
+def _run_trial(params, window=None):
+    """Runs one backtest over [window[0], window[1]) of the shared timeline."""
+    columns = _worker_columns
+    if window is not None:
+        ts = columns["timestamp"]
+        lo, hi = np.searchsorted(ts, window[0], "left"), np.searchsorted(ts, window[1], "left")
+        columns = {k: v[lo:hi] for k, v in columns.items()}
+    engine = BacktestEngine(**_worker_kwargs, **split_params(params))
+    report = engine.run_timeline(_worker_symbols, columns)
+    report.pop("trades", None)
+    return report
+
+
+# ---------------------------------------------------------------------- #
+# Parent side
+# ---------------------------------------------------------------------- #
+class ParameterOptimizer:
+    def __init__(self, bars, objective="net_pnl", workers=None, **backtest_kwargs):
+        self.objective = objective
+        self.workers = workers or os.cpu_count() or 1
+        self.backtest_kwargs = backtest_kwargs
+        self.symbols, columns = build_timeline(bars)
+        self.start = float(columns["timestamp"][0]) if len(columns["timestamp"]) else 0.0
+        self.end = float(columns["timestamp"][-1]) if len(columns["timestamp"]) else 0.0
+        self.data_dir = tempfile.mkdtemp(prefix="optimizer_")
+        for name, col in columns.items():
+            np.save(os.path.join(self.data_dir, f"{name}.npy"), np.ascontiguousarray(col))
+        self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self.data_dir, self.symbols, self.backtest_kwargs)
+            )
+        return self._pool
+
+    def evaluate(self, trials, window=None):
+        """Runs every parameter set and returns results ranked best first."""
+        started = time.perf_counter()
+        futures = [(params, self.pool.submit(_run_trial, params, window)) for params in trials]
+        results = []
+        # Collected in submission order so equal scores rank reproducibly
+        for params, future in futures:
+            try:
+                report = future.result()
+            except Exception as e:
+                logger.error(f"Trial {params} failed: {e}")
+                continue
+            results.append({"params": params, "score": score(report, self.objective), "report": report})
+        results.sort(key=lambda r: r["score"], reverse=True)
+        logger.info(f"{len(results)}/{len(trials)} trials in {time.perf_counter() - started:.2f}s on {self.workers} workers")
+        return results
+
+    def grid(self, grid, window=None):
+        return self.evaluate(grid_space(grid), window)
+
+    def random(self, space, samples, seed=None, window=None):
+        return self.evaluate(random_space(space, samples, seed), window)
+
+    def walk_forward(self, trials, train_days, test_days):
+        """
+        Picks the best parameter set on each training window and scores it on the
+        following, unseen test window. The out-of-sample rows are what to trust.
+        """
+        folds = []
+        for train_start, train_end, test_end in walk_forward_windows(self.start, self.end, train_days, test_days):
+            ranked = self.evaluate(trials, (train_start, train_end))
+            if not ranked:
+                continue
+            best = ranked[0]
+            test = self.evaluate([best["params"]], (train_end, test_end))
+            folds.append({
+                "train_start": train_start, "train_end": train_end, "test_end": test_end,
+                "params": best["params"],
+                "train_score": best["score"],
+                "test_score": test[0]["score"] if test else None,
+                "test_report": test[0]["report"] if test else None
+            })
+        scored = [f["test_score"] for f in folds if f["test_score"] is not None]
+        return {
+            "folds": folds,
+            "out_of_sample_score": float(np.sum(scored)) if scored else None,
+            "out_of_sample_net_pnl": float(sum(f["test_report"]["net_pnl"] for f in folds if f["test_report"]))
+        }
+
+
+# ---------------------------------------------------------------------- #
+# CLI
+# ---------------------------------------------------------------------- #
+def _parse_value(text):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _parse_objective(text):
+    """'calmar' or a weighted blend like 'calmar:1,hit_rate:50'."""
+    if ":" not in text:
+        return text
+    return {name: float(weight) for name, weight in (part.split(":") for part in text.split(","))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters over historical OHLCV")
+    parser.add_argument("files", nargs="+", help="CSV or Parquet files (see the.backtest)")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2", help="Values to try for a parameter")
+    parser.add_argument("--range", action="append", default=[], metavar="NAME=LOW:HIGH", help="Range to sample (random search)")
+    parser.add_argument("--random", type=int, default=0, metavar="N", help="Sample N random parameter sets instead of the full grid")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--walk-forward", action="store_true")
+    parser.add_argument("--train-days", type=int, default=20)
+    parser.add_argument("--test-days", type=int, default=5)
+    parser.add_argument("--objective", default="net_pnl", help=f"One of {', '.join(OBJECTIVES)} or a blend 'calmar:1,hit_rate:50'")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--balance", type=float, default=10000.0)
+    parser.add_argument("--daily-loss-limit", type=float, default=None)
+    parser.add_argument("--sessions", action="store_true", help="Only trade inside NSE session hours")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="Write all results as JSON")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    space = {}
+    for spec in args.grid:
+        name, _, values = spec.partition("=")
+        space[name] = [_parse_value(v) for v in values.split(",")]
+    for spec in args.range:
+        name, _, bounds = spec.partition("=")
+        low, high = bounds.split(":")
+        space[name] = (_parse_value(low), _parse_value(high))
+    if not space:
+        parser.error("Give at least one --grid or --range parameter")
+    if args.random:
+        trials = random_space(space, args.random, args.seed)
+    elif any(isinstance(spec, tuple) for spec in space.values()):
+        parser.error("--range needs --random N")
+    else:
+        trials = grid_space(space)
+
+    with ParameterOptimizer(
+        load_many(args.files), objective=_parse_objective(args.objective), workers=args.workers,
+        initial_balance=args.balance, daily_loss_limit=args.daily_loss_limit, respect_sessions=args.sessions
+    ) as optimizer:
+        if args.walk_forward:
+            result = optimizer.walk_forward(trials, args.train_days, args.test_days)
+            for fold in result["folds"]:
+                print(f"{time.strftime('%Y-%m-%d', time.localtime(fold['train_end']))}  "
+                      f"train={fold['train_score']:.2f}  test={fold['test_score']:.2f}  {fold['params']}")
+            print(f"Out-of-sample score: {result['out_of_sample_score']}  net PnL: ₹{result['out_of_sample_net_pnl']:.2f}")
+        else:
+            result = optimizer.evaluate(trials)
+            for rank, row in enumerate(result[:args.top], 1):
+                report = row["report"]
+                print(f"{rank:>3}. score={row['score']:.2f}  pnl=₹{report['net_pnl']:.2f}  dd=₹{report['max_drawdown']:.2f}  "
+                      f"trades={report['trade_count']}  hit={report['hit_rate']*100:.1f}%  {row['params']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+FILE: orchestrator.py
+TYPE: Event-Driven Orchestration (asyncio)
+
+Replaces the sequential sleep(2) loop with stages connected by bounded queues:
+
+    market data --candles--> signals --signals--> execution --fills--> risk
+                                 \\_____________ price events ___________/
+
+Candles come from a pluggable feed (the.market_feeds; the simulator by
+default); TradingView webhook alerts join the execution queue from the alert
+stage. Candle arrival drives signal evaluation, fills and fresh prices drive risk
+checks, and a timer drives session transitions. Full queues apply
+backpressure to the stage upstream of them. With a portfolio configured, each
+scan's actionable signals also fan out to the strategy books (the.portfolio)
+off the event loop. With an order engine (the.order_engine), signals route
+through it: LIMIT / STOP entries rest there and are matched against each new
+candle by the risk stage, ahead of the exit checks.
+"""
+import time
+import asyncio
+import logging
+
+from the.state_manager import state_engine
+from the.session_engine import session_manager
+from the.market_feeds import SimulatedFeed
+from the.alert_queue import alert_queue, alert_to_signal
+from the.metrics import registry
+from the.order_engine import Order
+
+logger = logging.getLogger("Orchestrator")
+
+
+class StageMetrics:
+    """Per-stage latency bookkeeping (service time and time spent waiting in the inbound queue)."""
+
+    def __init__(self, name):
+        self.name = name
+        self.histogram = registry.histogram("stage_duration_seconds", "Orchestrator stage service time", stage=name)
+        self.wait_histogram = registry.histogram("stage_queue_wait_seconds", "Time an item waited in the stage's inbound queue", stage=name)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def record(self, seconds, queue_wait=0.0):
+        self.histogram.observe(seconds)
+        self.wait_histogram.observe(queue_wait)
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.queue_wait_total += queue_wait
+        if queue_wait > self.queue_wait_max:
+            self.queue_wait_max = queue_wait
+
+    def to_dict(self):
+        count = self.count or 1
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total / count * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "last_ms": round(self.last * 1000, 3),
+            "avg_queue_wait_ms": round(self.queue_wait_total / count * 1000, 3),
+            "max_queue_wait_ms": round(self.queue_wait_max * 1000, 3)
+        }
+
+
+class AsyncTradingEngine:
+    CANDLE_INTERVAL = 2.0      # Simulated feed cadence (seconds)
+    FEED_RETRY_DELAY = 5.0     # Pause before reconnecting a feed that ended
+    HEARTBEAT_INTERVAL = 2.0
+    SESSION_CHECK_MAX = 60.0   # Upper bound on the session timer sleep
+    QUEUE_SIZE = 64
+
+    def __init__(self, event_logger, market_engine, execution_engine, risk_engine, session=None, feed=None, alerts=None,
+                 portfolio=None, orders=None):
+        self.event_logger = event_logger
+        self.market_engine = market_engine
+        self.execution_engine = execution_engine
+        self.risk_engine = risk_engine
+        self.session = session or session_manager
+        self.feed = feed or SimulatedFeed(market_engine, self.CANDLE_INTERVAL)
+        self.alerts = alerts or alert_queue
+        self.portfolio = portfolio
+        self.orders = orders
+        self.first_scan_complete = False
+        stages = ("market_data", "signal", "alerts", "execution", "risk", "session") + (("portfolio",) if portfolio else ())
+        self.metrics = {name: StageMetrics(name) for name in stages}
+        self.candle_to_signal = StageMetrics("candle_to_signal")
+        self.feed_to_signal = StageMetrics("feed_to_signal")
+        self.candles = None
+        self.signals = None
+        self.risk_events = None
+        self.portfolio_events = None
+
+    def _queues(self):
+        self.candles = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self.signals = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self.risk_events = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self.portfolio_events = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+
+    async def run(self):
+        self._queues()
+        self.session.update_session(self.event_logger)
+        stages = [
+            self._stage("market_data", self.market_data_producer),
+            self._stage("signal", self.signal_stage),
+            self._stage("alerts", self.alert_stage),
+            self._stage("execution", self.execution_stage),
+            self._stage("risk", self.risk_stage),
+            self._stage("session", self.session_timer),
+            self._stage("heartbeat", self.heartbeat)
+        ]
+        if self.portfolio is not None:
+            stages.append(self._stage("portfolio", self.portfolio_stage))
+        await asyncio.gather(*stages)
+
+    async def _stage(self, name, coroutine):
+        """Keeps a stage alive across errors, like the old loop's catch-and-continue."""
+        while True:
+            try:
+                await coroutine()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if name in self.metrics:
+                    self.metrics[name].errors += 1
+                logger.error(f"Stage {name} error: {e}")
+                self.event_logger.log_system_event("ERROR", "Orchestrator", f"Critical error in {name} stage: {e}")
+                await asyncio.sleep(5)
+
+    # ------------------------------------------------------------------ #
+    # Stages
+    # ------------------------------------------------------------------ #
+    async def publish_candles(self, batch):
+        """Entry point for any feed: awaits when the signal stage is behind (backpressure)."""
+        await self.candles.put((time.perf_counter(), batch))
+
+    async def market_data_producer(self):
+        async for batch in self.feed.stream():
+            # Time to hand the batch over, including any backpressure wait
+            started = time.perf_counter()
+            await self.publish_candles(batch)
+            self.metrics["market_data"].record(time.perf_counter() - started)
+        self.event_logger.log_system_event("WARNING", "Orchestrator", f"Market feed '{self.feed.name}' ended")
+        if not self.feed.reconnects:
+            await asyncio.Event().wait()  # A finished replay stays finished
+        await asyncio.sleep(self.FEED_RETRY_DELAY)
+
+    async def signal_stage(self):
+        while True:
+            enqueued_at, batch = await self.candles.get()
+            started = time.perf_counter()
+            actionable = []
+            if self.market_engine.scan_allowed():
+                signals = self.market_engine.process_batch(batch)
+                actionable = [sig for sig in signals if sig['signal_type'] != "HOLD"]
+                if not actionable:
+                    state_engine.update_thinking({
+                        "current_state": "WAITING",
+                        "trade_decision": "No actionable signals found in current scan.",
+                        "log_msg": "Scan complete: No signals"
+                    })
+                if not self.first_scan_complete:
+                    state_engine.update_thinking({"current_state": "ACTIVE"})
+                    self.first_scan_complete = True
+            done = time.perf_counter()
+            self.metrics["signal"].record(done - started, started - enqueued_at)
+            self.candle_to_signal.record(done - enqueued_at)
+            if "sent_at" in batch:
+                self.feed_to_signal.record(time.time() - batch["sent_at"])
+
+            for sig in actionable:
+                await self.signals.put((done, sig))
+            # Fresh prices: stops and time exits must be re-evaluated
+            await self.risk_events.put((done, "PRICE"))
+            if self.portfolio is not None:
+                await self.portfolio_events.put((done, actionable))
+
+    async def alert_stage(self):
+        while True:
+            alerts = await self.alerts.get_many()
+            started = time.perf_counter()
+            signals = [alert_to_signal(alert, state_engine) for alert in alerts]
+            executable = [sig for sig in signals if sig["price"]]
+            if len(executable) < len(signals):
+                self.event_logger.log_system_event("WARNING", "AlertQueue", f"Skipped {len(signals) - len(executable)} alert(s) with no price and no market data")
+            if executable:
+                self.event_logger.log_signals(executable)
+            done = time.perf_counter()
+            self.metrics["alerts"].record(done - started)
+            for sig in executable:
+                await self.signals.put((done, sig))
+
+    async def execution_stage(self):
+        while True:
+            enqueued_at, sig = await self.signals.get()
+            started = time.perf_counter()
+            if self.orders is None:
+                trade = self.execution_engine.execute_trade(sig)
+            else:
+                try:
+                    trade = self.orders.submit(sig)
+                except ValueError as e:
+                    logger.warning(f"Order for {sig.get('symbol')} rejected: {e}")
+                    trade = None
+            done = time.perf_counter()
+            self.metrics["execution"].record(done - started, started - enqueued_at)
+            # A resting order is not a fill; it is matched in the risk stage
+            if trade is not None and not isinstance(trade, Order):
+                await self.risk_events.put((done, "FILL"))
+
+    async def risk_stage(self):
+        while True:
+            enqueued_at, _ = await self.risk_events.get()
+            # Coalesce a burst of events into one evaluation
+            while not self.risk_events.empty():
+                self.risk_events.get_nowait()
+            started = time.perf_counter()
+            if self.orders is not None:
+                self.orders.check_orders()
+            self.risk_engine.check_exits()
+            self.metrics["risk"].record(time.perf_counter() - started, started - enqueued_at)
+
+    async def portfolio_stage(self):
+        while True:
+            enqueued_at, signals = await self.portfolio_events.get()
+            started = time.perf_counter()
+            # Books run off the event loop so the main book's stages are not held up by 50+ others
+            await asyncio.get_running_loop().run_in_executor(None, self.portfolio.process, signals)
+            self.metrics["portfolio"].record(time.perf_counter() - started, started - enqueued_at)
+
+    async def session_timer(self):
+        while True:
+            started = time.perf_counter()
+            self.session.update_session(self.event_logger)
+            self.metrics["session"].record(time.perf_counter() - started)
+            delay = min(self.session.seconds_until_next_transition(), self.SESSION_CHECK_MAX)
+            await asyncio.sleep(max(delay, 0.05))
+
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+            self.event_logger.log_system_event("INFO", "MainLoop", "Bot heartbeat - system status: " + state_engine.get_thinking("current_state"))
+
+    def get_metrics(self):
+        queues = {}
+        if self.candles is not None:
+            queues = {
+                "candles": self.candles.qsize(),
+                "signals": self.signals.qsize(),
+                "risk_events": self.risk_events.qsize(),
+                "portfolio_events": self.portfolio_events.qsize()
+            }
+        return {
+            "stages": {name: m.to_dict() for name, m in self.metrics.items()},
+            "candle_to_signal": self.candle_to_signal.to_dict(),
+            "feed_to_signal": self.feed_to_signal.to_dict(),
+            "feed": {"name": self.feed.name, **self.feed.stats.to_dict()},
+            "queue_depth": queues
+        }
+
+# Set by main.py once the engine is running, so the dashboard can read its metrics
+trading_engine = None
@@ -0,0 +1,302 @@
+"""
+FILE: order_engine.py
+TYPE: Paper Order Book (Limit / Stop / Bracket / OCO Entries)
+
+Signals carry an optional order spec; MARKET (the default) executes at once
+through ExecutionEngine, LIMIT and STOP rest here until a candle's range
+reaches order_price:
+
+    BUY LIMIT / SELL STOP   fill when the low reaches the level
+    SELL LIMIT / BUY STOP   fill when the high reaches the level
+
+Resting orders sit in two sorted ladders per symbol (the same layout as the
+position book), so each new candle finds the orders it triggered with two
+bisects. Triggered orders fill in the order the bar's path reaches them
+(O -> L -> H -> C for an up bar, O -> H -> L -> C for a down bar), at the order
+level, or at the open when the bar gapped through it. A fill cancels the rest
+of its OCO group. A bracket is an entry order whose signal also carries
+stop_loss / take_profit / trailing_atr: the trade opens with those exits and
+TradeManagementEngine manages them from then on.
+
+When the execution engine's fill model has a latency, MARKET orders wait here
+too: each is held until its due time and then fills at the open of the first
+candle seen after it (the first price the order could have reached).
+
+Orders expire with their signal (the signal's "expiry") and are mirrored into
+the state as pending_orders, so they survive a restart within the trading day.
+"""
+import heapq
+import logging
+import itertools
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Optional, Dict
+
+from the.clock import system_clock
+from the.metrics import timed
+from the.position_book import _Ladder, touch
+
+logger = logging.getLogger("OrderEngine")
+
+ORDER_TYPES = ("MARKET", "LIMIT", "STOP")
+
+
+@dataclass
+class Order:
+    order_id: str
+    symbol: str
+    side: str                          # BUY / SELL
+    order_type: str                    # LIMIT / STOP / MARKET (delayed by latency)
+    price: float                       # Limit price, stop trigger, or the price a market order was sent at
+    signal: Dict = field(repr=False)   # What ExecutionEngine executes on fill
+    oco: Optional[str] = None
+    expires_at: Optional[float] = None
+    created_at: str = ""
+    status: str = "PENDING"
+    fill_price: Optional[float] = None
+    due_at: Optional[float] = None     # Market orders: when the order reaches the market
+    reason: Optional[str] = None       # Rejection code when execution refused the fill
+
+    @property
+    def falling(self):
+        """True when the order fills on the way down (BUY LIMIT, SELL STOP)."""
+        return (self.side == "BUY") == (self.order_type == "LIMIT")
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class OrderEngine:
+    def __init__(self, execution, state=None, clock=None, event_logger=None):
+        self.execution = execution
+        self.state = state or execution.state
+        self.clock = clock or execution.clock or system_clock
+        self.event_logger = event_logger
+        self.orders = {}    # order_id -> pending Order
+        self._ladders = {}  # symbol -> (down, up)
+        self._groups = {}   # oco -> {order_id}
+        self._expiry = []   # heap of (expires_at, order_id)
+        self._delayed = []  # (due_at, order_id) of market orders not yet filled
+        self._seen = {}     # order_id -> candle current when it was placed (never fills on that bar)
+        self._priced = {}   # symbol -> candle last matched
+        self._ids = itertools.count(1)
+        self.stats = {"submitted": 0, "filled": 0, "rejected": 0, "cancelled": 0, "expired": 0}
+        self._restore()
+
+    # ------------------------------------------------------------------ #
+    # Placing / cancelling
+    # ------------------------------------------------------------------ #
+    def submit(self, signal):
+        """
+        Routes a signal by its order_type. MARKET returns ExecutionEngine's result
+        (a TradeObject or None), or the in-flight Order when the fill model has a
+        latency; LIMIT / STOP return the resting Order.
+        Raises ValueError for an unknown type or a missing order_price.
+        """
+        order_type = (signal.get('order_type') or "MARKET").upper()
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"Unknown order type '{order_type}'")
+        latency = self.execution.fill_model.for_symbol(signal['symbol']).latency
+        if order_type == "MARKET" and not latency:
+            return self.execution.execute_trade(signal)
+        if order_type != "MARKET" and signal.get('order_price') is None:
+            raise ValueError(f"{order_type} order needs an order_price")
+        order = Order(
+            order_id=f"ORD_{int(self.clock.time())}_{next(self._ids)}",
+            symbol=signal['symbol'],
+            side=signal['signal_type'],
+            order_type=order_type,
+            price=float(signal['price'] if order_type == "MARKET" else signal['order_price']),
+            signal=signal,
+            oco=signal.get('oco'),
+            expires_at=self._expires_at(signal.get('expiry')),
+            created_at=self.clock.now().isoformat(),
+            due_at=self.clock.time() + latency if order_type == "MARKET" else None
+        )
+        self._place(order)
+        self._mirror()
+        self.stats["submitted"] += 1
+        logger.info(f"[PAPER] {order.side} {order.order_type} {order.symbol} @ {order.price:.2f} placed ({order.order_id})")
+        return order
+
+    def submit_bracket(self, signal, entry_type, entry_price, stop_loss=None, take_profit=None, trailing_atr=None):
+        """Entry order whose trade opens with its stop-loss / take-profit / ATR trail attached."""
+        return self.submit(dict(signal, order_type=entry_type, order_price=entry_price,
+                                stop_loss=stop_loss, take_profit=take_profit, trailing_atr=trailing_atr))
+
+    def submit_oco(self, signals):
+        """Places every signal's order in one group: the first to fill cancels the others."""
+        group = f"OCO_{int(self.clock.time())}_{next(self._ids)}"
+        return [self.submit(dict(sig, oco=group)) for sig in signals]
+
+    def cancel(self, order_id, status="CANCELLED"):
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        self._unplace(order)
+        order.status = status
+        self.stats["expired" if status == "EXPIRED" else "cancelled"] += 1
+        self._mirror()
+        return order
+
+    def _place(self, order):
+        self.orders[order.order_id] = order
+        self._seen[order.order_id] = self.state.snapshot()["market_data"].get(order.symbol)
+        if order.order_type == "MARKET":
+            self._delayed.append((order.due_at, order.order_id))
+            return
+        ladders = self._ladders.get(order.symbol)
+        if ladders is None:
+            ladders = self._ladders[order.symbol] = (_Ladder(), _Ladder())
+        ladders[0 if order.falling else 1].insert(order.price, order.order_id)
+        if order.oco:
+            self._groups.setdefault(order.oco, set()).add(order.order_id)
+        if order.expires_at is not None:
+            heapq.heappush(self._expiry, (order.expires_at, order.order_id))
+
+    def _unplace(self, order):
+        self._seen.pop(order.order_id, None)
+        if order.order_type == "MARKET":
+            return  # Its _delayed entry is dropped once the order is gone
+        ladders = self._ladders[order.symbol]
+        ladders[0 if order.falling else 1].discard(order.price, order.order_id)
+        if not ladders[0].levels and not ladders[1].levels:
+            del self._ladders[order.symbol]
+            self._priced.pop(order.symbol, None)
+        if order.oco:
+            group = self._groups.get(order.oco)
+            if group is not None:
+                group.discard(order.order_id)
+                if not group:
+                    del self._groups[order.oco]
+
+    # ------------------------------------------------------------------ #
+    # Matching
+    # ------------------------------------------------------------------ #
+    @timed("OrderEngine.check_orders")
+    def check_orders(self):
+        """Expires stale orders and fills the ones the newest candles reached. Returns the trades opened."""
+        if not self.orders:
+            return []
+        now = self.clock.time()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, order_id = heapq.heappop(self._expiry)
+            if self.cancel(order_id, "EXPIRED") is not None:
+                self._log("INFO", f"Order {order_id} expired unfilled")
+
+        trades = []
+        market_data = self.state.snapshot()["market_data"]
+        if self._delayed:
+            trades.extend(self._arrive(now, market_data))
+        for symbol in list(self._ladders):
+            candle = market_data.get(symbol)
+            if candle is None or candle is self._priced.get(symbol):
+                continue
+            self._priced[symbol] = candle
+            trades.extend(self._match(symbol, candle))
+        return trades
+
+    def _match(self, symbol, candle):
+        close = candle['close']
+        open_, high, low = candle.get('open', close), candle.get('high', close), candle.get('low', close)
+        bullish = close >= open_
+        down, up = self._ladders[symbol]
+        hits = []
+        if down.levels and low <= down.levels[-1]:
+            i = bisect_left(down.levels, low)
+            for level, order_id in zip(down.levels[i:], down.keys[i:]):
+                when, fill = touch(level, True, open_, bullish)
+                hits.append((when, -level, order_id, fill))  # Falling leg: higher levels are reached first
+        if up.levels and high >= up.levels[0]:
+            j = bisect_right(up.levels, high)
+            for level, order_id in zip(up.levels[:j], up.keys[:j]):
+                when, fill = touch(level, False, open_, bullish)
+                hits.append((when, level, order_id, fill))
+        hits.sort()
+
+        trades = []
+        for _, _, order_id, fill in hits:
+            order = self.orders.get(order_id)
+            if order is None or self._seen.get(order_id) is candle:
+                continue  # Cancelled by an earlier OCO fill on this bar, or placed on this bar
+            trade = self._fill(order, fill)
+            if trade is not None:
+                trades.append(trade)
+        return trades
+
+    def _arrive(self, now, market_data):
+        arrived, in_flight = [], []
+        for entry in self._delayed:
+            order = self.orders.get(entry[1])
+            if order is None:
+                continue
+            candle = market_data.get(order.symbol)
+            if entry[0] > now:
+                # Anything printing before the order reaches the market is behind it
+                if candle is not None:
+                    self._seen[order.order_id] = candle
+                in_flight.append(entry)
+            elif candle is None or candle is self._seen.get(order.order_id):
+                in_flight.append(entry)  # Arrived; waiting for the next print
+            else:
+                arrived.append((entry[0], order, candle))
+        self._delayed = in_flight
+        trades = []
+        for _, order, candle in sorted(arrived, key=lambda item: item[0]):
+            trade = self._fill(order, candle.get('open', candle['close']))
+            if trade is not None:
+                trades.append(trade)
+        return trades
+
+    def _fill(self, order, price):
+        self.orders.pop(order.order_id)
+        self._unplace(order)
+        for sibling in list(self._groups.get(order.oco, ())) if order.oco else ():
+            self.cancel(sibling)
+        signal = dict(order.signal, price=price, order_type=order.order_type)
+        trade = self.execution.execute_trade(signal)
+        order.fill_price = price
+        if trade is None:
+            order.status = "REJECTED"
+            order.reason = self.execution.last_rejection.code if self.execution.last_rejection else None
+            self.stats["rejected"] += 1
+            self._log("WARNING", f"{order.order_type} order {order.order_id} triggered at {price:.2f} but execution rejected it ({order.reason})")
+        else:
+            order.status = "FILLED"
+            self.stats["filled"] += 1
+            self._log("INFO", f"{order.side} {order.order_type} {order.symbol} filled @ {price:.2f} ({order.order_id} -> {trade.trade_id})")
+        self._mirror()
+        return trade
+
+    # ------------------------------------------------------------------ #
+    # Persistence / reporting
+    # ------------------------------------------------------------------ #
+    def _expires_at(self, expiry):
+        if expiry is None:
+            return None
+        if isinstance(expiry, (int, float)):
+            return float(expiry)
+        try:
+            return datetime.fromisoformat(str(expiry)).timestamp()
+        except ValueError:
+            return None
+
+    def _mirror(self):
+        self.state.update_fields({"pending_orders": {oid: order.to_dict() for oid, order in self.orders.items()}})
+
+    def _restore(self):
+        for data in (self.state.snapshot().get("pending_orders") or {}).values():
+            try:
+                self._place(Order(**data))
+            except (TypeError, KeyError) as e:
+                logger.error(f"Dropping unreadable pending order: {e}")
+
+    def _log(self, level, message):
+        logger.info(message)
+        if self.event_logger is not None:
+            self.event_logger.log_system_event(level, "OrderEngine", message)
+
+    def pending(self):
+        return [order.to_dict() for order in self.orders.values()]
+
@@ -0,0 +1,216 @@
+"""
+FILE: portfolio.py
+TYPE: Multi-Book Portfolio Engine (Isolated Strategy Accounts)
+
+Hosts many independent paper books side by side. Each StrategyBook owns a
+StateManager shard (wallet, daily loss, kill switch, active trades) and its
+own ExecutionEngine / TradeManagementEngine bound to it, so a book's writes
+never take another book's lock and a book that trips its loss limit stops only
+itself. All books share one market-data stream: every scan's signals are
+offered to each book, and exits are priced from the snapshot the scan already
+published to state_engine (read without locking).
+
+Books come from a JSON file (PORTFOLIO_CONFIG, default portfolio.json):
+    {"workers": 4,
+     "books": [{"id": "momentum", "capital": 100000, "min_confidence": 0.8},
+               {"id": "nifty_long", "symbols": ["NIFTY"], "directions": ["BUY"], "daily_loss_limit": 500}]}
+and persist to portfolio/<id>.json.
+"""
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from the.state_manager import StateManager, state_engine
+from the.trade_execution_and_mode import ExecutionEngine
+from the.trade_management_and_risk import TradeManagementEngine
+from the.fill_model import FillModel
+from the.metrics import timed
+
+logger = logging.getLogger("Portfolio")
+
+CONFIG_FILE = "portfolio.json"
+PORTFOLIO_DIR = "portfolio"
+
+
+def summarize(book_id, snapshot):
+    """Dashboard row for one book, from its state snapshot."""
+    wallet = snapshot.get("wallet", {})
+    return {
+        "id": book_id,
+        "session": snapshot.get("session"),
+        "paper_balance": wallet.get("paper_balance", 0.0),
+        "free_balance": wallet.get("free_balance", 0.0),
+        "used_margin": wallet.get("used_margin", 0.0),
+        "realized_pnl": wallet.get("realized_pnl", 0.0),
+        "unrealized_pnl": wallet.get("unrealized_pnl", 0.0),
+        "daily_loss": dict(snapshot.get("daily_loss", {})),
+        "kill_switch": dict(snapshot.get("kill_switch", {})),
+        "open_trades": len(snapshot.get("active_trades", {}))
+    }
+
+
+def read_books(root=None):
+    """Book summaries from the persisted files, for a dashboard running outside the trading process."""
+    root = root or PORTFOLIO_DIR
+    books = []
+    if not os.path.isdir(root):
+        return books
+    for name in sorted(os.listdir(root)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(root, name)) as f:
+                books.append(summarize(name[:-len(".json")], json.load(f)))
+        except (OSError, ValueError) as e:
+            logger.error(f"Unreadable book file {name}: {e}")
+    return books
+
+
+class StrategyBook:
+    DEFAULTS = {
+        "capital": 10000.0,
+        "leverage": 10,
+        "max_risk_per_trade": 1000.0,
+        "min_confidence": 0.70,
+        "daily_loss_limit": 150.0,
+        "hard_sl_pct": 0.01,
+        "max_open_trades": None,   # None = unlimited
+        "symbols": None,           # None = every symbol the scan covers
+        "directions": None,        # e.g. ["BUY"] for long-only
+        "regimes": None,
+        "fill_model": None         # Fill preset name, e.g. "crypto"; None = the live engine's
+    }
+
+    def __init__(self, book_id, config=None, event_logger=None, clock=None, root=None, persist=True):
+        self.book_id = book_id
+        self.config = cfg = {**self.DEFAULTS, **(config or {})}
+        self.symbols = set(cfg["symbols"]) if cfg["symbols"] else None
+        self.directions = set(cfg["directions"]) if cfg["directions"] else None
+        self.regimes = set(cfg["regimes"]) if cfg["regimes"] else None
+        root = root or PORTFOLIO_DIR
+        if persist:
+            os.makedirs(root, exist_ok=True)
+        # Nobody watches a book's thinking panel, so those writes are skipped
+        self.state = StateManager(state_file=os.path.join(root, f"{book_id}.json"), persist=persist, track_thinking=False)
+        self.execution = ExecutionEngine(state=self.state, event_logger=event_logger, clock=clock)
+        self.execution.max_risk_per_trade = cfg["max_risk_per_trade"]
+        self.execution.min_confidence = cfg["min_confidence"]
+        self.execution.trade_prefix = f"TRD_{book_id}"
+        self.execution.pretrade.max_open_positions = cfg["max_open_trades"]
+        self.risk = TradeManagementEngine(event_logger, state=self.state, clock=clock)
+        self.risk.hard_sl_pct = cfg["hard_sl_pct"]
+        if cfg["fill_model"]:
+            self.execution.fill_model = self.risk.fill_model = FillModel.preset(cfg["fill_model"])
+        # A new book, or a new day (StateManager starts each day from DEFAULT_STATE)
+        if self.state.snapshot().get("book_id") != book_id:
+            self.open_account()
+        self.stats = {"offered": 0, "opened": 0, "errors": 0}
+
+    def open_account(self):
+        cfg = self.config
+        self.state.update_wallet({
+            "paper_balance": float(cfg["capital"]), "free_balance": float(cfg["capital"]),
+            "used_margin": 0.0, "leverage": cfg["leverage"]
+        })
+        self.state.set_daily_loss_limit(float(cfg["daily_loss_limit"]))
+        self.state.update_fields({"book_id": self.book_id})
+
+    def accepts(self, signal):
+        if self.symbols is not None and signal["symbol"] not in self.symbols:
+            return False
+        if self.directions is not None and signal["signal_type"] not in self.directions:
+            return False
+        return self.regimes is None or signal.get("regime") in self.regimes
+
+    def on_tick(self, signals, session, prices):
+        """Entries for this scan's signals, then exits at the latest prices. Returns trades opened."""
+        try:
+            state = self.state
+            if state.get_session() != session:
+                state.set_session(session)
+            accepted = [sig for sig in signals if self.accepts(sig)]
+            # Only symbols being entered or held are copied into the shard: entries size their fill
+            # against the candle's volume, exits need the price, and the persisted file stays small
+            copied = {sig["symbol"] for sig in accepted if sig["symbol"] in prices}
+            if copied:
+                state.register_market_data_batch({symbol: prices[symbol] for symbol in copied})
+            opened = 0
+            for sig in accepted:
+                self.stats["offered"] += 1
+                if self.execution.execute_trade(sig) is not None:
+                    opened += 1
+            held = {trade["symbol"] for trade in state.snapshot()["active_trades"].values()} - copied
+            if held:
+                state.register_market_data_batch({symbol: prices[symbol] for symbol in held if symbol in prices})
+            self.risk.check_exits()
+            self.stats["opened"] += opened
+            return opened
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Book {self.book_id} tick failed: {e}")
+            return 0
+
+    def summary(self):
+        return {**summarize(self.book_id, self.state.snapshot()), **self.stats}
+
+
+class PortfolioEngine:
+    def __init__(self, books=(), workers=1, market_state=None):
+        self.books = {book.book_id: book for book in books}
+        self.market_state = market_state or state_engine
+        self.workers = max(1, int(workers or 1))
+        self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="PortfolioBook") if self.workers > 1 else None
+        self.stats = {"ticks": 0, "signals": 0, "opened": 0}
+
+    @classmethod
+    def from_config(cls, path=None, event_logger=None, clock=None):
+        """The portfolio described by the config file, or None when there is no such file."""
+        path = path or os.environ.get("PORTFOLIO_CONFIG", CONFIG_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            config = json.load(f)
+        books = []
+        for entry in config.get("books", []):
+            entry = dict(entry)
+            books.append(StrategyBook(entry.pop("id"), entry, event_logger=event_logger, clock=clock))
+        logger.info(f"Portfolio loaded: {len(books)} book(s) from {path}")
+        return cls(books, workers=config.get("workers", 1))
+
+    def add_book(self, book):
+        if book.book_id in self.books:
+            raise ValueError(f"Duplicate book id: {book.book_id}")
+        self.books[book.book_id] = book
+
+    @timed("PortfolioEngine.process")
+    def process(self, signals):
+        """Offers one scan's actionable signals to every book and runs each book's exits."""
+        snapshot = self.market_state.snapshot()
+        session, prices = snapshot["session"], snapshot["market_data"]
+        books = list(self.books.values())
+        if self._pool is not None:
+            opened = sum(self._pool.map(lambda book: book.on_tick(signals, session, prices), books))
+        else:
+            opened = sum(book.on_tick(signals, session, prices) for book in books)
+        self.stats["ticks"] += 1
+        self.stats["signals"] += len(signals)
+        self.stats["opened"] += opened
+        return opened
+
+    def set_kill_switch(self, book_id, stop_new_trades=True):
+        self.books[book_id].state.update_kill_switch({"stop_new_trades": bool(stop_new_trades)})
+
+    def close_all(self, reason="PORTFOLIO_FLATTEN"):
+        for book in self.books.values():
+            book.risk.close_all_trades(reason)
+
+    def flush(self):
+        for book in self.books.values():
+            book.state.flush()
+
+    def summary(self):
+        return [book.summary() for book in self.books.values()]
+
+# Set by main.py when a portfolio config is present, so the dashboard can read the books
+portfolio_engine = None
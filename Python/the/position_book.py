@@ -0,0 +1,228 @@
+"""
+FILE: position_book.py
+TYPE: Indexed Position Book (Per-Symbol Exit Ladders + Incremental PnL)
+
+Open trades indexed by symbol. Each symbol keeps two sorted trigger ladders:
+"down" levels fire when a candle's low reaches them (long stops, short
+targets) and "up" levels fire when its high does (short stops, long targets),
+so a candle finds exactly the exits it crossed with two bisects instead of
+re-testing every position. Each symbol also keeps its net quantity and net
+cost, so its unrealized PnL is price * net_qty - net_cost and a price move
+updates the book total by the delta for that one symbol.
+
+When one candle reaches both a trade's stop and its target, the bar is assumed
+to travel O -> L -> H -> C if it closed up and O -> H -> L -> C if it closed
+down; a level the open already gapped through fills at the open.
+
+The book holds positions only; the exit policy (where stops sit, when to
+close) stays with TradeManagementEngine.
+"""
+import math
+from bisect import bisect_left, bisect_right
+
+STOP, TARGET = "stop", "target"
+
+
+def is_long(direction):
+    return direction in ("BUY", "LONG")
+
+
+def touch(level, falling, open_, bullish):
+    """(when, fill) for a level the bar reached: when 0 = gapped at the open, 1/2 = first/second leg of the bar."""
+    if (open_ <= level) if falling else (open_ >= level):
+        return 0, open_
+    return (1 if bullish == falling else 2), level
+
+
+class _Ladder:
+    __slots__ = ("levels", "keys")
+
+    def __init__(self):
+        self.levels = []  # Ascending
+        self.keys = []    # (trade_id, kind), parallel to levels
+
+    def insert(self, level, key):
+        i = bisect_right(self.levels, level)
+        self.levels.insert(i, level)
+        self.keys.insert(i, key)
+
+    def discard(self, level, key):
+        i = bisect_left(self.levels, level)
+        while self.keys[i] != key:
+            i += 1
+        del self.levels[i], self.keys[i]
+
+
+class _SymbolPositions:
+    __slots__ = ("trades", "down", "up", "trailing", "net_qty", "net_cost", "price", "unrealized")
+
+    def __init__(self):
+        self.trades = {}        # trade_id -> [long, qty, entry, stop, target]
+        self.down = _Ladder()   # Fires when low <= level
+        self.up = _Ladder()     # Fires when high >= level
+        self.trailing = {}      # trade_id -> trail distance
+        self.net_qty = 0.0      # Long qty minus short qty
+        self.net_cost = 0.0     # Long qty*entry minus short qty*entry
+        self.price = None
+        self.unrealized = 0.0
+
+    def ladder(self, long, kind):
+        # Long stops and short targets sit below the price; the rest above
+        return self.down if (long == (kind == STOP)) else self.up
+
+    def revalue(self):
+        self.unrealized = self.price * self.net_qty - self.net_cost if self.price is not None else 0.0
+        return self.unrealized
+
+
+class PositionBook:
+    def __init__(self):
+        self._symbols = {}
+        self._index = {}  # trade_id -> symbol
+        self.unrealized_pnl = 0.0
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, trade_id):
+        return trade_id in self._index
+
+    def ids(self):
+        return self._index.keys()
+
+    def symbols(self):
+        return self._symbols.keys()
+
+    def symbol(self, trade_id):
+        return self._index.get(trade_id)
+
+    def price(self, symbol):
+        positions = self._symbols.get(symbol)
+        return positions.price if positions else None
+
+    def trades(self, symbol):
+        positions = self._symbols.get(symbol)
+        return list(positions.trades) if positions else []
+
+    def levels(self, trade_id):
+        """(stop, target) currently in force for a trade."""
+        row = self._symbols[self._index[trade_id]].trades[trade_id]
+        return row[3], row[4]
+
+    def is_trailing(self, trade_id):
+        return trade_id in self._symbols[self._index[trade_id]].trailing
+
+    # ------------------------------------------------------------------ #
+    # Positions
+    # ------------------------------------------------------------------ #
+    def add(self, trade_id, trade, stop=None, target=None, trail=None):
+        """Indexes an open trade with its stop-loss / take-profit prices and optional trail distance."""
+        if trade_id in self._index:
+            self.remove(trade_id)
+        symbol = trade["symbol"]
+        positions = self._symbols.get(symbol)
+        if positions is None:
+            positions = self._symbols[symbol] = _SymbolPositions()
+        long, qty, entry = is_long(trade["direction"]), trade["quantity"], trade["entry_price"]
+        positions.trades[trade_id] = [long, qty, entry, stop, target]
+        self._index[trade_id] = symbol
+        if stop is not None:
+            positions.ladder(long, STOP).insert(stop, (trade_id, STOP))
+        if target is not None:
+            positions.ladder(long, TARGET).insert(target, (trade_id, TARGET))
+        if trail:
+            positions.trailing[trade_id] = trail
+        sign = 1 if long else -1
+        positions.net_qty += sign * qty
+        positions.net_cost += sign * qty * entry
+        self._revalue(positions)
+
+    def remove(self, trade_id):
+        symbol = self._index.pop(trade_id, None)
+        if symbol is None:
+            return False
+        positions = self._symbols[symbol]
+        long, qty, entry, stop, target = positions.trades.pop(trade_id)
+        if stop is not None:
+            positions.ladder(long, STOP).discard(stop, (trade_id, STOP))
+        if target is not None:
+            positions.ladder(long, TARGET).discard(target, (trade_id, TARGET))
+        positions.trailing.pop(trade_id, None)
+        if not positions.trades:
+            del self._symbols[symbol]
+            self.resum()
+            return True
+        sign = 1 if long else -1
+        positions.net_qty -= sign * qty
+        positions.net_cost -= sign * qty * entry
+        self._revalue(positions)
+        return True
+
+    def move_stop(self, trade_id, stop):
+        positions = self._symbols[self._index[trade_id]]
+        row = positions.trades[trade_id]
+        ladder = positions.ladder(row[0], STOP)
+        if row[3] is not None:
+            ladder.discard(row[3], (trade_id, STOP))
+        row[3] = stop
+        ladder.insert(stop, (trade_id, STOP))
+
+    # ------------------------------------------------------------------ #
+    # Prices
+    # ------------------------------------------------------------------ #
+    def on_candle(self, symbol, open_, high, low, close):
+        """
+        Revalues one symbol at the close and returns [(trade_id, kind, fill_price)]
+        for every trade whose stop or target the bar reached (the earlier one along
+        the bar's path when it reached both).
+        """
+        positions = self._symbols.get(symbol)
+        if positions is None:
+            return []
+        positions.price = close
+        self._revalue(positions)
+        bullish = close >= open_
+        hits = {}
+        down, up = positions.down, positions.up
+        if down.levels and low <= down.levels[-1]:
+            i = bisect_left(down.levels, low)
+            for level, (trade_id, kind) in zip(down.levels[i:], down.keys[i:]):
+                hits[trade_id] = touch(level, True, open_, bullish) + (kind,)
+        if up.levels and high >= up.levels[0]:
+            j = bisect_right(up.levels, high)
+            for level, (trade_id, kind) in zip(up.levels[:j], up.keys[:j]):
+                when, fill = touch(level, False, open_, bullish)
+                if trade_id not in hits or when < hits[trade_id][0]:
+                    hits[trade_id] = (when, fill, kind)
+        return [(trade_id, kind, fill) for trade_id, (_, fill, kind) in hits.items()]
+
+    def on_price(self, symbol, price):
+        return self.on_candle(symbol, price, price, price, price)
+
+    def ratchet(self, symbol, high, low):
+        """Moves trailing stops behind the bar's best price (never backwards). Returns how many moved."""
+        positions = self._symbols.get(symbol)
+        if positions is None or not positions.trailing:
+            return 0
+        moved = 0
+        for trade_id, distance in positions.trailing.items():
+            long, _, _, stop, _ = positions.trades[trade_id]
+            level = high - distance if long else low + distance
+            if stop is None or (level > stop if long else level < stop):
+                self.move_stop(trade_id, level)
+                moved += 1
+        return moved
+
+    def pnl(self, trade_id, price=None):
+        positions = self._symbols[self._index[trade_id]]
+        long, qty, entry, _, _ = positions.trades[trade_id]
+        price = positions.price if price is None else price
+        return (price - entry) * qty if long else (entry - price) * qty
+
+    def _revalue(self, positions):
+        old = positions.unrealized
+        self.unrealized_pnl += positions.revalue() - old
+
+    def resum(self):
+        # Re-anchor the running total so incremental float error cannot accumulate
+        self.unrealized_pnl = math.fsum(p.unrealized for p in self._symbols.values())
@@ -0,0 +1,191 @@
+"""
+FILE: pretrade_risk.py
+TYPE: Pre-Trade Risk Checks (Cached Limits + Reason Codes)
+
+Every entry ExecutionEngine makes passes two checks:
+
+    check_entry(symbol)                     before sizing: session, freeze, kill
+                                            switch, daily loss, symbol_block,
+                                            open positions, order rate
+    check_order(symbol, notional, margin)   after sizing: order notional,
+                                            per-symbol and gross exposure, margin
+
+Open positions and their notional are cached here (count, per-symbol count
+and notional, gross notional). A fill is added by record(), and closes made
+elsewhere (TradeManagementEngine) are replayed from the StateManager's trade
+journal, so keeping the cache current costs only the trades that changed. The
+symbol_block set is rebuilt only when the kill switch changes. A full check is
+a handful of dict lookups, a few microseconds.
+
+Each check returns a Decision(approved, code, message). Rejections carry one of
+the reason codes below and are counted in
+pretrade_rejections_total{code="..."}.
+"""
+import logging
+from collections import namedtuple, deque
+
+from the.state_manager import state_engine
+from the.clock import system_clock
+from the.metrics import registry
+
+logger = logging.getLogger("PreTradeRisk")
+
+Decision = namedtuple("Decision", ["approved", "code", "message"])
+APPROVED = Decision(True, "OK", "")
+
+# Reason codes
+SESSION_CLOSED = "SESSION_CLOSED"
+SYSTEM_FROZEN = "SYSTEM_FROZEN"
+KILL_SWITCH = "KILL_SWITCH"
+DAILY_LOSS_LIMIT = "DAILY_LOSS_LIMIT"
+SYMBOL_BLOCKED = "SYMBOL_BLOCKED"
+MAX_OPEN_POSITIONS = "MAX_OPEN_POSITIONS"
+MAX_SYMBOL_POSITIONS = "MAX_SYMBOL_POSITIONS"
+ORDER_RATE = "ORDER_RATE"
+ORDER_NOTIONAL = "ORDER_NOTIONAL"
+SYMBOL_EXPOSURE = "SYMBOL_EXPOSURE"
+GROSS_EXPOSURE = "GROSS_EXPOSURE"
+INSUFFICIENT_MARGIN = "INSUFFICIENT_MARGIN"
+
+
+def reject(code, message):
+    registry.counter("pretrade_rejections_total", "Entries refused by pre-trade risk checks", code=code).inc()
+    return Decision(False, code, message)
+
+
+class PreTradeRisk:
+    RATE_WINDOW = 60.0  # Seconds covered by the order-rate limits
+
+    def __init__(self, state=None, clock=None):
+        self.state = state or state_engine
+        self.clock = clock or system_clock
+        self.max_open_positions = 2           # "Max Active Trades: 2"; None = unlimited
+        self.max_positions_per_symbol = None
+        self.max_order_notional = None        # Price * quantity of one entry
+        self.max_symbol_notional = None       # Open notional in one symbol
+        self.max_gross_notional = None        # Open notional across the book
+        self.max_orders_per_window = 30       # Entries per RATE_WINDOW, all symbols
+        self.max_symbol_orders_per_window = None
+        self._seq = None                      # Trade journal position the caches reflect
+        self._open = {}                       # trade_id -> (symbol, notional)
+        self._symbol_count = {}
+        self._symbol_notional = {}
+        self.gross_notional = 0.0
+        self._kill_switch = None
+        self._blocked = frozenset()
+        self._orders = deque()                # Entry times inside the rate window
+        self._symbol_orders = {}              # symbol -> deque of entry times
+
+    @property
+    def open_positions(self):
+        return len(self._open)
+
+    # ------------------------------------------------------------------ #
+    # Checks
+    # ------------------------------------------------------------------ #
+    def check_entry(self, symbol):
+        """Gates that do not depend on the order's size."""
+        snapshot = self.state.snapshot()
+        session = snapshot["session"]
+        if session != "LIVE_MARKET":
+            return reject(SESSION_CLOSED, f"Execution blocked: Cannot trade in {session} session.")
+        kill_switch = snapshot["kill_switch"]
+        if snapshot["system_mode"] == "FREEZE" or kill_switch.get("full_system_freeze"):
+            return reject(SYSTEM_FROZEN, "Trading is frozen.")
+        daily_loss = snapshot["daily_loss"]
+        if daily_loss["breached"] or daily_loss["current"] <= -daily_loss["limit"]:
+            return reject(DAILY_LOSS_LIMIT, f"Daily loss limit of {daily_loss['limit']:.2f} reached.")
+        if kill_switch.get("stop_new_trades"):
+            return reject(KILL_SWITCH, "Trading is blocked by the kill switch.")
+        if kill_switch is not self._kill_switch:
+            self._kill_switch = kill_switch
+            self._blocked = frozenset(kill_switch.get("symbol_block") or ())
+        if symbol in self._blocked:
+            return reject(SYMBOL_BLOCKED, f"{symbol} is on the kill switch block list.")
+
+        self._sync()
+        if self.max_open_positions is not None and len(self._open) >= self.max_open_positions:
+            return reject(MAX_OPEN_POSITIONS, f"Already holding the maximum of {self.max_open_positions} open positions.")
+        if self.max_positions_per_symbol is not None and self._symbol_count.get(symbol, 0) >= self.max_positions_per_symbol:
+            return reject(MAX_SYMBOL_POSITIONS, f"Already holding {self.max_positions_per_symbol} position(s) in {symbol}.")
+
+        now = self.clock.time()
+        if self.max_orders_per_window is not None and self._recent(self._orders, now) >= self.max_orders_per_window:
+            return reject(ORDER_RATE, f"Order rate limit: {self.max_orders_per_window} entries per {self.RATE_WINDOW:.0f}s.")
+        if self.max_symbol_orders_per_window is not None:
+            orders = self._symbol_orders.get(symbol)
+            if orders and self._recent(orders, now) >= self.max_symbol_orders_per_window:
+                return reject(ORDER_RATE, f"Order rate limit for {symbol}: {self.max_symbol_orders_per_window} entries per {self.RATE_WINDOW:.0f}s.")
+        return APPROVED
+
+    def check_order(self, symbol, notional, margin):
+        """Limits on the sized order: its notional, the exposure it adds, the margin it needs."""
+        if self.max_order_notional is not None and notional > self.max_order_notional:
+            return reject(ORDER_NOTIONAL, f"Order notional {notional:.2f} exceeds the {self.max_order_notional:.2f} cap.")
+        if self.max_symbol_notional is not None and self._symbol_notional.get(symbol, 0.0) + notional > self.max_symbol_notional:
+            return reject(SYMBOL_EXPOSURE, f"{symbol} exposure would exceed {self.max_symbol_notional:.2f}.")
+        if self.max_gross_notional is not None and self.gross_notional + notional > self.max_gross_notional:
+            return reject(GROSS_EXPOSURE, f"Gross exposure would exceed {self.max_gross_notional:.2f}.")
+        free_balance = self.state.snapshot()["wallet"].get("free_balance", 0)
+        if margin > free_balance:
+            return reject(INSUFFICIENT_MARGIN, f"Margin required ({margin:.2f}) exceeds free balance.")
+        return APPROVED
+
+    # ------------------------------------------------------------------ #
+    # Cached exposure
+    # ------------------------------------------------------------------ #
+    def record(self, trade):
+        """Counts a fill straight away (the journal replay then skips it) and against the rate limits."""
+        self._add(trade['trade_id'], trade)
+        now = self.clock.time()
+        self._orders.append(now)
+        if self.max_symbol_orders_per_window is not None:
+            self._symbol_orders.setdefault(trade['symbol'], deque()).append(now)
+
+    def _sync(self):
+        seq, changes, trades = self.state.trade_changes(self._seq)
+        if changes is None:
+            self._open, self._symbol_count, self._symbol_notional, self.gross_notional = {}, {}, {}, 0.0
+            changes = trades.items()
+        for trade_id, trade in changes:
+            if trade is None:
+                self._remove(trade_id)
+            else:
+                self._add(trade_id, trade)
+        self._seq = seq
+
+    def _add(self, trade_id, trade):
+        if trade_id in self._open:
+            return
+        symbol = trade['symbol']
+        notional = trade['quantity'] * trade['entry_price']
+        self._open[trade_id] = (symbol, notional)
+        self._symbol_count[symbol] = self._symbol_count.get(symbol, 0) + 1
+        self._symbol_notional[symbol] = self._symbol_notional.get(symbol, 0.0) + notional
+        self.gross_notional += notional
+
+    def _remove(self, trade_id):
+        if trade_id not in self._open:
+            return
+        symbol, notional = self._open.pop(trade_id)
+        count = self._symbol_count[symbol] - 1
+        if count:
+            self._symbol_count[symbol] = count
+            self._symbol_notional[symbol] -= notional
+        else:
+            del self._symbol_count[symbol], self._symbol_notional[symbol]
+        self.gross_notional = self.gross_notional - notional if self._open else 0.0
+
+    def _recent(self, times, now):
+        cutoff = now - self.RATE_WINDOW
+        while times and times[0] <= cutoff:
+            times.popleft()
+        return len(times)
+
+    def exposure(self):
+        return {
+            "open_positions": len(self._open),
+            "gross_notional": self.gross_notional,
+            "symbols": {symbol: {"positions": count, "notional": self._symbol_notional[symbol]}
+                        for symbol, count in self._symbol_count.items()}
+        }
@@ -0,0 +1,208 @@
+"""
+FILE: read_model.py
+TYPE: Dashboard Read Model (Versioned Response Cache)
+
+Dashboard reads are served from precomputed, already-serialized payloads.
+A payload is rebuilt only when its inputs move on: the StateManager version
+for status/trades, the newest system_logs id for logs. The pair of versions
+doubles as the ETag, so unchanged resources answer If-None-Match with a 304.
+
+The log tail is read in id order a page at a time, so a burst of rows between
+two checks reaches the stream whole. A burst larger than LOG_BACKLOG is cut:
+the rows in the middle are replaced by one gap marker ({"gap": count}) and
+the tail resumes at the newest rows.
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+import itertools
+from collections import deque
+
+from the.state_manager import state_engine
+
+logger = logging.getLogger("ReadModel")
+
+
+def build_status(snapshot):
+    """The /status payload, built from one published state snapshot (consistent, no lock, no whole-state copy)."""
+    return {
+        "status": "ONLINE" if not snapshot["kill_switch"]["full_system_freeze"] else "FREEZE",
+        "mode": snapshot.get("system_mode"),
+        "active_trades": len(snapshot["active_trades"]),
+        "daily_pnl": snapshot["daily_loss"]["current"],
+        "wallet": dict(snapshot.get("wallet", {})),
+        "thinking": dict(snapshot.get("bot_thinking", {}))
+    }
+
+
+def _dumps(payload):
+    return json.dumps(payload, separators=(",", ":"), default=str).encode()
+
+
+class DashboardReadModel:
+    LOG_LIMIT = 20               # Rows served by /logs/recent
+    LOG_PAGE = 500               # Rows per tail query
+    LOG_BACKLOG = 5000           # Rows kept for the stream; a longer burst is cut with a gap marker
+    LOG_CHECK_INTERVAL = 0.25    # Max staleness of the log tail (one indexed query per interval)
+
+    def __init__(self, state=None, db_path="trading_bot_audit.db"):
+        self.state = state or state_engine
+        self.db_path = db_path
+        # Distinguishes ETags across restarts, when the version counters start over
+        self.boot_id = f"{os.getpid():x}{int(time.time()):x}"
+        self._lock = threading.RLock()
+        self._conn = None
+        self._next_log_check = 0.0
+        self.state_version = None
+        self.log_id = None
+        self.view = None
+        self.logs = deque(maxlen=self.LOG_BACKLOG)
+        self._evicted_id = 0     # Newest row pushed out of self.logs
+        self._cache = {}
+        self.stats = {"hits": 0, "rebuilds": 0, "not_modified": 0, "log_queries": 0}
+
+    # ------------------------------------------------------------------ #
+    # Inputs
+    # ------------------------------------------------------------------ #
+    def refresh_state(self):
+        """Rebuilds the view if the state version moved. Returns True when it did."""
+        version = self.state.version
+        if version == self.state_version:
+            return False
+        with self._lock:
+            if version == self.state_version:
+                return False
+            snapshot = self.state.snapshot()
+            view = build_status(snapshot)
+            view["trades"] = [dict(trade) for trade in snapshot["active_trades"].values()]
+            self.view = view
+            self.state_version = version
+            return True
+
+    def refresh_logs(self, force=False):
+        """
+        Tails system_logs past the newest id seen (at most once per LOG_CHECK_INTERVAL).
+        Returns the new rows, oldest first.
+        """
+        now = time.monotonic()
+        if not force and now < self._next_log_check:
+            return []
+        with self._lock:
+            self._next_log_check = now + self.LOG_CHECK_INTERVAL
+            try:
+                if self._conn is None:
+                    self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                    self._conn.row_factory = sqlite3.Row
+                self.stats["log_queries"] += 1
+                rows = self._newest(0) if self.log_id is None else self._tail(self.log_id)
+            except Exception as e:
+                logger.error(f"Log tail failed: {e}")
+                self._conn = None
+                return []
+            if not rows:
+                self.log_id = self.log_id or 0
+                return []
+            overflow = len(self.logs) + len(rows) - self.LOG_BACKLOG
+            if overflow > 0:
+                self._evicted_id = (self.logs[overflow - 1] if overflow <= len(self.logs) else rows[overflow - len(self.logs) - 1])["id"]
+            self.logs.extend(rows)
+            self.log_id = rows[-1]["id"]
+            return rows
+
+    def _newest(self, after):
+        """The last LOG_LIMIT rows past `after`, oldest first."""
+        rows = self._conn.execute(
+            "SELECT * FROM system_logs WHERE id > ? ORDER BY id DESC LIMIT ?", (after, self.LOG_LIMIT)
+        ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def _tail(self, after):
+        """Every row past `after` in id order, or, past LOG_BACKLOG rows, the first ones, a gap marker and the newest."""
+        rows = []
+        while len(rows) < self.LOG_BACKLOG:
+            page = self._conn.execute(
+                "SELECT * FROM system_logs WHERE id > ? ORDER BY id ASC LIMIT ?", (after, self.LOG_PAGE)
+            ).fetchall()
+            rows.extend(dict(row) for row in page)
+            if len(page) < self.LOG_PAGE:
+                return rows
+            after = page[-1]["id"]
+        newest = self._newest(after)
+        if newest:
+            skipped, last_id, last_time = self._conn.execute(
+                "SELECT COUNT(*), MAX(id), MAX(timestamp) FROM system_logs WHERE id > ? AND id < ?", (after, newest[0]["id"])
+            ).fetchone()
+            if skipped:
+                logger.warning(f"Log tail fell {skipped} rows behind; skipping to the newest")
+                rows.append(self._gap(skipped, last_id, last_time))
+            rows.extend(newest)
+        return rows
+
+    @staticmethod
+    def _gap(skipped, last_id, timestamp):
+        return {"id": last_id, "timestamp": timestamp, "level": "WARNING", "module": "ReadModel",
+                "message": f"{skipped} log rows not shown (up to id {last_id})", "payload": None, "gap": skipped}
+
+    def recent_logs(self):
+        """The cached log tail (last LOG_LIMIT rows), oldest first."""
+        with self._lock:
+            return list(itertools.islice(self.logs, max(len(self.logs) - self.LOG_LIMIT, 0), None))
+
+    def logs_since(self, log_id):
+        """Cached rows past log_id, oldest first, led by a gap marker if some already left the cache."""
+        with self._lock:
+            rows = [row for row in self.logs if row["id"] > log_id]
+            if log_id < self._evicted_id:
+                try:
+                    skipped, last_time = self._conn.execute(
+                        "SELECT COUNT(*), MAX(timestamp) FROM system_logs WHERE id > ? AND id <= ?", (log_id, self._evicted_id)
+                    ).fetchone()
+                except Exception as e:
+                    logger.error(f"Log gap count failed: {e}")
+                    skipped, last_time = None, None
+                rows.insert(0, self._gap(skipped, self._evicted_id, last_time or (rows[0]["timestamp"] if rows else None)))
+            return rows
+
+    # ------------------------------------------------------------------ #
+    # Serialized responses
+    # ------------------------------------------------------------------ #
+    def _payload(self, name):
+        if name == "trades":
+            return self.view["trades"]
+        if name == "logs":
+            return self.recent_logs()[::-1]  # Newest first, like EventLogger.get_recent_logs
+        status = {k: v for k, v in self.view.items() if k != "trades"}
+        if name == "status":
+            return status
+        return {"version": self.etag(name).strip('"'), "status": status, "trades": self.view["trades"], "logs": self.recent_logs()[::-1]}
+
+    def etag(self, name):
+        if name in ("status", "trades"):
+            return f'"{self.boot_id}-{self.state_version}"'
+        if name == "logs":
+            return f'"{self.boot_id}-l{self.log_id}"'
+        return f'"{self.boot_id}-{self.state_version}-l{self.log_id}"'
+
+    def get(self, name):
+        """Returns (etag, body bytes) for a resource, rebuilding it only if its inputs changed."""
+        self.refresh_state()
+        self.refresh_logs()
+        etag = self.etag(name)
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == etag:
+            self.stats["hits"] += 1
+            return cached
+        with self._lock:
+            etag = self.etag(name)
+            cached = (etag, _dumps(self._payload(name)))
+            self._cache[name] = cached
+            self.stats["rebuilds"] += 1
+        return cached
+
+    def get_stats(self):
+        return {**self.stats, "state_version": self.state_version, "log_id": self.log_id}
+
+read_model = DashboardReadModel()
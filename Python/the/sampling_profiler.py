@@ -0,0 +1,223 @@
+"""
+FILE: sampling_profiler.py
+TYPE: On-Demand Sampling Profiler (Flamegraph Capture)
+
+Profiles the running bot without a restart. While a capture runs, a daemon
+thread reads the target thread's current frame from sys._current_frames()
+every `interval` seconds and counts whole call stacks. The target is never
+paused or traced (no sys.setprofile / settrace), so its cost is one short
+GIL hand-off per sample. When no capture is running nothing is installed at
+all, so the overhead is zero.
+
+Each capture writes profiles/<thread>_<time>.collapsed (flamegraph.pl /
+inferno "a;b;c count" lines) and .speedscope.json (open in
+https://www.speedscope.app), and reports the top functions by self time.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger("SamplingProfiler")
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _frame_label(code):
+    path = code.co_filename
+    if path.startswith(PYTHON_DIR):
+        path = os.path.relpath(path, PYTHON_DIR)
+    elif "site-packages" in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    else:
+        path = os.path.basename(path)
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({path}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    OUTPUT_DIR = "profiles"
+    TARGET_THREAD = "TradingLoop"   # Name main.py gives the trading thread
+    DEFAULT_INTERVAL = 0.005        # 200 Hz
+    MIN_INTERVAL = 0.001
+    MAX_SECONDS = 300.0             # Captures stop by themselves after this
+    MAX_DEPTH = 256
+    TOP_FUNCTIONS = 25
+
+    def __init__(self, output_dir=None):
+        self.output_dir = output_dir or self.OUTPUT_DIR
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.capture = None
+        self.last_report = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @staticmethod
+    def find_thread(name):
+        for thread in threading.enumerate():
+            if thread.name == name:
+                return thread
+        return None
+
+    def start(self, seconds=10.0, interval=None, thread_name=None):
+        """Begins a capture; raises LookupError if the thread is not in this process, RuntimeError if one is running."""
+        thread_name = thread_name or self.TARGET_THREAD
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A capture is already running")
+            target = self.find_thread(thread_name)
+            if target is None:
+                raise LookupError(f"No thread named '{thread_name}' in this process")
+            seconds = min(max(float(seconds), 0.1), self.MAX_SECONDS)
+            interval = max(float(interval or self.DEFAULT_INTERVAL), self.MIN_INTERVAL)
+            self.capture = {
+                "thread": thread_name,
+                "started": datetime.now().isoformat(timespec="seconds"),
+                "seconds": seconds,
+                "interval_ms": round(interval * 1000, 3)
+            }
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(target.ident, thread_name, seconds, interval), name="SamplingProfiler", daemon=True
+            )
+            self._thread.start()
+        logger.info(f"Profiling thread '{thread_name}' for {seconds:.1f}s at {interval * 1000:.1f}ms")
+        return self.status()
+
+    def stop(self, timeout=5.0):
+        """Ends the running capture early and returns its report."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.last_report
+
+    def status(self):
+        return {"running": self.running, "capture": self.capture if self.running else None, "last_report": self.last_report}
+
+    # ------------------------------------------------------------------ #
+    # Sampling
+    # ------------------------------------------------------------------ #
+    def _run(self, ident, thread_name, seconds, interval):
+        try:
+            stacks, samples, late, elapsed = self._sample(ident, seconds, interval)
+            self.last_report = self._report(stacks, samples, late, elapsed, thread_name, interval)
+        except Exception as e:
+            logger.error(f"Profiler capture failed: {e}")
+            self.last_report = {"error": str(e), **(self.capture or {})}
+
+    def _sample(self, ident, seconds, interval):
+        stacks = Counter()  # (leaf code, ..., root code) -> samples
+        samples = late = 0
+        current_frames = sys._current_frames
+        clock = time.perf_counter
+        started = next_at = clock()
+        deadline = started + seconds
+        max_depth = self.MAX_DEPTH
+        while not self._stop.is_set():
+            frame = current_frames().get(ident)
+            if frame is None:
+                break  # Target thread ended
+            stack = []
+            while frame is not None and len(stack) < max_depth:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stacks[tuple(stack)] += 1
+            samples += 1
+
+            next_at += interval
+            now = clock()
+            if now >= deadline:
+                break
+            if next_at > now:
+                self._stop.wait(next_at - now)
+            else:
+                # Fell behind (GIL held by the target); resync instead of bursting
+                late += 1
+                next_at = now
+        return stacks, samples, late, clock() - started
+
+    # ------------------------------------------------------------------ #
+    # Output
+    # ------------------------------------------------------------------ #
+    def _report(self, stacks, samples, late, elapsed, thread_name, interval):
+        labels = {}
+
+        def label(code):
+            name = labels.get(code)
+            if name is None:
+                name = labels[code] = _frame_label(code)
+            return name
+
+        self_counts, total_counts = Counter(), Counter()
+        for stack, count in stacks.items():
+            names = [label(code) for code in stack]
+            self_counts[names[0]] += count
+            for name in set(names):
+                total_counts[name] += count
+
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.output_dir, f"{thread_name}_{stamp}")
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(base + ".collapsed", "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(";".join(label(code) for code in reversed(stack)) + f" {count}\n")
+        with open(base + ".speedscope.json", "w") as f:
+            json.dump(self._speedscope(stacks, label, interval, thread_name), f)
+
+        total = samples or 1
+        top = [{
+            "function": name,
+            "self_samples": count,
+            "self_pct": round(count / total * 100, 2),
+            "total_pct": round(total_counts[name] / total * 100, 2)
+        } for name, count in self_counts.most_common(self.TOP_FUNCTIONS)]
+        report = {
+            **(self.capture or {}),
+            "duration_seconds": round(elapsed, 3),
+            "samples": samples,
+            "late_samples": late,
+            "files": {"collapsed": base + ".collapsed", "speedscope": base + ".speedscope.json"},
+            "top_self": top
+        }
+        logger.info(f"Profile written to {base}.* ({samples} samples)")
+        return report
+
+    @staticmethod
+    def _speedscope(stacks, label, interval, thread_name):
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in stacks.items():
+            row = []
+            for code in reversed(stack):
+                i = index.get(code)
+                if i is None:
+                    i = index[code] = len(frames)
+                    frames.append({"name": label(code), "file": code.co_filename, "line": code.co_firstlineno})
+                row.append(i)
+            samples.append(row)
+            weights.append(round(count * interval, 6))
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"{thread_name} sampling profile",
+            "exporter": "the.sampling_profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+sampling_profiler = SamplingProfiler()
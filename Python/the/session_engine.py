@@ -3,6 +3,7 @@ from datetime import datetime
 import pytz
 from the.state_manager import state_engine
 from the.excel_manager import excel_manager
+from the.metrics import timed
 
 logger = logging.getLogger("SessionEngine")
 
@@ -13,8 +14,8 @@ class MarketSessionEngine:
         self.market_close = (15, 30)
         self.last_log_time = None
 
-    def get_current_session(self):
-        now = datetime.now(self.tz)
+    def get_current_session(self, now=None):
+        now = now or datetime.now(self.tz)
         current_time = (now.hour, now.minute)
         
         # Check weekend
@@ -32,14 +33,21 @@ class MarketSessionEngine:
         else:
             return "MARKET_CLOSED"
 
+    def seconds_until_next_transition(self):
+        """Seconds until the next session boundary (IST), so callers can sleep on a timer instead of polling."""
+        now = datetime.now(self.tz)
+        current = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+        boundaries = [9 * 3600, self.market_open[0] * 3600 + self.market_open[1] * 60,
+                      self.market_close[0] * 3600 + self.market_close[1] * 60, 16 * 3600, 24 * 3600]
+        return min(b - current for b in boundaries if b > current)
+
+    @timed("MarketSessionEngine.update_session")
     def update_session(self, event_logger):
         session = self.get_current_session()
-        state = state_engine.get_state()
-        old_session = state.get("session")
+        old_session = state_engine.get_session()
         
         if session != old_session:
-            state["session"] = session
-            state_engine._write_state(state)
+            state_engine.set_session(session)
             msg = f"Market session changed: {old_session} -> {session}"
             logger.info(msg)
             event_logger.log_system_event("INFO", "SessionEngine", msg)
@@ -62,7 +70,6 @@ class MarketSessionEngine:
 
     def run_post_market_analysis(self, event_logger):
         logger.info("Running POST_MARKET analysis...")
-        state = state_engine.get_state()
         
         analysis = {
             "Timestamp": datetime.now().isoformat(),
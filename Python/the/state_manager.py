@@ -1,18 +1,38 @@
 """
 FILE: state_manager.py
 TYPE: Central Authority (Thinking Layer)
+
+The in-memory dict is the source of truth, published as an immutable snapshot.
+Mutators (serialized by one lock) build a new snapshot that shares every
+unchanged sub-dict with the previous one and swap the reference; readers take
+the current reference without locking, so they never wait on the trading
+thread and never see a half-applied update. A background snapshot writer
+coalesces changes and persists them to bot_state.json atomically (temp file +
+rename) and, when publish_shared() is on, mirrors them into shared memory for
+a dashboard running in another process (see state_shm.py).
 """
 import os
+import copy
 import json
+import time
+import atexit
 import logging
-import fcntl
+import threading
+from collections import deque
 from datetime import date, datetime
 
+from the.metrics import instrument
+from the.state_shm import SnapshotWriter, SnapshotReader
+
 logger = logging.getLogger("StateManager")
 
 class StateManager:
     STATE_FILE = "bot_state.json"
-    
+    SNAPSHOT_INTERVAL = 0.5  # Max seconds a mutation may stay unpersisted
+    PUBLISH_INTERVAL = 0.05  # Max seconds before a mutation reaches shared-memory readers
+    RELOAD_CHECK_INTERVAL = 1.0  # How often readers look for external file changes
+    TRADE_JOURNAL_SIZE = 1024  # Recent opens / closes kept for incremental readers (trade_changes)
+
     DEFAULT_STATE = {
         "system_mode": "PAPER_TRADING_REAL_DATA",
         "session": "MARKET_CLOSED",
@@ -45,97 +65,406 @@ class StateManager:
         }
     }
 
-    def __init__(self):
-        if not os.path.exists(self.STATE_FILE):
-            self._write_state(self.DEFAULT_STATE)
+    def __init__(self, state_file=None, persist=True, track_thinking=True):
+        """
+        persist=False keeps the state purely in memory (no file, no writer thread),
+        which is what backtests use; track_thinking=False turns update_thinking into
+        a no-op for runs nobody is watching.
+        """
+        self.state_file = state_file or self.STATE_FILE
+        self.persist = persist
+        self.track_thinking = track_thinking
+        self._lock = threading.RLock()  # Serializes writers only; readers never take it
+        self._io_lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._version = 0
+        self._flushed_version = 0
+        self._last_flush = 0.0
+        self._file_mtime = None
+        self._next_reload_check = 0.0
+        self._last_publish = 0.0
+        self._serialized = (None, None)
+        self._shm_writer = None
+        self._shm_reader = None
+        self._trade_seq = 0
+        self._trade_journal = deque(maxlen=self.TRADE_JOURNAL_SIZE)  # (seq, trade_id, trade or None)
+        self._journal_trades = None  # active_trades object the journal leads up to
+        if not persist:
+            self._state = self._fresh_state()
+            return
+        self._state = self._load_from_disk()
         self.reload_state()
 
-    def reload_state(self):
-        state = self._read_state()
-        if state.get("date") != str(date.today()):
-            new_state = self.DEFAULT_STATE.copy()
-            new_state["date"] = str(date.today())
-            self._write_state(new_state)
+        self._writer_thread = threading.Thread(target=self._snapshot_worker, name="StateSnapshotWriter", daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.flush)
 
-    def _read_state(self):
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+    def _load_from_disk(self):
         try:
-            with open(self.STATE_FILE, 'r') as f:
-                fcntl.flock(f, fcntl.LOCK_SH)
+            with open(self.state_file, 'r') as f:
                 data = json.load(f)
-                fcntl.flock(f, fcntl.LOCK_UN)
-                return data
-        except Exception:
-            return self.DEFAULT_STATE
+            self._file_mtime = os.stat(self.state_file).st_mtime_ns
+            return data
+        except FileNotFoundError:
+            state = self._fresh_state()
+            self._state = state
+            self._mark_dirty()
+            return state
+        except Exception as e:
+            logger.error(f"State load failure, falling back to defaults: {e}")
+            return self._fresh_state()
 
-    def _write_state(self, data):
+    def _fresh_state(self):
+        state = copy.deepcopy(self.DEFAULT_STATE)
+        state["date"] = str(date.today())
+        return state
+
+    def reload_state(self):
+        with self._lock:
+            if self._state.get("date") != str(date.today()):
+                self._state = self._fresh_state()
+                self._mark_dirty()
+
+    def _swap(self, **changes):
+        """Publishes a shallow copy of the current snapshot with `changes` applied. Caller holds _lock."""
+        state = dict(self._state)
+        state.update(changes)
+        # Reference first, version second: whoever sees the new version also sees the new state
+        self._state = state
+        self._mark_dirty()
+
+    def _mark_dirty(self):
+        self._version += 1
+        if self.persist:
+            self._dirty.set()
+
+    def _snapshot_worker(self):
+        while True:
+            timeout = None
+            if self._version != self._flushed_version:
+                timeout = max(0.0, self._last_flush + self.SNAPSHOT_INTERVAL - time.monotonic())
+            if self._dirty.wait(timeout):
+                # Coalesce every mutation that lands inside the interval into one publish / write
+                if self._shm_writer is not None:
+                    wait = self._last_publish + self.PUBLISH_INTERVAL - time.monotonic()
+                else:
+                    wait = self._last_flush + self.SNAPSHOT_INTERVAL - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self._dirty.clear()
+                self._publish_shared()
+            if time.monotonic() >= self._last_flush + self.SNAPSHOT_INTERVAL:
+                self.flush()
+
+    def _serialize(self, state):
+        # Snapshots are immutable, so one JSON encoding serves both the file and shared memory
+        cached_state, payload = self._serialized
+        if cached_state is not state:
+            payload = json.dumps(state, separators=(",", ":")).encode()
+            self._serialized = (state, payload)
+        return payload
+
+    def _publish_shared(self):
+        writer = self._shm_writer
+        if writer is None:
+            return
         try:
-            with open(self.STATE_FILE, 'w') as f:
-                fcntl.flock(f, fcntl.LOCK_EX)
-                json.dump(data, f, indent=4)
-                fcntl.flock(f, fcntl.LOCK_UN)
+            writer.publish(self._serialize(self._state))
         except Exception as e:
-            logger.error(f"Write failure: {e}")
+            logger.error(f"Shared memory publish failure: {e}")
+        self._last_publish = time.monotonic()
+
+    def publish_shared(self, name=None):
+        """Mirrors every snapshot into shared memory (call once, in the process that runs the trading loop)."""
+        if not self.persist or self._shm_writer is not None:
+            return
+        self._shm_writer = SnapshotWriter(name)
+        self._shm_reader = None
+        atexit.register(self._shm_writer.close)
+        self._dirty.set()
+
+    def attach_shared(self, name=None):
+        """Reads state from the trading process's shared memory instead of polling bot_state.json."""
+        if self._shm_reader is None and self._shm_writer is None:
+            self._shm_reader = SnapshotReader(name)
+
+    def flush(self):
+        """Persists the current state if it changed since the last snapshot."""
+        if not self.persist:
+            return
+        with self._io_lock:
+            # Version first: the snapshot read after it is at least that new
+            version = self._version
+            if version == self._flushed_version:
+                return
+            payload = self._serialize(self._state)
+
+            tmp_path = f"{self.state_file}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.state_file)
+                self._file_mtime = os.stat(self.state_file).st_mtime_ns
+                self._flushed_version = version
+            except Exception as e:
+                logger.error(f"Write failure: {e}")
+            finally:
+                self._last_flush = time.monotonic()
+
+    def _maybe_reload(self):
+        """Picks up snapshots written by another process (e.g. a standalone dashboard)."""
+        reader = self._shm_reader
+        if reader is not None and self._version == self._flushed_version:
+            payload = reader.read()
+            if payload is not None:
+                state = json.loads(payload)
+                with self._lock:
+                    if self._version != self._flushed_version:
+                        return  # A local mutation won the race; keep it
+                    self._state = state
+                    self._version += 1
+                    self._flushed_version = self._version
+                return
+            if reader.attached:
+                return  # Shared memory is the fresher source while the trading process is up
+        now = time.monotonic()
+        if now < self._next_reload_check or not self.persist:
+            return
+        self._next_reload_check = now + self.RELOAD_CHECK_INTERVAL
+        if self._version != self._flushed_version:
+            return
+        try:
+            mtime = os.stat(self.state_file).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._file_mtime:
+            with self._lock:
+                if self._version != self._flushed_version:
+                    return  # A local mutation won the race; keep it
+                self._state = self._load_from_disk()
+                # Memory matches the file again; still a change for version watchers
+                self._version += 1
+                self._flushed_version = self._version
+
+    @property
+    def version(self):
+        """Change counter; also bumps when another process's snapshot is picked up."""
+        self._maybe_reload()
+        return self._version
+
+    # ------------------------------------------------------------------ #
+    # Whole-state access (legacy callers)
+    # ------------------------------------------------------------------ #
+    def _read_state(self):
+        self._maybe_reload()
+        return copy.deepcopy(self._state)
+
+    def _write_state(self, data):
+        with self._lock:
+            self._state = copy.deepcopy(data)
+            self._mark_dirty()
 
     def get_state(self):
         return self._read_state()
 
+    def snapshot(self):
+        """The current snapshot itself (no copy). Read-only: it may be shared with other readers."""
+        self._maybe_reload()
+        return self._state
+
+    # ------------------------------------------------------------------ #
+    # Fine-grained readers
+    # ------------------------------------------------------------------ #
+    def get_session(self):
+        self._maybe_reload()
+        return self._state.get("session", "MARKET_CLOSED")
+
+    def get_system_mode(self):
+        return self._state.get("system_mode")
+
+    def get_wallet(self):
+        return dict(self._state.get("wallet", {}))
+
+    def get_active_trades(self):
+        return {tid: dict(trade) for tid, trade in self._state["active_trades"].items()}
+
+    def get_market_price(self, symbol):
+        candle = self._state["market_data"].get(symbol)
+        return candle["close"] if candle else None
+
+    def get_market_data(self):
+        return {symbol: dict(candle) for symbol, candle in self._state["market_data"].items()}
+
+    def get_daily_loss(self):
+        return dict(self._state["daily_loss"])
+
+    def get_thinking(self, key, default=None):
+        return self._state.get("bot_thinking", {}).get(key, default)
+
+    def get_bot_thinking(self):
+        self._maybe_reload()
+        return copy.deepcopy(self._state.get("bot_thinking", {}))
+
+    def get_kill_switch(self):
+        self._maybe_reload()
+        return copy.deepcopy(self._state["kill_switch"])
+
+    # ------------------------------------------------------------------ #
+    # Fine-grained mutators (copy-on-write: never modify a published snapshot)
+    # ------------------------------------------------------------------ #
+    def set_session(self, session):
+        with self._lock:
+            self._swap(session=session)
+
+    def update_wallet(self, updates: dict):
+        with self._lock:
+            self._swap(wallet={**self._state["wallet"], **updates})
+
+    def adjust_wallet(self, deltas: dict):
+        with self._lock:
+            wallet = dict(self._state["wallet"])
+            for key, delta in deltas.items():
+                wallet[key] = wallet.get(key, 0) + delta
+            self._swap(wallet=wallet)
+
     def update_thinking(self, updates: dict):
-        state = self.get_state()
-        
-        # Ensure we don't lose existing rich data
-        current_thinking = state.get("bot_thinking", {
-            "current_state": "INITIALIZING",
-            "current_market": "SCANNING...",
-            "market_mode": "UNKNOWN",
-            "signal_type": "HOLD",
-            "signal_confidence": 0,
-            "indicator_logic": "N/A",
-            "trade_decision": "WAITING",
-            "rejection_reason": "NONE",
-            "risk_score": 20,
-            "narrative_logs": []
-        })
-        
-        current_thinking.update(updates)
-        
-        # Handle narrative logs as a rolling buffer
-        if "log_msg" in updates:
-            logs = current_thinking.get("narrative_logs", [])
-            logs.append(f"[{datetime.now().strftime('%H:%M:%S')}] {updates['log_msg']}")
-            current_thinking["narrative_logs"] = logs[-15:] # Keep last 15
-            
-        state["bot_thinking"] = current_thinking
-        self._write_state(state)
+        if not self.track_thinking:
+            return
+        with self._lock:
+            # Ensure we don't lose existing rich data
+            current_thinking = self._state.get("bot_thinking")
+            if current_thinking is None:
+                current_thinking = {
+                    "current_state": "INITIALIZING",
+                    "current_market": "SCANNING...",
+                    "market_mode": "UNKNOWN",
+                    "signal_type": "HOLD",
+                    "signal_confidence": 0,
+                    "indicator_logic": "N/A",
+                    "trade_decision": "WAITING",
+                    "rejection_reason": "NONE",
+                    "risk_score": 20,
+                    "narrative_logs": []
+                }
+            thinking = {**current_thinking, **updates}
+
+            # Handle narrative logs as a rolling buffer
+            if "log_msg" in updates:
+                logs = current_thinking.get("narrative_logs", [])[-14:]
+                thinking["narrative_logs"] = logs + [f"[{datetime.now().strftime('%H:%M:%S')}] {updates['log_msg']}"] # Keep last 15
+
+            self._swap(bot_thinking=thinking)
 
     def can_trade_new(self):
-        state = self._read_state()
+        state = self._state
         if state["system_mode"] == "FREEZE": return False
         if state["kill_switch"]["stop_new_trades"]: return False
         if state["daily_loss"]["breached"]: return False
         return True
 
+    def update_kill_switch(self, updates: dict):
+        with self._lock:
+            self._swap(kill_switch={**self._state["kill_switch"], **updates})
+
+    def update_fields(self, updates: dict):
+        """Top-level keys with no dedicated setter (e.g. a portfolio book's identity)."""
+        with self._lock:
+            self._swap(**updates)
+
+    def set_daily_loss_limit(self, limit):
+        with self._lock:
+            self._swap(daily_loss={**self._state["daily_loss"], "limit": limit})
+
+    def reset_daily_counters(self):
+        """Start-of-day reset of the loss tracker and the kill switch it trips."""
+        with self._lock:
+            self._swap(
+                daily_loss={**self._state["daily_loss"], "current": 0.0, "breached": False},
+                kill_switch={**self._state["kill_switch"], "stop_new_trades": False}
+            )
+
     def register_market_data(self, symbol, data):
-        state = self._read_state()
-        state["market_data"][symbol] = data
-        self._write_state(state)
+        with self._lock:
+            self._swap(market_data={**self._state["market_data"], symbol: data})
+
+    def register_market_data_batch(self, candles: dict):
+        with self._lock:
+            self._swap(market_data={**self._state["market_data"], **candles})
 
     def register_trade(self, trade_id, trade_data):
-        state = self._read_state()
-        state["active_trades"][trade_id] = trade_data
-        self._write_state(state)
+        """
+        Takes ownership of trade_data: callers must not modify it afterwards.
+        Returns False (and changes nothing) when trade_id is already open.
+        """
+        with self._lock:
+            if trade_id in self._state["active_trades"]:
+                logger.error(f"Refusing to overwrite open trade {trade_id}")
+                return False
+            self._check_journal()
+            self._swap(active_trades={**self._state["active_trades"], trade_id: trade_data})
+            self._journal(trade_id, trade_data)
+            return True
 
     def close_trade(self, trade_id):
-        state = self._read_state()
-        if trade_id in state["active_trades"]:
-            del state["active_trades"][trade_id]
-            self._write_state(state)
+        with self._lock:
+            if trade_id in self._state["active_trades"]:
+                self._check_journal()
+                active_trades = dict(self._state["active_trades"])
+                del active_trades[trade_id]
+                self._swap(active_trades=active_trades)
+                self._journal(trade_id, None)
+
+    def trade_changes(self, since):
+        """
+        (seq, changes, active_trades): the opens / closes after journal position
+        `since` as [(trade_id, trade)], trade None for a close. changes is None when
+        they cannot be replayed (since is None or older than the journal, or the
+        trades were replaced wholesale); the caller then rebuilds from active_trades.
+        """
+        with self._lock:
+            self._check_journal()
+            seq, journal = self._trade_seq, self._trade_journal
+            if since == seq:
+                return seq, [], self._journal_trades
+            if since is None or not journal or journal[0][0] > since + 1:
+                return seq, None, self._journal_trades
+            return seq, [journal[-i][1:] for i in range(seq - since, 0, -1)], self._journal_trades
+
+    def _check_journal(self):
+        # A reload or day reset swapped in a different active_trades: readers must rebuild
+        trades = self._state["active_trades"]
+        if trades is not self._journal_trades:
+            self._trade_journal.clear()
+            self._trade_seq += 1
+            self._journal_trades = trades
+
+    def _journal(self, trade_id, trade):
+        self._trade_seq += 1
+        self._trade_journal.append((self._trade_seq, trade_id, trade))
+        self._journal_trades = self._state["active_trades"]
 
     def update_pnl(self, pnl):
-        state = self._read_state()
-        state["daily_loss"]["current"] += pnl
-        if state["daily_loss"]["current"] <= -state["daily_loss"]["limit"]:
-            state["daily_loss"]["breached"] = True
-            state["kill_switch"]["stop_new_trades"] = True
-        self._write_state(state)
+        with self._lock:
+            daily_loss = dict(self._state["daily_loss"])
+            daily_loss["current"] += pnl
+            changes = {"daily_loss": daily_loss}
+            if daily_loss["current"] <= -daily_loss["limit"]:
+                daily_loss["breached"] = True
+                changes["kill_switch"] = {**self._state["kill_switch"], "stop_new_trades": True}
+            self._swap(**changes)
+
+# Every read and write shows up in call_duration_seconds{function="StateManager.<method>"}
+instrument(StateManager, [
+    "get_state", "get_session", "get_system_mode", "get_wallet", "get_active_trades", "get_market_price",
+    "get_market_data", "get_daily_loss", "get_thinking", "get_bot_thinking", "get_kill_switch",
+    "set_session", "update_wallet", "adjust_wallet", "update_thinking", "can_trade_new", "update_kill_switch", "update_fields", "set_daily_loss_limit",
+    "reset_daily_counters", "register_market_data", "register_market_data_batch", "register_trade",
+    "close_trade", "trade_changes", "update_pnl", "flush", "snapshot"
+])
 
 state_engine = StateManager()
@@ -0,0 +1,160 @@
+"""
+FILE: state_shm.py
+TYPE: Cross-Process State Channel (Seqlock over Shared Memory)
+
+The trading process mirrors every serialized state snapshot into one named
+shared-memory segment, so a dashboard running as a separate process reads the
+latest state without files or locks. A sequence counter guards the payload
+(seqlock): the writer makes it odd, copies the bytes and length, then makes it
+even again. A reader copies the payload between two reads of the counter and
+keeps it only if both are the same even number, so readers never block the
+writer and never keep a torn snapshot.
+
+Layout: magic (8s) | seq (Q) | length (Q) | flags (Q) | payload
+"""
+import os
+import time
+import struct
+import logging
+from multiprocessing import shared_memory, resource_tracker
+
+logger = logging.getLogger("StateShm")
+
+MAGIC = b"TVBSTAT1"
+HEADER = struct.Struct("<8sQQQ")
+WORD = struct.Struct("<Q")
+SEQ_OFFSET, LENGTH_OFFSET, FLAGS_OFFSET = 8, 16, 24
+CLOSED = 1  # flags bit: the writer shut down cleanly and unlinked the segment
+
+DEFAULT_NAME = os.environ.get("STATE_SHM_NAME", "trading_bot_state")
+
+
+def _untrack(shm):
+    # Before Python 3.13 the resource tracker unlinks attached segments when the attaching process exits
+    try:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+class SnapshotWriter:
+    SIZE = 8 * 1024 * 1024  # Payload capacity; larger snapshots are skipped (the file snapshot still lands)
+
+    def __init__(self, name=None, size=None):
+        self.name = name or DEFAULT_NAME
+        size = HEADER.size + (size or self.SIZE)
+        seq = 0
+        try:
+            self.shm = shared_memory.SharedMemory(self.name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a writer that died: take it over so already-attached readers keep working
+            self.shm = shared_memory.SharedMemory(self.name)
+            if bytes(self.shm.buf[:len(MAGIC)]) == MAGIC and self.shm.size >= size:
+                seq = WORD.unpack_from(self.shm.buf, SEQ_OFFSET)[0]
+            else:
+                self.shm.close()
+                self.shm.unlink()
+                self.shm = shared_memory.SharedMemory(self.name, create=True, size=size)
+        self.capacity = self.shm.size - HEADER.size
+        self.seq = seq + (seq & 1)
+        buf = self.shm.buf
+        buf[:len(MAGIC)] = MAGIC
+        WORD.pack_into(buf, FLAGS_OFFSET, 0)
+        WORD.pack_into(buf, SEQ_OFFSET, self.seq)
+        self.stats = {"published": 0, "skipped": 0, "bytes": 0}
+
+    def publish(self, payload: bytes):
+        """Copies one complete snapshot into the segment. Single writer only."""
+        n = len(payload)
+        if n > self.capacity:
+            if not self.stats["skipped"]:
+                logger.warning(f"State snapshot ({n} bytes) exceeds shared memory capacity ({self.capacity})")
+            self.stats["skipped"] += 1
+            return False
+        buf = self.shm.buf
+        WORD.pack_into(buf, SEQ_OFFSET, self.seq + 1)  # Odd: write in progress
+        buf[HEADER.size:HEADER.size + n] = payload
+        WORD.pack_into(buf, LENGTH_OFFSET, n)
+        self.seq += 2
+        WORD.pack_into(buf, SEQ_OFFSET, self.seq)
+        self.stats["published"] += 1
+        self.stats["bytes"] = n
+        return True
+
+    def close(self):
+        if self.shm is None:
+            return
+        buf = self.shm.buf
+        WORD.pack_into(buf, FLAGS_OFFSET, CLOSED)
+        self.seq += 2
+        WORD.pack_into(buf, SEQ_OFFSET, self.seq)
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+
+class SnapshotReader:
+    ATTACH_INTERVAL = 1.0  # How often a missing segment is looked for again
+    MAX_ATTEMPTS = 100     # Seqlock retries before giving up on this read (writer is mid-copy)
+
+    def __init__(self, name=None):
+        self.name = name or DEFAULT_NAME
+        self.shm = None
+        self.seq = None
+        self._next_attach = 0.0
+        self.stats = {"reads": 0, "retries": 0, "attaches": 0}
+
+    @property
+    def attached(self):
+        return self.shm is not None
+
+    def _attach(self):
+        now = time.monotonic()
+        if now < self._next_attach:
+            return False
+        self._next_attach = now + self.ATTACH_INTERVAL
+        try:
+            shm = shared_memory.SharedMemory(self.name)
+        except FileNotFoundError:
+            return False
+        _untrack(shm)
+        if bytes(shm.buf[:len(MAGIC)]) != MAGIC or WORD.unpack_from(shm.buf, FLAGS_OFFSET)[0] & CLOSED:
+            shm.close()
+            return False
+        self.shm = shm
+        self.seq = None
+        self.stats["attaches"] += 1
+        return True
+
+    def detach(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+    def read(self):
+        """The newest complete payload if it changed since the last call, else None. Never blocks."""
+        if self.shm is None and not self._attach():
+            return None
+        buf = self.shm.buf
+        for _ in range(self.MAX_ATTEMPTS):
+            seq = WORD.unpack_from(buf, SEQ_OFFSET)[0]
+            if seq == self.seq:
+                return None
+            if seq & 1:
+                self.stats["retries"] += 1
+                time.sleep(0)
+                continue
+            if WORD.unpack_from(buf, FLAGS_OFFSET)[0] & CLOSED:
+                self.detach()
+                return None
+            n = min(WORD.unpack_from(buf, LENGTH_OFFSET)[0], len(buf) - HEADER.size)
+            payload = bytes(buf[HEADER.size:HEADER.size + n])
+            if WORD.unpack_from(buf, SEQ_OFFSET)[0] == seq:
+                self.seq = seq
+                self.stats["reads"] += 1
+                return payload
+            self.stats["retries"] += 1
+        return None
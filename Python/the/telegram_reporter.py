@@ -5,6 +5,7 @@ import shutil
 from datetime import datetime
 from telegram import Bot
 from the.state_manager import state_engine
+from the.excel_manager import excel_manager
 
 logger = logging.getLogger("TelegramReporter")
 
@@ -22,6 +23,9 @@ class TelegramReporter:
         if not self.is_valid:
             return False
 
+        # Make sure the workbook reflects every journaled row
+        await asyncio.to_thread(excel_manager.materialize)
+
         # Create daily copy
         date_str = datetime.now().strftime("%Y-%m-%d")
         report_name = f"Daily_Report_{date_str}.xlsx"
@@ -95,6 +99,8 @@ class TelegramReporter:
             f"🧠 Learning: {thinking.get('indicator_explanation', 'Normal operations')[:100]}...\n"
         )
 
+        await asyncio.to_thread(excel_manager.materialize)
+
         files = [
             "market_state.xlsx",
             "signal_analysis.xlsx",
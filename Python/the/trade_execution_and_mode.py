@@ -3,15 +3,26 @@ FILE: execution_engine.py
 TYPE: Execution (Paper Only + Thinking)
 """
 import logging
-import time
 import math
-from datetime import datetime
+import itertools
 from dataclasses import dataclass, asdict
 from typing import Optional, Dict
 from the.state_manager import state_engine
+from the.clock import system_clock
+from the.metrics import timed
+from the.fill_model import fill_model
+from the.pretrade_risk import PreTradeRisk, reject
 
 logger = logging.getLogger("ExecutionEngine")
 
+# Rejection codes for checks that belong to the order itself (risk limits live in the.pretrade_risk)
+LOW_CONFIDENCE = "LOW_CONFIDENCE"
+INSUFFICIENT_BALANCE = "INSUFFICIENT_BALANCE"
+NO_LIQUIDITY = "NO_LIQUIDITY"
+INVALID_STOP = "INVALID_STOP"
+INVALID_TARGET = "INVALID_TARGET"
+DUPLICATE_TRADE_ID = "DUPLICATE_TRADE_ID"
+
 @dataclass
 class TradeObject:
     trade_id: str
@@ -24,41 +35,44 @@ class TradeObject:
     mode: str
     status: str
     signal_id: str
+    stop_loss: Optional[float] = None       # None: TradeManagementEngine's hard % stop
+    take_profit: Optional[float] = None
+    trail_distance: Optional[float] = None  # Trailing stop distance in price units
+    entry_fees: float = 0.0                 # Charged against the trade's PnL when it closes
 
     def to_dict(self):
         return asdict(self)
 
 class ExecutionEngine:
-    def __init__(self):
+    def __init__(self, state=None, event_logger=None, clock=None):
+        self.state = state or state_engine
+        self.event_logger = event_logger
+        self.clock = clock or system_clock
         self.max_risk_per_trade = 1000.0
-        self.min_confidence = 0.70
+        self.min_confidence = 0.6  # Same floor as MarketSignalEngine.MIN_SIGNAL_CONFIDENCE; raise it to filter harder
+        self.trade_prefix = "TRD"  # Portfolio books use TRD_<book> so ids stay unique in the shared audit DB
+        self.take_profit_pct = None     # e.g. 0.02: 2% target on trades whose signal sets none
+        self.trailing_atr_mult = None   # e.g. 2.0: trail 2 x ATR(14) behind the best price
+        self.fill_model = fill_model    # Spread / slippage / partial fills / fees on every paper fill
+        self.pretrade = PreTradeRisk(self.state, self.clock)  # Position / exposure / rate / loss limits
+        self.last_rejection = None      # Decision behind the most recent refused entry
+        self._trade_ids = itertools.count(1)  # Keeps ids unique when one second sees several entries
 
+    @timed("ExecutionEngine.execute_trade")
     def execute_trade(self, signal: Dict) -> Optional[TradeObject]:
         symbol = signal['symbol']
         direction = signal['signal_type']
-        
-        state = state_engine.get_state()
-        session = state.get("session", "MARKET_CLOSED")
-        
-        if session != "LIVE_MARKET":
-            rej_reason = f"Execution blocked: Cannot trade in {session} session."
-            state_engine.update_thinking({
-                "rejection_reason": rej_reason,
-                "log_msg": f"Trade rejected: {rej_reason}"
-            })
-            return None
-
-        wallet = state.get("wallet", {})
-        
-        state_engine.update_thinking({"current_state": "TRADING"})
 
-        if not state_engine.can_trade_new():
-            rej_reason = "Trading is blocked due to risk limits or kill switch."
-            state_engine.update_thinking({
-                "rejection_reason": rej_reason,
-                "log_msg": f"Trade rejected: {rej_reason}"
-            })
-            return None
+        decision = self.pretrade.check_entry(symbol)
+        if not decision.approved:
+            return self._refuse(decision)
+
+        if signal.get('confidence', 1.0) < self.min_confidence:
+            return self._refuse(reject(LOW_CONFIDENCE, f"Signal confidence {signal['confidence']:.2f} is below the {self.min_confidence:.2f} minimum."))
+
+        wallet = self.state.get_wallet()
+        
+        self.state.update_thinking({"current_state": "TRADING"})
 
         # Check for sufficient free balance
         ltp = signal['price']
@@ -70,55 +84,86 @@ class ExecutionEngine:
         
         qty = math.floor(max_position_value / ltp)
         if qty < 1:
-            rej_reason = f"Insufficient free balance to open trade for {symbol}."
-            state_engine.update_thinking({
-                "rejection_reason": rej_reason,
-                "log_msg": f"Trade rejected: {rej_reason}"
-            })
-            return None
+            return self._refuse(reject(INSUFFICIENT_BALANCE, f"Insufficient free balance to open trade for {symbol}."))
+
+        # Market and stop orders cross the spread and move the price; a limit fills at its level
+        order_type = signal.get('order_type') or "MARKET"
+        candle = self.state.snapshot()["market_data"].get(symbol)
+        model = self.fill_model.for_symbol(symbol)
+        fill = model.fill(direction == "BUY", ltp, qty, candle.get('volume') if candle else None,
+                          taker=order_type != "LIMIT")
+        if fill.quantity < 1:
+            return self._refuse(reject(NO_LIQUIDITY, f"No liquidity for {symbol}: the candle's volume cannot fill a single unit."))
+        if fill.quantity < qty:
+            logger.info(f"[PAPER] Partial fill for {symbol}: {fill.quantity} of {qty} units, remainder cancelled")
+        qty, ltp = fill.quantity, fill.price
+
+        stop_loss, take_profit, trail_distance = self._exit_levels(signal, direction, ltp)
+        if stop_loss is not None and (stop_loss >= ltp if direction == "BUY" else stop_loss <= ltp):
+            return self._refuse(reject(INVALID_STOP, f"Stop loss {stop_loss:.2f} is on the wrong side of the {ltp:.2f} entry."))
+        if take_profit is not None and (take_profit <= ltp if direction == "BUY" else take_profit >= ltp):
+            return self._refuse(reject(INVALID_TARGET, f"Take profit {take_profit:.2f} is on the wrong side of the {ltp:.2f} entry."))
 
         required_margin = (qty * ltp) / leverage
-        if required_margin > wallet.get("free_balance", 0):
-            rej_reason = f"Margin required ({required_margin:.2f}) exceeds free balance."
-            state_engine.update_thinking({
-                "rejection_reason": rej_reason,
-                "log_msg": f"Trade rejected: {rej_reason}"
-            })
-            return None
+        decision = self.pretrade.check_order(symbol, qty * ltp, required_margin)
+        if not decision.approved:
+            return self._refuse(decision)
 
         trade = TradeObject(
-            trade_id=f"TRD_{int(time.time())}_{symbol}",
+            trade_id=f"{self.trade_prefix}_{int(self.clock.time())}_{next(self._trade_ids)}_{symbol}",
             symbol=symbol,
             direction=direction,
             quantity=qty,
             entry_price=ltp,
-            order_type="MARKET",
-            timestamp=datetime.now().isoformat(),
-            mode=state["system_mode"],
+            order_type=order_type,
+            timestamp=self.clock.now().isoformat(),
+            mode=self.state.get_system_mode(),
             status="OPEN",
-            signal_id=signal.get('reason', 'algo')
+            signal_id=signal.get('reason', 'algo'),
+            stop_loss=stop_loss,
+            take_profit=take_profit,
+            trail_distance=trail_distance,
+            entry_fees=fill.fees
         )
         
-        # Update wallet margin
-        new_wallet = wallet.copy()
-        new_wallet["used_margin"] += required_margin
-        new_wallet["free_balance"] -= required_margin
-        
-        state_engine.register_trade(trade.trade_id, trade.to_dict())
+        if not self.state.register_trade(trade.trade_id, trade.to_dict()):
+            return self._refuse(reject(DUPLICATE_TRADE_ID, f"Trade id {trade.trade_id} is already open."))
+        self.pretrade.record(trade.to_dict())
         
-        # Update state with new wallet
-        current_state = state_engine.get_state()
-        current_state["wallet"] = new_wallet
-        state_engine._write_state(current_state)
+        # Update wallet margin
+        self.state.adjust_wallet({"used_margin": required_margin, "free_balance": -required_margin})
         
         # Log to EventLogger (which now logs to Excel)
-        from the.event_logger import EventLogger
-        EventLogger().log_trade_entry(trade.to_dict())
+        if self.event_logger is None:
+            from the.event_logger import EventLogger
+            self.event_logger = EventLogger()
+        self.event_logger.log_trade_entry(trade.to_dict())
 
-        state_engine.update_thinking({
+        self.state.update_thinking({
             "trade_decision": f"Executing {direction} trade for {symbol} at {ltp:.2f} as momentum looks strong.",
             "rejection_reason": "None",
             "log_msg": f"OPENED {direction} {symbol} @ {ltp:.2f}"
         })
         logger.info(f"[PAPER] Trade Executed: {trade.trade_id} @ {ltp}")
         return trade
+
+    def _refuse(self, decision):
+        self.last_rejection = decision
+        self.state.update_thinking({
+            "rejection_reason": decision.message,
+            "rejection_code": decision.code,
+            "log_msg": f"Trade rejected: {decision.message}"
+        })
+        return None
+
+    def _exit_levels(self, signal, direction, price):
+        """(stop_loss, take_profit, trail_distance): the signal's own bracket, else the engine defaults."""
+        stop_loss, take_profit = signal.get('stop_loss'), signal.get('take_profit')
+        if take_profit is None and self.take_profit_pct:
+            take_profit = price * (1 + self.take_profit_pct) if direction == "BUY" else price * (1 - self.take_profit_pct)
+        trail_distance = signal.get('trail_distance')
+        multiple = signal.get('trailing_atr') or self.trailing_atr_mult
+        atr = (signal.get('indicators') or {}).get('atr')
+        if trail_distance is None and multiple and atr:
+            trail_distance = multiple * atr
+        return stop_loss, take_profit, trail_distance
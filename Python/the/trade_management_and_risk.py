@@ -3,23 +3,32 @@ FILE: trade_management_engine.py
 TYPE: Risk Management (Paper Only + Thinking)
 """
 import logging
-import random
-from datetime import datetime
 from the.state_manager import state_engine
+from the.clock import system_clock
+from the.metrics import timed
+from the.position_book import PositionBook, TARGET
+from the.fill_model import fill_model
 
 logger = logging.getLogger("TradeManager")
 
 class TradeManagementEngine:
-    def __init__(self, event_logger):
+    def __init__(self, event_logger, state=None, clock=None):
         self.event_logger = event_logger
+        self.state = state or state_engine
+        self.clock = clock or system_clock
         self.hard_sl_pct = 0.01
         self.mandatory_exit_time = "14:30"
+        self.fill_model = fill_model  # Exit slippage and fees; take-profits fill at their level
+        # Open trades indexed by symbol, kept in step with the state's active_trades
+        self.positions = PositionBook()
+        self._synced_trades = None
+        self._priced = {}  # symbol -> candle last applied to the book
 
     def calculate_risk_score(self):
         """Generates a dynamic risk score based on system state."""
-        state = state_engine.get_state()
-        pnl = state["daily_loss"]["current"]
-        limit = state["daily_loss"]["limit"]
+        daily_loss = self.state.get_daily_loss()
+        pnl = daily_loss["current"]
+        limit = daily_loss["limit"]
         
         # Base risk: 20
         risk_score = 20
@@ -30,7 +39,7 @@ class TradeManagementEngine:
             risk_score += int(loss_pct * 50)
             explanation = f"Risk is elevated because we are currently at ₹{abs(pnl):.2f} loss for the day. "
         
-        active_count = len(state["active_trades"])
+        active_count = len(self.state.snapshot()["active_trades"])
         risk_score += active_count * 10
         
         if risk_score > 80:
@@ -40,97 +49,135 @@ class TradeManagementEngine:
         else:
             explanation += "System risk levels are within optimal parameters."
 
-        state_engine.update_thinking({
+        self.state.update_thinking({
             "risk_score": risk_score,
-            "trade_decision": explanation if active_count > 0 else state["bot_thinking"].get("trade_decision", "WAITING"),
+            "trade_decision": explanation if active_count > 0 else self.state.get_thinking("trade_decision", "WAITING"),
             "log_msg": f"Risk assessment: Score {risk_score} ({active_count} active)"
         })
         return risk_score
 
+    def stop_price(self, trade):
+        """Initial stop for a trade: its own stop_loss, else the trail distance, else the hard % stop."""
+        if trade.get('stop_loss') is not None:
+            return trade['stop_loss']
+        distance = trade.get('trail_distance')
+        if trade['direction'] in ["BUY", "LONG"]:
+            return trade['entry_price'] - distance if distance else trade['entry_price'] * (1 - self.hard_sl_pct)
+        return trade['entry_price'] + distance if distance else trade['entry_price'] * (1 + self.hard_sl_pct)
+
+    def _sync_positions(self, trades):
+        """Drops closed trades from the book; returns the ids of trades it has not seen yet."""
+        # Snapshots are copy-on-write: the same active_trades object means no trade opened or closed
+        if trades is self._synced_trades:
+            return []
+        book = self.positions
+        for trade_id in book.ids() - trades.keys():
+            book.remove(trade_id)
+        self._synced_trades = trades
+        return list(trades.keys() - book.ids())
+
+    @timed("TradeManagementEngine.check_exits")
     def check_exits(self):
+        """
+        Re-evaluates only the symbols whose candle changed since the last call: two
+        bisects over that symbol's exit ladders find the stops / targets its high and
+        low reached, and trailing stops then move behind the bar's best price.
+        """
         self.calculate_risk_score()
-        state = state_engine.get_state()
-        active_trades = state.get("active_trades", {})
-        market_data = state.get("market_data", {})
-        wallet = state.get("wallet", {})
+        snapshot = self.state.snapshot()
+        trades = snapshot["active_trades"]
+        added = self._sync_positions(trades)
+        book = self.positions
 
-        if not active_trades:
+        if not trades:
             # Update unrealized pnl to 0 if no trades
-            if wallet.get("unrealized_pnl") != 0:
-                wallet["unrealized_pnl"] = 0
-                state["wallet"] = wallet
-                state_engine._write_state(state)
+            self._priced.clear()
+            if snapshot["wallet"].get("unrealized_pnl") != 0:
+                self.state.update_wallet({"unrealized_pnl": 0})
             return
 
-        total_unrealized_pnl = 0
-        current_time = datetime.now().strftime("%H:%M")
-        
-        for tid, trade in list(active_trades.items()):
-            symbol = trade['symbol']
-            if symbol not in market_data:
+        exits = {}
+        market_data = snapshot["market_data"]
+        for symbol in list(book.symbols()):
+            candle = market_data.get(symbol)
+            if candle is None or candle is self._priced.get(symbol):
                 continue
-            
-            ltp = market_data[symbol]['close']
-            entry = trade['entry_price']
-            qty = trade['quantity']
-            direction = trade['direction']
-
-            # Calculate PnL
-            if direction in ["BUY", "LONG"]:
-                pnl = (ltp - entry) * qty
-                sl_hit = ltp <= entry * (1 - self.hard_sl_pct)
-            else:
-                pnl = (entry - ltp) * qty
-                sl_hit = ltp >= entry * (1 + self.hard_sl_pct)
-
-            total_unrealized_pnl += pnl
-
-            if sl_hit:
-                self.close_trade(tid, ltp, pnl, "STOP_LOSS_HIT")
-            elif current_time >= self.mandatory_exit_time:
-                self.close_trade(tid, ltp, pnl, "MANDATORY_TIME_EXIT")
-
-        # Update unrealized PnL in wallet
-        wallet["unrealized_pnl"] = total_unrealized_pnl
-        state["wallet"] = wallet
-        state_engine._write_state(state)
+            self._priced[symbol] = candle
+            close = candle['close']
+            high, low = candle.get('high', close), candle.get('low', close)
+            for tid, kind, fill in book.on_candle(symbol, candle.get('open', close), high, low, close):
+                exits[tid] = (self._exit_reason(tid, kind), fill)
+            book.ratchet(symbol, high, low)
+
+        # New trades entered on the current candle: only its close is after the entry
+        for tid in added:
+            trade = trades[tid]
+            book.add(tid, trade, self.stop_price(trade), trade.get('take_profit'), trade.get('trail_distance'))
+        for symbol in {trades[tid]['symbol'] for tid in added}:
+            candle = market_data.get(symbol)
+            if candle is not None:
+                self._priced[symbol] = candle
+                for tid, kind, fill in book.on_price(symbol, candle['close']):
+                    exits.setdefault(tid, (self._exit_reason(tid, kind), fill))
+
+        if self.clock.now().strftime("%H:%M") >= self.mandatory_exit_time:
+            for symbol in list(book.symbols()):
+                if book.price(symbol) is not None:
+                    for tid in book.trades(symbol):
+                        exits.setdefault(tid, ("MANDATORY_TIME_EXIT", book.price(symbol)))
+
+        for tid, (reason, exit_price) in exits.items():
+            if tid in book:
+                self.close_trade(tid, exit_price, book.pnl(tid, exit_price), reason)
+
+        # Update unrealized PnL in wallet (only when it moved)
+        total_unrealized_pnl = book.unrealized_pnl
+        if not exits and total_unrealized_pnl == snapshot["wallet"].get("unrealized_pnl"):
+            return
+        self.state.update_wallet({"unrealized_pnl": total_unrealized_pnl})
+        wallet = self.state.get_wallet()
 
         # Log to risk_and_drawdown.xlsx
-        from the.excel_manager import excel_manager
-        excel_manager.append_to_file("risk_and_drawdown.xlsx", "Risk_Drawdown", {
-            "Timestamp": datetime.now().isoformat(),
-            "Current_Equity": wallet.get("paper_balance", 0),
-            "Peak_Equity": wallet.get("paper_balance", 0), # Simplified
-            "Drawdown_Pct": "0%",
-            "Risk_Per_Trade": "₹1000",
-            "Rule_Violations": "None"
-        })
+        self.event_logger.log_risk_snapshot(wallet)
+
+    def _exit_reason(self, trade_id, kind):
+        if kind == TARGET:
+            return "TAKE_PROFIT_HIT"
+        return "TRAILING_STOP_HIT" if self.positions.is_trailing(trade_id) else "STOP_LOSS_HIT"
 
     def close_trade(self, trade_id, exit_price, pnl, reason):
-        state = state_engine.get_state()
-        trade = state["active_trades"].get(trade_id)
-        wallet = state.get("wallet", {})
+        trade = self.state.snapshot()["active_trades"].get(trade_id)
         
         if not trade:
             return
 
-        exit_time = datetime.now().isoformat()
-        
+        exit_time = self.clock.now().isoformat()
+
+        # pnl arrives gross at exit_price: apply the exit fill's slippage and both legs' fees
+        long = trade['direction'] in ["BUY", "LONG"]
+        candle = self.state.snapshot()["market_data"].get(trade['symbol'])
+        model = self.fill_model.for_symbol(trade['symbol'])
+        fill = model.fill(not long, exit_price, trade['quantity'], candle.get('volume') if candle else None,
+                          taker=reason != "TAKE_PROFIT_HIT", partial=False)
+        pnl += ((fill.price - exit_price) if long else (exit_price - fill.price)) * trade['quantity']
+        pnl -= trade.get('entry_fees', 0.0) + fill.fees
+        exit_price = fill.price
+
         # Calculate margin to return
-        leverage = wallet.get("leverage", 1)
+        leverage = self.state.get_wallet().get("leverage", 1)
         margin_released = (trade['quantity'] * trade['entry_price']) / leverage
         
         # Update wallet
-        wallet["used_margin"] -= margin_released
-        wallet["free_balance"] += (margin_released + pnl)
-        wallet["paper_balance"] += pnl
-        wallet["realized_pnl"] += pnl
-        
-        state["wallet"] = wallet
-        state_engine._write_state(state)
+        self.state.adjust_wallet({
+            "used_margin": -margin_released,
+            "free_balance": margin_released + pnl,
+            "paper_balance": pnl,
+            "realized_pnl": pnl
+        })
         
-        state_engine.close_trade(trade_id)
-        state_engine.update_pnl(pnl)
+        self.state.close_trade(trade_id)
+        self.positions.remove(trade_id)
+        self.state.update_pnl(pnl)
         
         # Log to EventLogger
         self.event_logger.log_trade_exit(trade_id, exit_price, pnl, exit_time)
@@ -140,14 +187,15 @@ class TradeManagementEngine:
         readable_msg = f"Decided to close position in {trade['symbol']} by {action} the trade at {exit_price:.2f}. Reason: {reason}."
         
         self.event_logger.log_system_event("INFO", "TradeManager", readable_msg)
-        state_engine.update_thinking({"log_msg": f"CLOSED {trade['direction']} {trade['symbol']} @ {exit_price:.2f} ({reason})"})
+        self.state.update_thinking({"log_msg": f"CLOSED {trade['direction']} {trade['symbol']} @ {exit_price:.2f} ({reason})"})
         logger.info(readable_msg)
 
     def close_all_trades(self, reason):
-        active_trades = state_engine.get_state().get("active_trades", {})
-        market_data = state_engine.get_state().get("market_data", {})
-        for tid, trade in list(active_trades.items()):
-            ltp = market_data.get(trade['symbol'], {}).get('close', trade['entry_price'])
+        active_trades = self.state.get_active_trades()
+        for tid, trade in active_trades.items():
+            ltp = self.state.get_market_price(trade['symbol'])
+            if ltp is None:
+                ltp = trade['entry_price']
             qty = trade['quantity']
             entry = trade['entry_price']
             pnl = (ltp - entry) * qty if trade['direction'] in ["BUY", "LONG"] else (entry - ltp) * qty